@@ -0,0 +1,232 @@
+# 📄 Script: admission.py
+# 🔧 Zweck: Zulassungskontrolle und Backpressure für das API-Gateway
+# 🗂 Pfad: mcp_units/mcp_agent_interaction_engine/admission.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: asyncio, starlette
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Modul begrenzt die Anzahl gleichzeitig verarbeiteter Anfragen pro Lane.
+# HINWEIS (MCP): Überzählige Anfragen warten in einer begrenzten Warteschlange mit Frist und
+# HINWEIS (MCP): werden bei voller Warteschlange sofort mit 429 bzw. nach Ablauf der Frist mit 503
+# HINWEIS (MCP): und einem Retry-After-Header abgelehnt. Pfade ohne Lane (z. B. /health) warten nie.
+
+import os
+import math
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from starlette.responses import JSONResponse
+
+# Use absolute imports when running the script directly
+from logger import log_event
+from metrics import counter, gauge
+
+# Admission metrics
+ADMISSION_REJECTIONS = counter(
+    "mcp_admission_rejections_total",
+    "Requests rejected by admission control",
+    ["lane", "reason"]
+)
+ADMISSION_IN_FLIGHT = gauge(
+    "mcp_admission_in_flight",
+    "Requests admitted and being processed",
+    ["lane"]
+)
+ADMISSION_QUEUED = gauge(
+    "mcp_admission_queued",
+    "Requests waiting for admission",
+    ["lane"]
+)
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Limit the number of concurrently processed requests of one lane.
+
+    Up to max_in_flight requests run at the same time. Further requests wait
+    in a FIFO queue of at most max_queue entries for at most queue_timeout
+    seconds. A full queue is rejected immediately (429), an expired wait is
+    rejected with 503.
+    """
+
+    def __init__(self, lane: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.lane = lane
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of admitted requests."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for admission."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _retry_after(self) -> int:
+        """Suggested client back-off in whole seconds."""
+        return max(1, math.ceil(self.queue_timeout))
+
+    def _update_gauges(self) -> None:
+        ADMISSION_IN_FLIGHT.set(self._in_flight, lane=self.lane)
+        ADMISSION_QUEUED.set(len(self._waiters), lane=self.lane)
+
+    async def acquire(self) -> None:
+        """
+        Wait for a processing slot.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait deadline passed
+        """
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTIONS.inc(lane=self.lane, reason="queue_full")
+            raise AdmissionRejected(429, "Too many requests, admission queue is full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        try:
+            # A released slot is handed over to the waiter without decrementing in_flight
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove_waiter(waiter)
+            ADMISSION_REJECTIONS.inc(lane=self.lane, reason="queue_timeout")
+            raise AdmissionRejected(503, "Service overloaded, admission wait deadline exceeded", self._retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the client went away
+                self.release()
+            else:
+                self._remove_waiter(waiter)
+            raise
+        finally:
+            self._update_gauges()
+
+    def release(self) -> None:
+        """Release a processing slot, handing it to the oldest waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self._in_flight -= 1
+        self._update_gauges()
+
+    def _remove_waiter(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get the current state of the controller.
+
+        Returns:
+            Dictionary with limits, in-flight and queued counts
+        """
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self._in_flight,
+            "queued": self.queued
+        }
+
+def controller_from_env(lane: str, prefix: str, max_in_flight: int, max_queue: int,
+                        queue_timeout: float) -> AdmissionController:
+    """
+    Create an admission controller whose limits can be overridden by environment variables.
+
+    The variables are {prefix}_MAX_IN_FLIGHT, {prefix}_MAX_QUEUE and
+    {prefix}_QUEUE_TIMEOUT (seconds).
+
+    Args:
+        lane: Name of the lane
+        prefix: Prefix of the environment variables
+        max_in_flight: Default limit of concurrently processed requests
+        max_queue: Default limit of waiting requests
+        queue_timeout: Default wait deadline in seconds
+
+    Returns:
+        The configured AdmissionController
+    """
+    return AdmissionController(
+        lane,
+        max_in_flight=int(os.environ.get(f"{prefix}_MAX_IN_FLIGHT", max_in_flight)),
+        max_queue=int(os.environ.get(f"{prefix}_MAX_QUEUE", max_queue)),
+        queue_timeout=float(os.environ.get(f"{prefix}_QUEUE_TIMEOUT", queue_timeout))
+    )
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control per lane.
+
+    Lanes are selected by path prefix; the first matching prefix wins. Paths
+    without a lane (health, status, metrics) bypass admission entirely and
+    therefore never queue behind admission-controlled traffic. The slot is
+    held until the response body is fully sent, which also covers streaming
+    responses.
+    """
+
+    def __init__(self, app, lanes: List[Tuple[str, AdmissionController]]):
+        self.app = app
+        self.lanes = lanes
+
+    def _lane_for(self, path: str) -> Optional[AdmissionController]:
+        for prefix, controller in self.lanes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return controller
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self._lane_for(scope.get("path", ""))
+        if controller is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await controller.acquire()
+        except AdmissionRejected as e:
+            log_event(
+                unit="api_gateway",
+                level="WARNING",
+                event="request_rejected",
+                message=f"Rejected request to {scope.get('path')}: {e.reason}",
+                lane=controller.lane,
+                status_code=e.status_code
+            )
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"error": e.reason, "lane": controller.lane, "retry_after": e.retry_after},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
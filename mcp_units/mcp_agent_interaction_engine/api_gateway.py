@@ -9,24 +9,93 @@
 # HINWEIS (MCP): Er stellt Endpunkte bereit, um mit dem LangGraph zu interagieren und
 # HINWEIS (MCP): Benutzeranfragen zu verarbeiten.
 
+import os
+import json
 import time
 import datetime
-from typing import Dict, List, Optional, Any, Union
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Match
 from pydantic import BaseModel, Field
 import uvicorn
 
 # Use absolute imports when running the script directly
-from graph_executor import invoke_graph
-from logger import log_info, log_error
+from graph import close_async_client
+from graph_executor import (
+    ainvoke_graph,
+    ainvoke_graph_batch,
+    astream_graph,
+    warm_graph_registry,
+    invalidate_graph_registry,
+    get_graph_registry_stats,
+    get_coalescing_stats
+)
+from admission import AdmissionMiddleware, controller_from_env
+from logger import log_info, log_error, flush_logs
+from metrics import counter, gauge, histogram, render_metrics
 from rules_api import include_rules_router
 from status_api import include_status_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Compile the graph at startup so that no request pays for it; flush logs on shutdown."""
+    warm_graph_registry()
+    yield
+    await close_async_client()
+    flush_logs()
+
 # Create FastAPI application
 app = FastAPI(
     title="MCP Agent Interaction Engine",
     description="API Gateway for the MCP Agent Interaction Engine",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Batch inference settings
+BATCH_DEFAULT_CONCURRENCY = int(os.environ.get("MCP_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = 64
+BATCH_MAX_ITEMS = 1000
+
+# Route templates of recently seen (method, path) pairs, so that labelling
+# the request metrics does not scan all routes on every request
+ROUTE_PATH_CACHE_SIZE = 1024
+_route_paths: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+# Admission control: inference requests are limited and queued, all other
+# paths (health, status, metrics, rules) bypass admission and never queue
+INFERENCE_ADMISSION = controller_from_env(
+    "inference",
+    "MCP_INFER",
+    max_in_flight=64,
+    max_queue=256,
+    queue_timeout=5.0
+)
+app.add_middleware(AdmissionMiddleware, lanes=[("/mcp/infer", INFERENCE_ADMISSION)])
+
+# Gateway request metrics
+REQUEST_LATENCY = histogram(
+    "mcp_http_request_duration_seconds",
+    "Latency of gateway HTTP requests",
+    ["path"]
+)
+REQUEST_COUNT = counter(
+    "mcp_http_requests_total",
+    "Gateway HTTP requests by status code",
+    ["path", "status"]
+)
+REQUEST_ERRORS = counter(
+    "mcp_http_request_errors_total",
+    "Gateway HTTP requests answered with a 5xx status or an exception",
+    ["path"]
+)
+REQUESTS_IN_FLIGHT = gauge(
+    "mcp_http_requests_in_flight",
+    "Gateway HTTP requests currently being processed",
+    ["path"]
 )
 
 # Include the rules and status routers
@@ -37,6 +106,7 @@ include_status_router(app)
 class InferRequest(BaseModel):
     input: str
     policy: Dict[str, Any] = Field(default_factory=dict)
+    include_timings: bool = False
 
 class InferResponse(BaseModel):
     output: str
@@ -44,6 +114,71 @@ class InferResponse(BaseModel):
     timestamp: str
     duration_ms: int
     error: Optional[str] = None
+    node_timings: Optional[Dict[str, float]] = None
+
+def _route_path(request: Request) -> str:
+    """
+    Get the route template of a request, to keep metric labels bounded.
+
+    The routes are only scanned for a (method, path) pair that is not in the
+    LRU cache; the middleware runs on the event loop, so no lock is needed.
+    """
+    key = (request.method, request.scope["path"])
+    path = _route_paths.get(key)
+    if path is not None:
+        _route_paths.move_to_end(key)
+        return path
+    path = "unmatched"
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            path = getattr(route, "path", "unmatched")
+            break
+    _route_paths[key] = path
+    while len(_route_paths) > ROUTE_PATH_CACHE_SIZE:
+        _route_paths.popitem(last=False)
+    return path
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record latency, status, errors and in-flight count of every request."""
+    path = _route_path(request)
+    start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc(path=path)
+    try:
+        response = await call_next(request)
+    except Exception:
+        REQUEST_ERRORS.inc(path=path)
+        REQUEST_COUNT.inc(path=path, status="500")
+        raise
+    finally:
+        REQUESTS_IN_FLIGHT.dec(path=path)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, path=path)
+    
+    if response.status_code >= 500:
+        REQUEST_ERRORS.inc(path=path)
+    REQUEST_COUNT.inc(path=path, status=str(response.status_code))
+    return response
+
+class InferBatchRequest(BaseModel):
+    items: List[InferRequest]
+    concurrency: Optional[int] = Field(default=None, ge=1, le=BATCH_MAX_CONCURRENCY)
+
+class InferBatchItemResult(BaseModel):
+    index: int
+    output: str
+    nodes_visited: List[str]
+    duration_ms: int
+    error: Optional[str] = None
+    node_timings: Optional[Dict[str, float]] = None
+
+class InferBatchResponse(BaseModel):
+    results: List[InferBatchItemResult]
+    count: int
+    succeeded: int
+    failed: int
+    timestamp: str
+    duration_ms: int
 
 @app.post("/mcp/infer", response_model=InferResponse)
 async def infer(request: InferRequest, req: Request):
@@ -70,7 +205,7 @@ async def infer(request: InferRequest, req: Request):
     
     try:
         # Invoke the graph with the user input and policy
-        result = invoke_graph(request.input, request.policy)
+        result = await ainvoke_graph(request.input, request.policy)
         
         # Calculate duration in milliseconds
         duration_ms = int((time.time() - start_time) * 1000)
@@ -88,7 +223,8 @@ async def infer(request: InferRequest, req: Request):
             nodes_visited=nodes_visited,
             timestamp=timestamp,
             duration_ms=duration_ms,
-            error=None
+            error=None,
+            node_timings=result.get("node_timings") if request.include_timings else None
         )
         
         # Log the successful response
@@ -135,6 +271,158 @@ async def infer(request: InferRequest, req: Request):
             detail=error_response.dict()
         )
 
+@app.post("/mcp/infer/batch", response_model=InferBatchResponse)
+async def infer_batch(request: InferBatchRequest, req: Request):
+    """
+    Process many independent user inputs through the LangGraph in one request.
+    
+    Items run with bounded concurrency. A failing item does not fail the
+    batch; its error is reported in the per-item result instead.
+    
+    Args:
+        request: The batch request with the items and an optional concurrency limit
+        
+    Returns:
+        Per-item results in input order plus batch totals
+    """
+    start_time = time.time()
+    client_ip = req.client.host if req.client else "unknown"
+    
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch contains {len(request.items)} items, maximum is {BATCH_MAX_ITEMS}"
+        )
+    
+    concurrency = request.concurrency or BATCH_DEFAULT_CONCURRENCY
+    
+    # Log the incoming batch once instead of once per item
+    log_info(
+        "api_gateway",
+        "infer_batch_received",
+        f"Received batch inference request from {client_ip}",
+        item_count=len(request.items),
+        concurrency=concurrency
+    )
+    
+    outcomes = await ainvoke_graph_batch(
+        [(item.input, item.policy) for item in request.items],
+        concurrency
+    )
+    
+    results = []
+    for index, (item, outcome) in enumerate(zip(request.items, outcomes)):
+        result = outcome.get("result", {})
+        results.append(InferBatchItemResult(
+            index=index,
+            output=result.get("output", ""),
+            nodes_visited=result.get("nodes_visited", []),
+            duration_ms=outcome["duration_ms"],
+            error=outcome.get("error"),
+            node_timings=result.get("node_timings") if item.include_timings else None
+        ))
+    
+    failed = sum(1 for result in results if result.error is not None)
+    duration_ms = int((time.time() - start_time) * 1000)
+    
+    log_info(
+        "api_gateway",
+        "infer_batch_completed",
+        f"Completed batch inference request from {client_ip}",
+        item_count=len(results),
+        failed_count=failed,
+        duration_ms=duration_ms
+    )
+    
+    return InferBatchResponse(
+        results=results,
+        count=len(results),
+        succeeded=len(results) - failed,
+        failed=failed,
+        timestamp=datetime.datetime.now().isoformat() + "Z",
+        duration_ms=duration_ms
+    )
+
+@app.post("/mcp/infer/stream")
+async def infer_stream(request: InferRequest, req: Request):
+    """
+    Process a user input through the LangGraph and stream progress as NDJSON.
+    
+    One JSON object is sent per line: a "node" frame whenever a node completes,
+    "token" frames with LLM output chunks as they arrive, and finally a
+    "result" frame with the InferResponse fields (or an "error" frame).
+    Closing the connection cancels the graph execution.
+    
+    Args:
+        request: The inference request containing user input and optional policy
+        
+    Returns:
+        A streaming response with media type application/x-ndjson
+    """
+    start_time = time.time()
+    client_ip = req.client.host if req.client else "unknown"
+    
+    # Log the incoming request
+    log_info(
+        "api_gateway",
+        "infer_stream_request_received",
+        f"Received streaming inference request from {client_ip}",
+        input_length=len(request.input),
+        has_policy=bool(request.policy)
+    )
+    
+    async def frames() -> AsyncIterator[str]:
+        async for frame in astream_graph(request.input, request.policy):
+            if frame["type"] in ("result", "error"):
+                frame["timestamp"] = datetime.datetime.now().isoformat() + "Z"
+                frame["duration_ms"] = int((time.time() - start_time) * 1000)
+                
+                if frame["type"] == "result":
+                    log_info(
+                        "api_gateway",
+                        "infer_stream_request_completed",
+                        f"Completed streaming inference request from {client_ip}",
+                        duration_ms=frame["duration_ms"],
+                        output_length=len(frame["output"]),
+                        nodes_count=len(frame["nodes_visited"])
+                    )
+                else:
+                    log_error(
+                        "api_gateway",
+                        "infer_stream_request_failed",
+                        f"Error processing streaming inference request: {frame['error']}",
+                        client_ip=client_ip,
+                        error=frame["error"],
+                        duration_ms=frame["duration_ms"]
+                    )
+            
+            yield json.dumps(frame) + "\n"
+    
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose the in-process metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/mcp/graph/stats")
+async def graph_stats():
+    """Compiled-graph registry and request coalescing statistics."""
+    stats = get_graph_registry_stats()
+    stats["coalescing"] = get_coalescing_stats()
+    return stats
+
+@app.post("/mcp/graph/invalidate")
+async def graph_invalidate(variant: Optional[str] = None):
+    """
+    Drop compiled graphs so that they are recompiled on next use.
+    
+    Args:
+        variant: Optional graph variant to invalidate (all variants if omitted)
+    """
+    dropped = invalidate_graph_registry(variant)
+    return {"invalidated": dropped, "stats": get_graph_registry_stats()}
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -3,77 +3,404 @@
 # 🗂 Pfad: mcp_units/mcp_agent_interaction_engine/graph.py
 # 👤 Autor: MINT-RESEARCH
 # 📅 Erstellt: 2025-04-13
-# 🧱 Benötigte Pakete: langgraph
+# 🧱 Benötigte Pakete: langgraph, requests, httpx
 # 🧪 Testbar: ✅
 # HINWEIS (MCP): Dieser Dienst implementiert den LangGraph für das MCP-System.
 # HINWEIS (MCP): Er definiert den Ablauf der Verarbeitung von Benutzeranfragen
 # HINWEIS (MCP): durch verschiedene Knoten: MEMORY_LOOKUP → TOOL_DECIDER → 
 # HINWEIS (MCP): TOOL_EXECUTE (optional) → LLM_INFER → RESPONSE_FORMATTER
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Callable, Optional
+from contextvars import ContextVar
+import asyncio
+import functools
+import inspect
+import time
 import sys
 import os
 import logging
 
 # Mock implementations for Docker container networking
 import requests
+import httpx
 import json
 import logging
 
+# Use absolute imports when running the script directly
+from metrics import counter, histogram
+
 # Define service URLs based on Docker Compose service names
 LLM_SERVICE_URL = "http://llm_infer:5000"
 MEMORY_SERVICE_URL = "http://memory_store:5000"
 TOOL_SERVICE_URL = "http://executor:5000"
 
+# Version of the graph definition below; bump it whenever nodes or edges change
+# so that compiled graphs cached by graph_executor are rebuilt
+GRAPH_DEFINITION_VERSION = "3"
+
+# Memory keys fetched by the memory lookup node
+MEMORY_LOOKUP_KEYS = ["context", "conversation_history"]
+
+# Number of conversation turns the memory store retains
+HISTORY_MAX_ENTRIES = 100
+
+# Number of recent conversation turns included in the prompt; memory_lookup
+# only fetches this window instead of the whole history
+HISTORY_WINDOW = 3
+MEMORY_LOOKUP_LAST = {"conversation_history": HISTORY_WINDOW}
+
+# Settings for the shared async HTTP client
+HTTP_TIMEOUT_SECONDS = 60.0
+HTTP_MAX_CONNECTIONS = 200
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 50
+
 def generate_text(prompt):
     """Mock implementation of generate_text that calls the LLM service via HTTP."""
     try:
-        response = requests.post(f"{LLM_SERVICE_URL}/generate", json={"prompt": prompt})
+        with DOWNSTREAM_LATENCY.time(service="llm", operation="generate"):
+            response = requests.post(f"{LLM_SERVICE_URL}/generate", json={"prompt": prompt})
         if response.status_code == 200:
             return response.json().get("text", "")
         else:
+            DOWNSTREAM_ERRORS.inc(service="llm", operation="generate")
             logging.error(f"Failed to generate text: {response.status_code}")
             return f"Error generating text: {response.status_code}"
     except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="llm", operation="generate")
         logging.error(f"Error calling LLM service: {e}")
         return f"Error: {str(e)}"
 
-def read_memory(key):
-    """Mock implementation of read_memory that calls the Memory service via HTTP."""
+def read_memory(key, last=None):
+    """
+    Mock implementation of read_memory that calls the Memory service via HTTP.
+    
+    Args:
+        key: The key to read
+        last: For list values, only fetch the newest `last` entries
+    """
+    params = {"last": last} if last is not None else None
     try:
-        response = requests.get(f"{MEMORY_SERVICE_URL}/memory/{key}")
+        with DOWNSTREAM_LATENCY.time(service="memory", operation="read"):
+            response = requests.get(f"{MEMORY_SERVICE_URL}/memory/{key}", params=params)
         if response.status_code == 200:
             return response.json().get("data")
         else:
+            DOWNSTREAM_ERRORS.inc(service="memory", operation="read")
             logging.error(f"Failed to read memory: {response.status_code}")
             return None
     except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="read")
         logging.error(f"Error calling Memory service: {e}")
         return None
 
+def _mget_payload(keys, last):
+    """Build the request body of the multi-get endpoint."""
+    payload = {"keys": list(keys)}
+    if last:
+        payload["last"] = {key: count for key, count in last.items() if key in payload["keys"]}
+    return payload
+
+def read_memory_many(keys, last=None):
+    """
+    Read several memory keys in one round trip via the multi-get endpoint.
+    
+    Args:
+        keys: The keys to read
+        last: Optional mapping of key to the number of newest list entries to fetch
+        
+    Returns:
+        Dictionary mapping each key to its value (None if missing or on error)
+    """
+    try:
+        with DOWNSTREAM_LATENCY.time(service="memory", operation="mget"):
+            response = requests.post(f"{MEMORY_SERVICE_URL}/mget", json=_mget_payload(keys, last))
+        if response.status_code == 200:
+            data = response.json().get("data") or {}
+            return {key: data.get(key) for key in keys}
+        else:
+            DOWNSTREAM_ERRORS.inc(service="memory", operation="mget")
+            logging.error(f"Failed to read memory keys: {response.status_code}")
+            return {key: None for key in keys}
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="mget")
+        logging.error(f"Error calling Memory service: {e}")
+        return {key: None for key in keys}
+
 def write_memory(key, data):
     """Mock implementation of write_memory that calls the Memory service via HTTP."""
     try:
-        response = requests.post(f"{MEMORY_SERVICE_URL}/memory/{key}", json={"data": data})
+        with DOWNSTREAM_LATENCY.time(service="memory", operation="write"):
+            response = requests.post(f"{MEMORY_SERVICE_URL}/memory/{key}", json={"data": data})
         if response.status_code == 200:
             return True
         else:
+            DOWNSTREAM_ERRORS.inc(service="memory", operation="write")
             logging.error(f"Failed to write memory: {response.status_code}")
             return False
     except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="write")
+        logging.error(f"Error calling Memory service: {e}")
+        return False
+
+def append_memory(key, entry, max_entries=None):
+    """
+    Append an entry to a list in the Memory service via HTTP.
+    
+    The append is atomic on the server, so only the new entry is sent and
+    concurrent writers do not overwrite each other.
+    
+    Args:
+        key: The key holding the list
+        entry: The entry to append
+        max_entries: Optional cap on the entries retained by the server
+        
+    Returns:
+        True if the entry was appended, False otherwise
+    """
+    try:
+        with DOWNSTREAM_LATENCY.time(service="memory", operation="append"):
+            response = requests.post(f"{MEMORY_SERVICE_URL}/memory/{key}/append",
+                                     json={"entry": entry, "max_entries": max_entries})
+        if response.status_code == 200:
+            return True
+        else:
+            DOWNSTREAM_ERRORS.inc(service="memory", operation="append")
+            logging.error(f"Failed to append memory: {response.status_code}")
+            return False
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="append")
         logging.error(f"Error calling Memory service: {e}")
         return False
 
 def run_shell_command(command):
     """Mock implementation of run_shell_command that calls the Tool service via HTTP."""
     try:
-        response = requests.post(f"{TOOL_SERVICE_URL}/execute", json={"command": command})
+        with DOWNSTREAM_LATENCY.time(service="tool", operation="execute"):
+            response = requests.post(f"{TOOL_SERVICE_URL}/execute", json={"command": command})
         if response.status_code == 200:
             return response.json().get("result", "")
         else:
+            DOWNSTREAM_ERRORS.inc(service="tool", operation="execute")
             logging.error(f"Failed to run command: {response.status_code}")
             return f"Error running command: {response.status_code}"
     except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="tool", operation="execute")
+        logging.error(f"Error calling Tool service: {e}")
+        return f"Error: {str(e)}"
+
+# Metrics for downstream calls and node execution
+DOWNSTREAM_LATENCY = histogram(
+    "mcp_downstream_request_duration_seconds",
+    "Latency of HTTP calls to downstream MCP services",
+    ["service", "operation"]
+)
+DOWNSTREAM_ERRORS = counter(
+    "mcp_downstream_errors_total",
+    "Failed HTTP calls to downstream MCP services",
+    ["service", "operation"]
+)
+NODE_LATENCY = histogram(
+    "mcp_graph_node_duration_seconds",
+    "Execution time of LangGraph nodes",
+    ["node"]
+)
+
+# Receives LLM output chunks while a streaming request runs the graph
+LLM_TOKEN_SINK: ContextVar[Optional[Callable[[str], None]]] = ContextVar("llm_token_sink", default=None)
+
+# Shared async HTTP client, bound to the event loop it was created on
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client for the downstream services.
+    
+    The client keeps connections alive across requests. A new client is
+    created if the running event loop changed since the last call.
+    
+    Returns:
+        The shared httpx.AsyncClient
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+        _async_client_loop = loop
+    return _async_client
+
+async def close_async_client() -> None:
+    """Close the shared async HTTP client."""
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+async def generate_text_async(prompt):
+    """Async variant of generate_text using the shared HTTP client."""
+    try:
+        with DOWNSTREAM_LATENCY.time(service="llm", operation="generate"):
+            response = await get_async_client().post(f"{LLM_SERVICE_URL}/generate", json={"prompt": prompt})
+        if response.status_code == 200:
+            return response.json().get("text", "")
+        else:
+            DOWNSTREAM_ERRORS.inc(service="llm", operation="generate")
+            logging.error(f"Failed to generate text: {response.status_code}")
+            return f"Error generating text: {response.status_code}"
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="llm", operation="generate")
+        logging.error(f"Error calling LLM service: {e}")
+        return f"Error: {str(e)}"
+
+async def generate_text_stream_async(prompt) -> AsyncIterator[str]:
+    """
+    Stream generated text from the LLM service chunk by chunk.
+    
+    Args:
+        prompt: The prompt to generate text for
+        
+    Yields:
+        Text chunks as they arrive from the LLM service
+        
+    Raises:
+        httpx.HTTPError: If the LLM service cannot be reached or fails
+    """
+    with DOWNSTREAM_LATENCY.time(service="llm", operation="generate_stream"):
+        async with get_async_client().stream("POST", f"{LLM_SERVICE_URL}/generate/stream", json={"prompt": prompt}) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_text():
+                if chunk:
+                    yield chunk
+
+async def _generate_text_streamed(prompt, sink: Callable[[str], None]) -> str:
+    """
+    Generate text via the streaming endpoint, passing each chunk to the sink.
+    
+    Falls back to the non-streaming endpoint if streaming fails before the
+    first chunk arrived.
+    
+    Args:
+        prompt: The prompt to generate text for
+        sink: Callback receiving each text chunk
+        
+    Returns:
+        The complete generated text
+    """
+    chunks = []
+    try:
+        async for chunk in generate_text_stream_async(prompt):
+            chunks.append(chunk)
+            sink(chunk)
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="llm", operation="generate_stream")
+        logging.error(f"Error streaming from LLM service: {e}")
+        if not chunks:
+            text = await generate_text_async(prompt)
+            sink(text)
+            return text
+    return "".join(chunks)
+
+async def read_memory_async(key, last=None):
+    """Async variant of read_memory using the shared HTTP client."""
+    params = {"last": last} if last is not None else None
+    try:
+        with DOWNSTREAM_LATENCY.time(service="memory", operation="read"):
+            response = await get_async_client().get(f"{MEMORY_SERVICE_URL}/memory/{key}", params=params)
+        if response.status_code == 200:
+            return response.json().get("data")
+        else:
+            DOWNSTREAM_ERRORS.inc(service="memory", operation="read")
+            logging.error(f"Failed to read memory: {response.status_code}")
+            return None
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="read")
+        logging.error(f"Error calling Memory service: {e}")
+        return None
+
+async def read_memory_many_async(keys, last=None):
+    """
+    Async variant of read_memory_many.
+    
+    If the memory service does not answer the multi-get request, the keys
+    are read with concurrent single-key requests instead.
+    
+    Args:
+        keys: The keys to read
+        last: Optional mapping of key to the number of newest list entries to fetch
+        
+    Returns:
+        Dictionary mapping each key to its value (None if missing or on error)
+    """
+    try:
+        with DOWNSTREAM_LATENCY.time(service="memory", operation="mget"):
+            response = await get_async_client().post(f"{MEMORY_SERVICE_URL}/mget", json=_mget_payload(keys, last))
+        if response.status_code == 200:
+            data = response.json().get("data") or {}
+            return {key: data.get(key) for key in keys}
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="mget")
+        logging.error(f"Failed to read memory keys: {response.status_code}")
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="mget")
+        logging.error(f"Error calling Memory service: {e}")
+    
+    # Fall back to concurrent single-key reads
+    last = last or {}
+    values = await asyncio.gather(*[read_memory_async(key, last=last.get(key)) for key in keys])
+    return dict(zip(keys, values))
+
+async def write_memory_async(key, data):
+    """Async variant of write_memory using the shared HTTP client."""
+    try:
+        with DOWNSTREAM_LATENCY.time(service="memory", operation="write"):
+            response = await get_async_client().post(f"{MEMORY_SERVICE_URL}/memory/{key}", json={"data": data})
+        if response.status_code == 200:
+            return True
+        else:
+            DOWNSTREAM_ERRORS.inc(service="memory", operation="write")
+            logging.error(f"Failed to write memory: {response.status_code}")
+            return False
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="write")
+        logging.error(f"Error calling Memory service: {e}")
+        return False
+
+async def append_memory_async(key, entry, max_entries=None):
+    """Async variant of append_memory using the shared HTTP client."""
+    try:
+        with DOWNSTREAM_LATENCY.time(service="memory", operation="append"):
+            response = await get_async_client().post(f"{MEMORY_SERVICE_URL}/memory/{key}/append",
+                                                     json={"entry": entry, "max_entries": max_entries})
+        if response.status_code == 200:
+            return True
+        else:
+            DOWNSTREAM_ERRORS.inc(service="memory", operation="append")
+            logging.error(f"Failed to append memory: {response.status_code}")
+            return False
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="memory", operation="append")
+        logging.error(f"Error calling Memory service: {e}")
+        return False
+
+async def run_shell_command_async(command):
+    """Async variant of run_shell_command using the shared HTTP client."""
+    try:
+        with DOWNSTREAM_LATENCY.time(service="tool", operation="execute"):
+            response = await get_async_client().post(f"{TOOL_SERVICE_URL}/execute", json={"command": command})
+        if response.status_code == 200:
+            return response.json().get("result", "")
+        else:
+            DOWNSTREAM_ERRORS.inc(service="tool", operation="execute")
+            logging.error(f"Failed to run command: {response.status_code}")
+            return f"Error running command: {response.status_code}"
+    except Exception as e:
+        DOWNSTREAM_ERRORS.inc(service="tool", operation="execute")
         logging.error(f"Error calling Tool service: {e}")
         return f"Error: {str(e)}"
 
@@ -99,10 +426,40 @@ def memory_lookup(state: Dict[str, Any]) -> Dict[str, Any]:
     user_input = state.get("input", "")
     logger.info(f"Memory lookup for input: {user_input[:50]}...")
     
-    # Retrieve context from memory if available
-    context = read_memory("context") or {}
-    history = read_memory("conversation_history") or []
+    # Retrieve context and the recent history window from memory in one round trip
+    values = read_memory_many(MEMORY_LOOKUP_KEYS, last=MEMORY_LOOKUP_LAST)
+    context = values.get("context") or {}
+    history = values.get("conversation_history") or []
+    
+    return _apply_memory(state, context, history)
+
+async def memory_lookup_async(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of memory_lookup."""
+    user_input = state.get("input", "")
+    logger.info(f"Memory lookup for input: {user_input[:50]}...")
+    
+    # Batch runs prefetch the shared context once and pass it in the state
+    keys = [key for key in MEMORY_LOOKUP_KEYS if key not in state]
+    values = await read_memory_many_async(keys, last=MEMORY_LOOKUP_LAST)
+    context = state["context"] if "context" in state else values.get("context") or {}
+    history = values.get("conversation_history") or []
     
+    return _apply_memory(state, context, history)
+
+async def prefetch_shared_memory() -> Dict[str, Any]:
+    """
+    Read the memory entries that are the same for every request.
+    
+    The returned entries can be merged into the initial state of several
+    graph runs; memory_lookup_async then skips reading them again.
+    
+    Returns:
+        Dictionary of state keys to prefetched values
+    """
+    return {"context": await read_memory_async("context") or {}}
+
+def _apply_memory(state: Dict[str, Any], context: Any, history: Any) -> Dict[str, Any]:
+    """Store the memory lookup results in the state."""
     # Update state with memory information
     state["context"] = context
     state["history"] = history
@@ -131,6 +488,10 @@ def tool_decider(state: Dict[str, Any]) -> Dict[str, Any]:
     
     return state
 
+async def tool_decider_async(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of tool_decider (no I/O, runs inline on the event loop)."""
+    return tool_decider(state)
+
 def tool_execute(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Execute the appropriate tool based on the user input and policy.
@@ -162,6 +523,27 @@ def tool_execute(state: Dict[str, Any]) -> Dict[str, Any]:
     
     return state
 
+async def tool_execute_async(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of tool_execute."""
+    if not state.get("use_tool", False):
+        return state
+    
+    policy = state.get("policy", {})
+    tool_command = policy.get("tool_command", "")
+    
+    logger.info(f"Executing tool: {tool_command}")
+    
+    # Execute the tool command
+    try:
+        state["tool_result"] = await run_shell_command_async(tool_command)
+    except Exception as e:
+        logger.error(f"Tool execution error: {e}")
+        state["tool_result"] = f"Error executing tool: {str(e)}"
+    
+    state["nodes_visited"].append("TOOL_EXECUTE")
+    
+    return state
+
 def llm_infer(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate a response using the LLM based on the user input and context.
@@ -173,6 +555,58 @@ def llm_infer(state: Dict[str, Any]) -> Dict[str, Any]:
         Updated state with LLM response
     """
     user_input = state.get("input", "")
+    history = state.get("history", [])
+    prompt = build_prompt(state)
+    
+    logger.info(f"Generating LLM response for prompt: {prompt[:50]}...")
+    
+    # Generate response using LLM
+    llm_response = generate_text(prompt)
+    state["llm_response"] = llm_response
+    state["nodes_visited"].append("LLM_INFER")
+    
+    # Append only the new turn to the conversation history in memory
+    turn = {"user": user_input, "system": llm_response}
+    history.append(turn)
+    append_memory("conversation_history", turn, max_entries=HISTORY_MAX_ENTRIES)
+    
+    return state
+
+async def llm_infer_async(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of llm_infer."""
+    user_input = state.get("input", "")
+    history = state.get("history", [])
+    prompt = build_prompt(state)
+    
+    logger.info(f"Generating LLM response for prompt: {prompt[:50]}...")
+    
+    # Generate response using LLM, forwarding chunks if a stream is listening
+    sink = LLM_TOKEN_SINK.get()
+    if sink is None:
+        llm_response = await generate_text_async(prompt)
+    else:
+        llm_response = await _generate_text_streamed(prompt, sink)
+    state["llm_response"] = llm_response
+    state["nodes_visited"].append("LLM_INFER")
+    
+    # Append only the new turn to the conversation history in memory
+    turn = {"user": user_input, "system": llm_response}
+    history.append(turn)
+    await append_memory_async("conversation_history", turn, max_entries=HISTORY_MAX_ENTRIES)
+    
+    return state
+
+def build_prompt(state: Dict[str, Any]) -> str:
+    """
+    Construct the LLM prompt from the user input, context, history and tool result.
+    
+    Args:
+        state: The current state dictionary
+        
+    Returns:
+        The prompt text
+    """
+    user_input = state.get("input", "")
     context = state.get("context", {})
     history = state.get("history", [])
     tool_result = state.get("tool_result", "")
@@ -185,24 +619,13 @@ def llm_infer(state: Dict[str, Any]) -> Dict[str, Any]:
     
     if history:
         prompt += "Conversation history:\n"
-        for entry in history[-3:]:  # Include last 3 entries
+        for entry in history[-HISTORY_WINDOW:]:  # Include the most recent entries
             prompt += f"- {entry}\n"
     
     if tool_result:
         prompt += f"Tool result: {tool_result}\n"
     
-    logger.info(f"Generating LLM response for prompt: {prompt[:50]}...")
-    
-    # Generate response using LLM
-    llm_response = generate_text(prompt)
-    state["llm_response"] = llm_response
-    state["nodes_visited"].append("LLM_INFER")
-    
-    # Update conversation history in memory
-    history.append({"user": user_input, "system": llm_response})
-    write_memory("conversation_history", history)
-    
-    return state
+    return prompt
 
 def response_formatter(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -228,6 +651,10 @@ def response_formatter(state: Dict[str, Any]) -> Dict[str, Any]:
     
     return state
 
+async def response_formatter_async(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of response_formatter (no I/O, runs inline on the event loop)."""
+    return response_formatter(state)
+
 def should_use_tool(state: Dict[str, Any]) -> bool:
     """
     Determine whether to use a tool based on the state.
@@ -240,6 +667,44 @@ def should_use_tool(state: Dict[str, Any]) -> bool:
     """
     return state.get("use_tool", False)
 
+def _record_node_timing(state: Any, label: str, start: float) -> None:
+    """Record the duration of a node run in the state and the node histogram."""
+    elapsed = time.perf_counter() - start
+    NODE_LATENCY.observe(elapsed, node=label)
+    if isinstance(state, dict):
+        state.setdefault("node_timings", {})[label] = round(elapsed * 1000, 2)
+
+def _timed_node(label: str, node: Callable) -> Callable:
+    """
+    Wrap a node so that its execution time is measured.
+    
+    The duration is stored in milliseconds under state["node_timings"][label]
+    and observed in the mcp_graph_node_duration_seconds histogram.
+    
+    Args:
+        label: Node label used in timings and metrics (e.g. "LLM_INFER")
+        node: Sync or async node implementation
+        
+    Returns:
+        The wrapped node with the same calling convention
+    """
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def timed_async(state: Dict[str, Any]) -> Dict[str, Any]:
+            start = time.perf_counter()
+            result = await node(state)
+            _record_node_timing(result, label, start)
+            return result
+        return timed_async
+    
+    @functools.wraps(node)
+    def timed(state: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = node(state)
+        _record_node_timing(result, label, start)
+        return result
+    return timed
+
 def build_graph():
     """
     Build and return the LangGraph for the MCP system.
@@ -247,17 +712,50 @@ def build_graph():
     Returns:
         A LangGraph instance with the defined nodes and edges
     """
+    return _compile_graph({
+        "memory_lookup": memory_lookup,
+        "tool_decider": tool_decider,
+        "tool_execute": tool_execute,
+        "llm_infer": llm_infer,
+        "response_formatter": response_formatter,
+    })
+
+def build_async_graph():
+    """
+    Build and return the LangGraph with async node implementations.
+    
+    The returned graph must be run with ainvoke/astream so that the nodes
+    share the event loop instead of blocking it.
+    
+    Returns:
+        A LangGraph instance with the defined nodes and edges
+    """
+    return _compile_graph({
+        "memory_lookup": memory_lookup_async,
+        "tool_decider": tool_decider_async,
+        "tool_execute": tool_execute_async,
+        "llm_infer": llm_infer_async,
+        "response_formatter": response_formatter_async,
+    })
+
+def _compile_graph(nodes: Dict[str, Any]):
+    """
+    Wire the given node implementations into the MCP graph and compile it.
+    
+    Args:
+        nodes: Mapping of node name to node implementation
+        
+    Returns:
+        The compiled LangGraph
+    """
     from langgraph.graph import StateGraph
     
     # Create a new graph
     graph = StateGraph(Dict[str, Any])
     
     # Add nodes to the graph
-    graph.add_node("memory_lookup", memory_lookup)
-    graph.add_node("tool_decider", tool_decider)
-    graph.add_node("tool_execute", tool_execute)
-    graph.add_node("llm_infer", llm_infer)
-    graph.add_node("response_formatter", response_formatter)
+    for name, node in nodes.items():
+        graph.add_node(name, _timed_node(name.upper(), node))
     
     # Define the edges between nodes
     graph.add_edge("memory_lookup", "tool_decider")
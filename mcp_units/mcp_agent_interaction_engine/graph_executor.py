@@ -9,10 +9,220 @@
 # HINWEIS (MCP): Er stellt eine einfache Schnittstelle zur Verfügung, um
 # HINWEIS (MCP): Benutzeranfragen durch den Graph zu verarbeiten.
 
-from typing import Dict
+import os
+import copy
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 # Use absolute imports when running the script directly
-from graph import build_graph
+from graph import (
+    build_graph,
+    build_async_graph,
+    prefetch_shared_memory,
+    GRAPH_DEFINITION_VERSION,
+    LLM_TOKEN_SINK
+)
 from logger import log_event
+from metrics import counter, gauge
+
+# Constants
+# Resolved against the repository root, so the lookup does not depend on the working directory
+GRAPH_POLICY_FILE = os.environ.get(
+    "MCP_GRAPH_POLICY_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 "config", "policies", "graph.policy.yaml")
+)
+# graph.policy.yaml is checked for changes at most this often (seconds)
+GRAPH_POLICY_CHECK_INTERVAL = float(os.environ.get("MCP_GRAPH_POLICY_CHECK_INTERVAL", "1.0"))
+DEFAULT_GRAPH_VARIANT = "default"
+ASYNC_GRAPH_VARIANT = "async"
+
+# Builders for the available graph variants
+GRAPH_BUILDERS: Dict[str, Callable[[], Any]] = {
+    DEFAULT_GRAPH_VARIANT: build_graph,
+    ASYNC_GRAPH_VARIANT: build_async_graph,
+}
+
+# Process-wide registry of compiled graphs, keyed by graph variant
+_compiled_graphs: Dict[str, Any] = {}
+_graph_fingerprints: Dict[str, Tuple] = {}
+_registry_lock = threading.Lock()
+# Last fingerprint and when it was taken (time.monotonic), None forces a check
+_fingerprint: Optional[Tuple] = None
+_fingerprint_checked_at: Optional[float] = None
+_registry_stats = {
+    "compile_count": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "invalidations": 0,
+}
+
+# Single-flight coalescing of identical in-flight async invocations
+_in_flight: Dict[str, "asyncio.Task"] = {}
+_coalescing_stats = {
+    "executions": 0,
+    "coalesced": 0,
+}
+
+# Metrics for graph executions
+GRAPH_ERRORS = counter(
+    "mcp_graph_errors_total",
+    "Failed graph executions",
+    ["mode"]
+)
+GRAPH_COMPILES = counter(
+    "mcp_graph_compiles_total",
+    "Graph compilations"
+)
+GRAPH_CACHE_HITS = counter(
+    "mcp_graph_cache_hits_total",
+    "Compiled-graph registry hits"
+)
+GRAPH_EXECUTIONS = counter(
+    "mcp_graph_executions_total",
+    "Graph executions started by ainvoke_graph"
+)
+GRAPH_COALESCED_CALLS = counter(
+    "mcp_graph_coalesced_calls_total",
+    "Calls collapsed into an in-flight execution"
+)
+gauge("mcp_graph_in_flight", "Distinct graph executions in flight", function=lambda: len(_in_flight))
+
+def _graph_fingerprint() -> Tuple:
+    """
+    Build a fingerprint of everything a compiled graph depends on.
+    
+    The policy file is stat'ed at most once per GRAPH_POLICY_CHECK_INTERVAL,
+    so the hot path usually costs no syscall; an invalidation forces a check.
+    
+    Returns:
+        Tuple of the graph definition version and the graph policy file state
+    """
+    global _fingerprint, _fingerprint_checked_at
+    now = time.monotonic()
+    checked_at = _fingerprint_checked_at
+    if checked_at is not None and now - checked_at < GRAPH_POLICY_CHECK_INTERVAL:
+        return _fingerprint
+    
+    try:
+        stat = os.stat(GRAPH_POLICY_FILE)
+        policy_state = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        policy_state = None
+    
+    _fingerprint = (GRAPH_DEFINITION_VERSION, policy_state)
+    _fingerprint_checked_at = now
+    return _fingerprint
+
+def get_compiled_graph(variant: str = DEFAULT_GRAPH_VARIANT) -> Any:
+    """
+    Get the compiled graph for a variant, compiling it only if necessary.
+    
+    The compiled graph is shared by all requests. It is recompiled when the
+    graph definition version or graph.policy.yaml changes (noticed within
+    GRAPH_POLICY_CHECK_INTERVAL), or after an explicit invalidation.
+    
+    Args:
+        variant: The graph variant to get
+        
+    Returns:
+        The compiled graph
+        
+    Raises:
+        KeyError: If the variant is unknown
+    """
+    if variant not in GRAPH_BUILDERS:
+        raise KeyError(f"Unknown graph variant: {variant}")
+    
+    fingerprint = _graph_fingerprint()
+    
+    # Fast path: the graph is compiled and still current
+    graph = _compiled_graphs.get(variant)
+    if graph is not None and _graph_fingerprints.get(variant) == fingerprint:
+        with _registry_lock:
+            _registry_stats["cache_hits"] += 1
+        GRAPH_CACHE_HITS.inc()
+        return graph
+    
+    with _registry_lock:
+        # Another request may have compiled the graph while we waited for the lock
+        graph = _compiled_graphs.get(variant)
+        if graph is not None and _graph_fingerprints.get(variant) == fingerprint:
+            _registry_stats["cache_hits"] += 1
+            GRAPH_CACHE_HITS.inc()
+            return graph
+        
+        _registry_stats["cache_misses"] += 1
+        graph = GRAPH_BUILDERS[variant]()
+        _compiled_graphs[variant] = graph
+        _graph_fingerprints[variant] = fingerprint
+        _registry_stats["compile_count"] += 1
+        GRAPH_COMPILES.inc()
+    
+    log_event(
+        unit="graph_executor",
+        level="INFO",
+        event="graph_compiled",
+        message=f"Compiled graph variant: {variant}",
+        variant=variant,
+        compile_count=_registry_stats["compile_count"]
+    )
+    
+    return graph
+
+def warm_graph_registry() -> None:
+    """Compile all graph variants ahead of the first request."""
+    for variant in GRAPH_BUILDERS:
+        get_compiled_graph(variant)
+
+def invalidate_graph_registry(variant: Optional[str] = None) -> int:
+    """
+    Drop compiled graphs so that they are recompiled on next use.
+    
+    The next lookup also checks graph.policy.yaml again right away.
+    
+    Args:
+        variant: Optional variant to invalidate (all variants if omitted)
+        
+    Returns:
+        Number of compiled graphs that were dropped
+    """
+    global _fingerprint_checked_at
+    with _registry_lock:
+        _fingerprint_checked_at = None
+        variants = [variant] if variant else list(_compiled_graphs)
+        dropped = 0
+        for name in variants:
+            if _compiled_graphs.pop(name, None) is not None:
+                dropped += 1
+            _graph_fingerprints.pop(name, None)
+        _registry_stats["invalidations"] += 1
+    
+    log_event(
+        unit="graph_executor",
+        level="INFO",
+        event="graph_registry_invalidated",
+        message="Invalidated compiled graphs",
+        variant=variant or "all",
+        dropped=dropped
+    )
+    
+    return dropped
+
+def get_graph_registry_stats() -> Dict[str, Any]:
+    """
+    Get compile and cache statistics of the graph registry.
+    
+    Returns:
+        Dictionary with the registry counters and the compiled variants
+    """
+    with _registry_lock:
+        stats = dict(_registry_stats)
+        stats["compiled_variants"] = sorted(_compiled_graphs)
+    return stats
 
 def invoke_graph(user_input: str, policy: dict = {}) -> dict:
     """
@@ -40,7 +250,7 @@ def invoke_graph(user_input: str, policy: dict = {}) -> dict:
         state = {"input": user_input, "policy": policy}
         
         # Invoke the graph
-        result = build_graph().invoke(state)
+        result = get_compiled_graph().invoke(state)
         
         # Log successful execution
         log_event(
@@ -55,6 +265,7 @@ def invoke_graph(user_input: str, policy: dict = {}) -> dict:
         return result
         
     except Exception as e:
+        GRAPH_ERRORS.inc(mode="sync")
         # Log error
         log_event(
             unit="graph_executor",
@@ -65,4 +276,288 @@ def invoke_graph(user_input: str, policy: dict = {}) -> dict:
         )
         
         # Re-raise the exception
-        raise
\ No newline at end of file
+        raise
+
+def _normalize_policy(policy: Any) -> Any:
+    """Drop unset (None) values so that equivalent policies compare equal."""
+    if isinstance(policy, dict):
+        return {key: _normalize_policy(value) for key, value in policy.items() if value is not None}
+    if isinstance(policy, (list, tuple)):
+        return [_normalize_policy(value) for value in policy]
+    return policy
+
+def request_key(user_input: str, policy: Optional[dict]) -> str:
+    """
+    Build the canonical hash identifying an inference request.
+    
+    Args:
+        user_input: The user's input text
+        policy: The policy dictionary (None is treated as empty)
+        
+    Returns:
+        Hex digest of the canonical JSON form of input and normalized policy
+    """
+    canonical = json.dumps(
+        {"input": user_input, "policy": _normalize_policy(policy or {})},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+async def ainvoke_graph(user_input: str, policy: dict = {}, coalesce: bool = True) -> dict:
+    """
+    Invoke the async LangGraph with the given user input and policy.
+    
+    All downstream calls are awaited on the event loop, so concurrent
+    invocations overlap their I/O instead of blocking each other.
+    Concurrent calls with the same input and policy are coalesced: only the
+    first one runs the graph, the others await it and share its result.
+    
+    Args:
+        user_input: The user's input text
+        policy: Optional policy dictionary to control graph behavior
+        coalesce: Whether to share the execution with identical in-flight calls
+        
+    Returns:
+        The final state after graph execution
+    """
+    if not coalesce:
+        _coalescing_stats["executions"] += 1
+        GRAPH_EXECUTIONS.inc()
+        return await _ainvoke_graph_once(user_input, policy)
+    
+    key = request_key(user_input, policy)
+    task = _in_flight.get(key)
+    
+    if task is None or task.done():
+        # First caller: start the execution and register it for duplicates
+        _coalescing_stats["executions"] += 1
+        GRAPH_EXECUTIONS.inc()
+        task = asyncio.ensure_future(_ainvoke_graph_once(user_input, policy))
+        _in_flight[key] = task
+        task.add_done_callback(lambda finished: _in_flight.pop(key, None) if _in_flight.get(key) is finished else None)
+    else:
+        _coalescing_stats["coalesced"] += 1
+        GRAPH_COALESCED_CALLS.inc()
+        log_event(
+            unit="graph_executor",
+            level="DEBUG",
+            event="graph_invocation_coalesced",
+            message="Joined identical in-flight graph execution",
+            request_key=key[:16]
+        )
+    
+    # Shield the shared execution so that one cancelled caller does not cancel the others
+    result = await asyncio.shield(task)
+    
+    # Every caller gets its own copy of the shared result
+    return copy.deepcopy(result)
+
+def get_coalescing_stats() -> Dict[str, int]:
+    """
+    Get request coalescing statistics.
+    
+    Returns:
+        Dictionary with the number of graph executions, the number of calls
+        collapsed into an in-flight execution and the current in-flight count
+    """
+    stats = dict(_coalescing_stats)
+    stats["in_flight"] = len(_in_flight)
+    return stats
+
+async def _ainvoke_graph_once(user_input: str, policy: dict) -> dict:
+    """Run one async graph execution (without coalescing)."""
+    # Log the graph invocation
+    log_event(
+        unit="graph_executor",
+        level="INFO",
+        event="graph_invocation_started",
+        message="Starting graph execution",
+        input_length=len(user_input),
+        has_policy=bool(policy)
+    )
+    
+    try:
+        # Prepare the initial state
+        state = {"input": user_input, "policy": policy}
+        
+        # Invoke the graph
+        result = await get_compiled_graph(ASYNC_GRAPH_VARIANT).ainvoke(state)
+        
+        # Log successful execution
+        log_event(
+            unit="graph_executor",
+            level="INFO",
+            event="graph_invocation_completed",
+            message="Graph execution completed successfully",
+            output_length=len(result.get("output", "")),
+            nodes_visited=len(result.get("nodes_visited", []))
+        )
+        
+        return result
+        
+    except Exception as e:
+        GRAPH_ERRORS.inc(mode="async")
+        # Log error
+        log_event(
+            unit="graph_executor",
+            level="ERROR",
+            event="graph_invocation_failed",
+            message=f"Error during graph execution: {str(e)}",
+            error=str(e)
+        )
+        
+        # Re-raise the exception
+        raise
+
+async def ainvoke_graph_batch(items: List[Tuple[str, dict]], concurrency: int) -> List[Dict[str, Any]]:
+    """
+    Invoke the async LangGraph for many independent inputs.
+    
+    At most `concurrency` items run at the same time. Memory reads that all
+    items share (the global "context" key) are done once for the batch, and
+    only one summary event is logged instead of one per item.
+    
+    Args:
+        items: List of (user_input, policy) tuples
+        concurrency: Maximum number of items executed concurrently
+        
+    Returns:
+        One dictionary per item, in input order, with either a "result" key
+        holding the final state or an "error" key, plus "duration_ms"
+    """
+    start_time = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    graph = get_compiled_graph(ASYNC_GRAPH_VARIANT)
+    
+    # Shared memory reads for the whole batch
+    shared_memory = await prefetch_shared_memory()
+    
+    async def run_item(user_input: str, policy: dict) -> Dict[str, Any]:
+        async with semaphore:
+            item_start = time.perf_counter()
+            try:
+                state = {"input": user_input, "policy": policy, **shared_memory}
+                result = await graph.ainvoke(state)
+                outcome = {"result": result}
+            except Exception as e:
+                GRAPH_ERRORS.inc(mode="batch")
+                outcome = {"error": str(e)}
+            outcome["duration_ms"] = int((time.perf_counter() - item_start) * 1000)
+            return outcome
+    
+    outcomes = await asyncio.gather(*[run_item(user_input, policy) for user_input, policy in items])
+    
+    failed = sum(1 for outcome in outcomes if "error" in outcome)
+    log_event(
+        unit="graph_executor",
+        level="WARNING" if failed else "INFO",
+        event="graph_batch_completed",
+        message=f"Batch graph execution completed: {len(items) - failed} succeeded, {failed} failed",
+        item_count=len(items),
+        failed_count=failed,
+        concurrency=concurrency,
+        duration_ms=int((time.perf_counter() - start_time) * 1000)
+    )
+    
+    return outcomes
+
+async def astream_graph(user_input: str, policy: dict = {}) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the async LangGraph and yield progress frames while it executes.
+    
+    Frames are dictionaries with a "type" key:
+    - "node": a node completed ("node", "duration_ms", "elapsed_ms")
+    - "token": a chunk of LLM output arrived ("text")
+    - "result": the graph finished ("output", "nodes_visited")
+    - "error": the graph failed ("error")
+    
+    Closing the iterator early cancels the graph execution.
+    
+    Args:
+        user_input: The user's input text
+        policy: Optional policy dictionary to control graph behavior
+        
+    Yields:
+        Progress frames in the order the events happened
+    """
+    # Log the graph invocation
+    log_event(
+        unit="graph_executor",
+        level="INFO",
+        event="graph_stream_started",
+        message="Starting streamed graph execution",
+        input_length=len(user_input),
+        has_policy=bool(policy)
+    )
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    
+    async def run() -> None:
+        # The sink is only visible inside this task's context
+        LLM_TOKEN_SINK.set(lambda chunk: queue.put_nowait({"type": "token", "text": chunk}))
+        try:
+            state = {"input": user_input, "policy": policy}
+            graph = get_compiled_graph(ASYNC_GRAPH_VARIANT)
+            start = last = time.perf_counter()
+            result: Dict[str, Any] = {}
+            async for update in graph.astream(state, stream_mode="updates"):
+                now = time.perf_counter()
+                for node, node_state in update.items():
+                    result = node_state or result
+                    queue.put_nowait({
+                        "type": "node",
+                        "node": node.upper(),
+                        "duration_ms": round((now - last) * 1000, 2),
+                        "elapsed_ms": round((now - start) * 1000, 2)
+                    })
+                last = now
+            
+            queue.put_nowait({
+                "type": "result",
+                "output": result.get("output", ""),
+                "nodes_visited": result.get("nodes_visited", [])
+            })
+            
+            # Log successful execution
+            log_event(
+                unit="graph_executor",
+                level="INFO",
+                event="graph_stream_completed",
+                message="Streamed graph execution completed successfully",
+                output_length=len(result.get("output", "")),
+                nodes_visited=len(result.get("nodes_visited", []))
+            )
+        except Exception as e:
+            GRAPH_ERRORS.inc(mode="stream")
+            # Log error
+            log_event(
+                unit="graph_executor",
+                level="ERROR",
+                event="graph_stream_failed",
+                message=f"Error during streamed graph execution: {str(e)}",
+                error=str(e)
+            )
+            queue.put_nowait({"type": "error", "error": str(e)})
+        finally:
+            queue.put_nowait(finished)
+    
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            frame = await queue.get()
+            if frame is finished:
+                break
+            yield frame
+    finally:
+        # Stop the graph if the consumer went away before it finished
+        if not task.done():
+            task.cancel()
+            log_event(
+                unit="graph_executor",
+                level="INFO",
+                event="graph_stream_cancelled",
+                message="Streamed graph execution cancelled by the client"
+            )
@@ -0,0 +1,366 @@
+# 📄 Script: log_index.py
+# 🔧 Zweck: Zeitindex und Abfrage-/Aggregations-Engine für die JSON-Linien-Logs
+# 🗂 Pfad: mcp_units/mcp_agent_interaction_engine/log_index.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: os, re, json, bisect, threading, numpy
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Modul führt pro Logsegment einen dünn besetzten Index von Zeitstempeln
+# HINWEIS (MCP): auf Byte-Offsets. Zeitbereichsabfragen springen damit direkt an die passende Stelle,
+# HINWEIS (MCP): statt die Dateien vollständig zu lesen. Darauf aufbauend werden Filter und
+# HINWEIS (MCP): Aggregationen (Anzahl, Perzentile, Gruppierung) berechnet; numerische Felder werden
+# HINWEIS (MCP): mit numpy vektorisiert ausgewertet (requirements.txt). Ohne numpy, etwa bei lokalen
+# HINWEIS (MCP): Tests, rechnet eine reine Python-Variante dieselben Werte.
+
+import os
+import re
+import json
+import bisect
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - installed with requirements.txt
+    np = None
+
+# Use absolute imports when running the script directly
+from logger import LOG_DIR, get_log_segments, open_log_segment
+from log_reader import parse_log_timestamp
+
+# One index entry per this many bytes of a segment
+INDEX_INTERVAL_BYTES = 64 * 1024
+
+# Entries of different processes may be slightly out of order; range scans
+# start and stop this many seconds outside the requested window
+LOG_TIME_SKEW_SECONDS = 2.0
+
+DEFAULT_PERCENTILES = (50.0, 95.0, 99.0)
+
+_UNIT_PATTERN = re.compile(r"^(?P<unit>.+?)(?:\.\d{8}T\d{6}(?:-\d+)?)?\.log(?:\.gz)?$")
+
+class SegmentIndex:
+    """
+    Sparse timestamp to offset index of one log segment.
+
+    Every INDEX_INTERVAL_BYTES the timestamp and offset of the next line are
+    recorded, together with the first and last timestamp of the segment.
+    Segments only grow by appending, so the index of the active file is
+    extended from where the previous scan stopped. Concurrent queries share
+    the index; only one thread extends it at a time.
+    """
+
+    def __init__(self, path: str, inode: int):
+        self.path = path
+        self.inode = inode
+        self.timestamps: List[float] = []
+        self.offsets: List[int] = []
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        # Offset after the last complete line that was indexed
+        self.indexed_size = 0
+        self._next_boundary = 0
+        self._lock = threading.Lock()
+
+    def update(self) -> None:
+        """Index the lines appended since the last update."""
+        with self._lock, open_log_segment(self.path, binary=True) as f:
+            f.seek(self.indexed_size)
+            offset = self.indexed_size
+            last_line = None
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Incomplete line still being written
+                    break
+                if offset >= self._next_boundary or self.first_ts is None:
+                    timestamp = _line_timestamp(line)
+                    if timestamp is not None:
+                        if self.first_ts is None:
+                            self.first_ts = timestamp
+                        if offset >= self._next_boundary:
+                            self.timestamps.append(timestamp)
+                            self.offsets.append(offset)
+                            self._next_boundary = offset + INDEX_INTERVAL_BYTES
+                if line.strip():
+                    last_line = line
+                offset += len(line)
+            if last_line is not None:
+                timestamp = _line_timestamp(last_line)
+                if timestamp is not None:
+                    self.last_ts = timestamp
+            self.indexed_size = offset
+
+    def seek_offset(self, start: Optional[float]) -> int:
+        """
+        Get the offset from which a scan for entries at or after start must begin.
+
+        Args:
+            start: Start of the time range (epoch seconds), None for the beginning
+
+        Returns:
+            Byte offset of an indexed line
+        """
+        # A concurrent update appends the timestamp before its offset
+        count = len(self.offsets)
+        if start is None or not count:
+            return 0
+        position = bisect.bisect_left(self.timestamps, start - LOG_TIME_SKEW_SECONDS, 0, count) - 1
+        return self.offsets[position] if position >= 0 else 0
+
+    def overlaps(self, start: Optional[float], end: Optional[float]) -> bool:
+        """Check whether the segment may contain entries of the time range."""
+        if start is not None and self.last_ts is not None and self.last_ts < start - LOG_TIME_SKEW_SECONDS:
+            return False
+        if end is not None and self.first_ts is not None and self.first_ts > end + LOG_TIME_SKEW_SECONDS:
+            return False
+        return True
+
+def _line_timestamp(line: bytes) -> Optional[float]:
+    """Get the timestamp of a raw log line."""
+    try:
+        return parse_log_timestamp(json.loads(line).get("timestamp"))
+    except (ValueError, AttributeError):
+        return None
+
+# Index cache, keyed by segment path
+_indexes: Dict[str, SegmentIndex] = {}
+_index_lock = threading.Lock()
+
+def _inode_of(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+def get_segment_index(path: str) -> SegmentIndex:
+    """
+    Get the up-to-date index of a segment, building or extending it as needed.
+
+    A segment renamed by rotation keeps its inode, so the index built while
+    it was the active file is reused under the new name. Compressed segments
+    are indexed on their decompressed content. A truncated segment gets a
+    new index; concurrent callers share it, and SegmentIndex.update
+    serializes the scans.
+
+    Args:
+        path: Path of the segment
+
+    Returns:
+        The segment index
+    """
+    stat = os.stat(path)
+    with _index_lock:
+        index = _indexes.get(path)
+        if index is None or index.inode != stat.st_ino:
+            index = None
+            for cached_path, cached in list(_indexes.items()):
+                if cached.inode == stat.st_ino and _inode_of(cached_path) != cached.inode:
+                    index = _indexes.pop(cached_path)
+                    index.path = path
+                    break
+            if index is None:
+                index = SegmentIndex(path, stat.st_ino)
+            _indexes[path] = index
+        elif not path.endswith(".gz") and stat.st_size < index.indexed_size:
+            # Truncated: start over
+            index = _indexes[path] = SegmentIndex(path, stat.st_ino)
+    if path.endswith(".gz"):
+        if index.indexed_size == 0:
+            index.update()
+    elif stat.st_size != index.indexed_size:
+        index.update()
+    return index
+
+def prune_segment_indexes() -> int:
+    """
+    Forget the indexes of segments that no longer exist.
+
+    Returns:
+        Number of removed indexes
+    """
+    with _index_lock:
+        removed = [path for path, index in _indexes.items() if _inode_of(path) != index.inode]
+        for path in removed:
+            del _indexes[path]
+    return len(removed)
+
+def list_log_units(log_dir: Optional[str] = None) -> List[str]:
+    """
+    Get the names of all units that have log files.
+
+    Args:
+        log_dir: Directory of the log files; defaults to LOG_DIR
+
+    Returns:
+        Sorted list of unit names
+    """
+    try:
+        names = os.listdir(log_dir or LOG_DIR)
+    except FileNotFoundError:
+        return []
+    units = set()
+    for name in names:
+        match = _UNIT_PATTERN.match(name)
+        if match:
+            units.add(match.group("unit"))
+    return sorted(units)
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """
+    Get a percentile of sorted values with linear interpolation.
+
+    Matches numpy.percentile with the default "linear" method.
+    """
+    if not sorted_values:
+        raise ValueError("percentile of empty sequence")
+    rank = (len(sorted_values) - 1) * q / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+def summarize_values(values: "array", percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    """
+    Compute count, min, max, mean and percentiles of numeric values.
+
+    Uses numpy when available; otherwise falls back to sorting in Python.
+
+    Args:
+        values: The values as array('d')
+        percentiles: Percentiles to compute (0-100)
+
+    Returns:
+        Dictionary with the statistics; percentiles are named p50, p99.9, ...
+    """
+    count = len(values)
+    if count == 0:
+        return {"count": 0}
+    if np is not None:
+        data = np.frombuffer(values, dtype=np.float64)
+        stats = {"count": count, "min": float(data.min()), "max": float(data.max()), "mean": float(data.mean())}
+        computed = np.percentile(data, list(percentiles)) if percentiles else []
+        stats.update({_percentile_name(q): float(value) for q, value in zip(percentiles, computed)})
+        return stats
+    ordered = sorted(values)
+    stats = {"count": count, "min": ordered[0], "max": ordered[-1], "mean": sum(ordered) / count}
+    stats.update({_percentile_name(q): percentile(ordered, q) for q in percentiles})
+    return stats
+
+def _percentile_name(q: float) -> str:
+    return f"p{q:g}"
+
+def _field_matches(entry: Dict[str, Any], fields: Dict[str, str]) -> bool:
+    for key, expected in fields.items():
+        if key not in entry or str(entry[key]) != expected:
+            return False
+    return True
+
+def query_logs(units: Optional[List[str]] = None, start: Optional[float] = None, end: Optional[float] = None,
+               event: Optional[str] = None, level: Optional[str] = None,
+               fields: Optional[Dict[str, str]] = None, metric: Optional[str] = None,
+               percentiles: Sequence[float] = DEFAULT_PERCENTILES, group_by: Optional[List[str]] = None,
+               limit: int = 0, log_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Scan the logs of a time range, filter them and compute aggregations.
+
+    Segments outside the range are skipped using their first and last
+    timestamp; inside a segment, the sparse index gives the offset where the
+    scan starts, and the scan stops once entries are past the range end.
+
+    Args:
+        units: Units to query; all units with log files if None
+        start: Start of the time range (epoch seconds, inclusive)
+        end: End of the time range (epoch seconds, inclusive)
+        event: Only entries with this event type
+        level: Only entries with this level (comma-separated list allowed)
+        fields: Only entries whose fields equal these values (compared as strings)
+        metric: Numeric field to compute statistics for (e.g. "duration_ms")
+        percentiles: Percentiles of the metric to compute
+        group_by: Fields to group the results by (e.g. ["event"] or ["unit", "event"])
+        limit: Number of matching entries to return as records (0 for none)
+        log_dir: Directory of the log files; defaults to LOG_DIR
+
+    Returns:
+        Dictionary with the number of scanned and matched entries, one result
+        per group (count and metric statistics) and the first matching records
+    """
+    log_dir = log_dir or LOG_DIR
+    units = units if units is not None else list_log_units(log_dir)
+    prune_segment_indexes()
+    levels = {item.strip().upper() for item in level.split(",") if item.strip()} if level else None
+    fields = fields or {}
+    group_by = group_by or []
+
+    groups: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+    records: List[Dict[str, Any]] = []
+    scanned = 0
+    matched = 0
+
+    for unit in units:
+        for path in get_log_segments(unit, log_dir):
+            try:
+                index = get_segment_index(path)
+            except FileNotFoundError:
+                continue
+            if not index.overlaps(start, end):
+                continue
+            with open_log_segment(path, binary=True) as f:
+                f.seek(index.seek_offset(start))
+                remaining = index.indexed_size - f.tell()
+                for line in f:
+                    remaining -= len(line)
+                    if remaining < 0:
+                        # Past the indexed part; lines appended later are left for the next query
+                        break
+                    scanned += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(entry, dict):
+                        continue
+                    if start is not None or end is not None:
+                        timestamp = parse_log_timestamp(entry.get("timestamp"))
+                        if timestamp is None:
+                            continue
+                        if end is not None and timestamp > end:
+                            if timestamp > end + LOG_TIME_SKEW_SECONDS:
+                                break
+                            continue
+                        if start is not None and timestamp < start:
+                            continue
+                    if event is not None and entry.get("event") != event:
+                        continue
+                    if levels is not None and str(entry.get("level", "")).upper() not in levels:
+                        continue
+                    if fields and not _field_matches(entry, fields):
+                        continue
+
+                    matched += 1
+                    key = tuple(str(entry.get(name, "")) for name in group_by)
+                    group = groups.get(key)
+                    if group is None:
+                        group = groups[key] = {"count": 0, "values": array("d")}
+                    group["count"] += 1
+                    if metric is not None:
+                        value = entry.get(metric)
+                        if isinstance(value, (int, float)) and not isinstance(value, bool):
+                            group["values"].append(value)
+                    if len(records) < limit:
+                        records.append(entry)
+
+    results = []
+    for key, group in sorted(groups.items(), key=lambda item: -item[1]["count"]):
+        result = {"group": dict(zip(group_by, key)), "count": group["count"]}
+        if metric is not None:
+            result["metric"] = summarize_values(group["values"], percentiles)
+        results.append(result)
+
+    return {
+        "units": units,
+        "scanned": scanned,
+        "matched": matched,
+        "metric": metric,
+        "groups": results,
+        "records": records
+    }
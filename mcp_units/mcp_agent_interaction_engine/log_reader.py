@@ -0,0 +1,363 @@
+# 📄 Script: log_reader.py
+# 🔧 Zweck: Rückwärts lesender Tail-Reader für JSON-Linien-Logs
+# 🗂 Pfad: mcp_units/mcp_agent_interaction_engine/log_reader.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: os, io, gzip, json, base64
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Modul liest die letzten Zeilen der Logdateien einer Einheit, indem es
+# HINWEIS (MCP): blockweise vom Dateiende rückwärts liest, statt die ganze Datei zu laden.
+# HINWEIS (MCP): Es unterstützt Filter (Level, Event, Zeitpunkt) und Cursor-basierte Paginierung
+# HINWEIS (MCP): über rotierte Segmente hinweg. LogFollower verfolgt die aktive Logdatei
+# HINWEIS (MCP): wie `tail -f` und erkennt Anhängen, Rotation und Kürzung per stat().
+
+import io
+import os
+import gzip
+import json
+import base64
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Use absolute imports when running the script directly
+from logger import get_log_segments, get_log_file_path
+
+# Size of the blocks read backwards from the end of a file
+TAIL_BLOCK_SIZE = 64 * 1024
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def parse_log_timestamp(value: Any) -> Optional[float]:
+    """
+    Parse a log timestamp into epoch seconds.
+
+    Accepts ISO 8601 timestamps with or without fraction and trailing "Z";
+    older entries carrying a literal ".%f" fraction are accepted as well.
+    Timestamps without a zone are taken as UTC.
+
+    Args:
+        value: The timestamp string
+
+    Returns:
+        Epoch seconds, or None if the value cannot be parsed
+    """
+    if not isinstance(value, str) or not value:
+        return None
+    text = value.strip().replace(".%f", "")
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def encode_cursor(segment: str, offset: int) -> str:
+    """
+    Encode a position in a log segment as an opaque cursor.
+
+    The cursor records the segment's file name and inode; a rename during
+    rotation keeps the inode, so the cursor stays valid when the active file
+    becomes a rotated segment.
+
+    Args:
+        segment: Path of the segment
+        offset: Byte offset of the oldest line already returned
+
+    Returns:
+        The cursor string
+    """
+    try:
+        inode = os.stat(segment).st_ino
+    except OSError:
+        inode = 0
+    payload = json.dumps({"s": os.path.basename(segment), "i": inode, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor created by encode_cursor.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {"segment": str(payload["s"]), "inode": int(payload["i"]), "offset": int(payload["o"])}
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+def _resolve_cursor(segments: List[str], cursor: Dict[str, Any]) -> Optional[int]:
+    """Find the index of the segment a cursor points into."""
+    for index, segment in enumerate(segments):
+        try:
+            if cursor["inode"] and os.stat(segment).st_ino == cursor["inode"]:
+                return index
+        except OSError:
+            continue
+    # Compression replaces the file, but the decompressed offsets are unchanged
+    for index, segment in enumerate(segments):
+        name = os.path.basename(segment)
+        if name == cursor["segment"] or name == cursor["segment"] + ".gz":
+            return index
+    return None
+
+def iter_lines_reverse(path: str, end: Optional[int] = None,
+                       block_size: int = TAIL_BLOCK_SIZE) -> Iterator[Tuple[int, str]]:
+    """
+    Iterate over the lines of a log file from the end towards the start.
+
+    Plain files are read backwards in blocks of block_size bytes, so only
+    the part that is actually consumed is read. Compressed segments cannot
+    be read backwards and are decompressed into memory first.
+
+    Args:
+        path: Path of the log file
+        end: Only consider bytes before this offset (default: end of file)
+        block_size: Size of the blocks read from the file
+
+    Yields:
+        Tuples of (byte offset of the line start, line without newline);
+        empty lines are skipped
+    """
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            source = io.BytesIO(f.read())
+    else:
+        source = open(path, "rb")
+    with source:
+        source.seek(0, io.SEEK_END)
+        size = source.tell()
+        pos = size if end is None else max(0, min(end, size))
+        buffer = b""
+        while pos > 0:
+            read = min(block_size, pos)
+            pos -= read
+            source.seek(pos)
+            buffer = source.read(read) + buffer
+            parts = buffer.split(b"\n")
+            # parts[0] may continue in the previous block
+            line_end = pos + len(buffer)
+            for part in reversed(parts[1:]):
+                start = line_end - len(part)
+                if part.strip():
+                    yield start, part.decode("utf-8", errors="replace").strip()
+                line_end = start - 1
+            buffer = parts[0]
+        if buffer.strip():
+            yield 0, buffer.decode("utf-8", errors="replace").strip()
+
+def _matches(line: str, levels: Optional[set], event: Optional[str],
+             since: Optional[float]) -> Tuple[bool, bool]:
+    """
+    Check a line against the filters.
+
+    Returns:
+        Tuple of (matches, older_than_since); the second flag ends the scan
+        because lines are written in chronological order
+    """
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return False, False
+    if not isinstance(entry, dict):
+        return False, False
+    if since is not None:
+        timestamp = parse_log_timestamp(entry.get("timestamp"))
+        if timestamp is not None and timestamp < since:
+            return False, True
+    if levels is not None and str(entry.get("level", "")).upper() not in levels:
+        return False, False
+    if event is not None and entry.get("event") != event:
+        return False, False
+    return True, False
+
+def _parse_levels(level: Optional[str]) -> Optional[set]:
+    """Parse a comma-separated level filter."""
+    if not level:
+        return None
+    return {item.strip().upper() for item in level.split(",") if item.strip()}
+
+def make_line_filter(level: Optional[str] = None,
+                     event: Optional[str] = None) -> Optional[Callable[[str], bool]]:
+    """
+    Build a predicate for log lines from level and event filters.
+
+    Args:
+        level: Only accept lines with this level (comma-separated list allowed)
+        event: Only accept lines with this event type
+
+    Returns:
+        The predicate, or None if no filter is set
+    """
+    levels = _parse_levels(level)
+    if levels is None and event is None:
+        return None
+    return lambda line: _matches(line, levels, event, None)[0]
+
+def tail_log_lines(unit: str, limit: int, level: Optional[str] = None, event: Optional[str] = None,
+                   since: Optional[float] = None, cursor: Optional[str] = None,
+                   log_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Read the newest log lines of a unit, optionally filtered and paginated.
+
+    Segments are scanned from the newest line backwards until limit matching
+    lines are found, the since bound is passed or all segments are read.
+
+    Args:
+        unit: The name of the unit (component)
+        limit: Maximum number of lines to return
+        level: Only return lines with this level (comma-separated list allowed)
+        event: Only return lines with this event type
+        since: Only return lines at or after this time (epoch seconds)
+        cursor: next_cursor of a previous call to continue with older lines
+        log_dir: Directory of the log files; defaults to the logger's LOG_DIR
+
+    Returns:
+        Dictionary with "logs" (oldest first), "next_cursor" (None when there
+        are no older lines) and "segments" (number of segments of the unit)
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    segments = get_log_segments(unit, log_dir)
+    levels = _parse_levels(level)
+    filtered = levels is not None or event is not None or since is not None
+
+    start_index = len(segments) - 1
+    start_offset = None
+    if cursor:
+        position = decode_cursor(cursor)
+        start_index = _resolve_cursor(segments, position)
+        if start_index is None:
+            return {"logs": [], "next_cursor": None, "segments": len(segments)}
+        start_offset = position["offset"]
+
+    collected: List[str] = []
+    next_cursor = None
+    last_segment, last_offset = None, 0
+    done = False
+    for index in range(start_index, -1, -1):
+        segment = segments[index]
+        end = start_offset if index == start_index else None
+        for offset, line in iter_lines_reverse(segment, end):
+            if filtered:
+                matches, passed_since = _matches(line, levels, event, since)
+                if passed_since:
+                    done = True
+                    break
+                if not matches:
+                    continue
+            if len(collected) == limit:
+                # There is at least one more line; continue after the last returned one
+                next_cursor = encode_cursor(last_segment, last_offset)
+                done = True
+                break
+            collected.append(line)
+            last_offset = offset
+            last_segment = segment
+        if done:
+            break
+
+    collected.reverse()
+    return {"logs": collected, "next_cursor": next_cursor, "segments": len(segments)}
+
+class LogFollower:
+    """
+    Follow the active log file of a unit like `tail -f`.
+
+    Each poll() costs one stat() call while nothing changed. New bytes are
+    read from the open handle; a changed inode means the file was rotated,
+    in which case the rest of the old file is drained before the new file is
+    read from its start. A file that shrank was truncated and is re-read from
+    the start. Incomplete trailing lines are kept until their newline arrives.
+    """
+
+    def __init__(self, unit: str, log_dir: Optional[str] = None, from_start: bool = False):
+        self.unit = unit
+        self.path = os.path.join(log_dir, f"{unit}.log") if log_dir else get_log_file_path(unit)
+        self._file = None
+        self._inode = None
+        self._position = 0
+        self._buffer = b""
+        self._open(seek_end=not from_start)
+
+    def _open(self, seek_end: bool) -> None:
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            self._file = None
+            return
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        if seek_end:
+            self._file.seek(0, io.SEEK_END)
+        self._position = self._file.tell()
+        self._buffer = b""
+
+    def cursor(self) -> Optional[str]:
+        """
+        Get a cursor for tail_log_lines pointing at the current position.
+
+        Reading with this cursor returns exactly the lines before the part
+        that poll() will deliver, so a backlog and the followed lines neither
+        overlap nor leave a gap.
+
+        Returns:
+            The cursor, or None if the file does not exist yet
+        """
+        if self._file is None:
+            return None
+        return encode_cursor(self.path, self._position)
+
+    def _read_available(self, final: bool = False) -> List[str]:
+        """Read the complete lines appended since the last read."""
+        data = self._file.read()
+        self._position = self._file.tell()
+        if not data and not (final and self._buffer):
+            return []
+        parts = (self._buffer + data).split(b"\n")
+        self._buffer = b"" if final else parts.pop()
+        return [part.decode("utf-8", errors="replace").strip() for part in parts if part.strip()]
+
+    def poll(self) -> List[str]:
+        """
+        Get the lines appended since the last poll.
+
+        Returns:
+            New lines, oldest first
+        """
+        if self._file is None:
+            # The file did not exist yet; once it appears, read it from the start
+            self._open(seek_end=False)
+            if self._file is None:
+                return []
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and stat.st_ino == self._inode:
+            if stat.st_size < self._position:
+                self._file.seek(0)
+                self._position = 0
+                self._buffer = b""
+            elif stat.st_size == self._position:
+                return []
+            return self._read_available()
+
+        # Rotated or removed: drain the old file, then switch to the new one
+        lines = self._read_available(final=True)
+        self.close()
+        if stat is not None:
+            self._open(seek_end=False)
+            if self._file is not None:
+                lines.extend(self._read_available())
+        return lines
+
+    def close(self) -> None:
+        """Close the followed file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -3,18 +3,33 @@
 # 🗂 Pfad: mcp_units/mcp_agent_interaction_engine/logger.py
 # 👤 Autor: MINT-RESEARCH
 # 📅 Erstellt: 2025-04-13
-# 🧱 Benötigte Pakete: json, os, time
+# 🧱 Benötigte Pakete: json, os, time, threading, queue, gzip, yaml
 # 🧪 Testbar: ✅
 # HINWEIS (MCP): Dieser Dienst implementiert einen JSON-Linien-Logger für das MCP-System.
 # HINWEIS (MCP): Er schreibt strukturierte Logs im JSON-Format in Dateien im logs/system-Verzeichnis,
 # HINWEIS (MCP): wobei jede Einheit ihre eigene Logdatei erhält.
+# HINWEIS (MCP): Die Einträge werden über eine begrenzte Warteschlange von einem Hintergrund-Thread
+# HINWEIS (MCP): gebündelt geschrieben; beim Beenden werden alle ausstehenden Einträge geschrieben.
+# HINWEIS (MCP): Rotation, Komprimierung und Aufbewahrung der Logdateien richten sich nach
+# HINWEIS (MCP): config/rules/logging.rules.yaml (Abschnitt logging.rotation).
 
 import json
 import os
+import re
+import gzip
 import time
 import sys
+import yaml
+import queue
+import atexit
+import shutil
 import logging
-from typing import Any, Dict, Optional
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+# Use absolute imports when running the script directly
+from metrics import counter
 
 # Configure standard logging
 logging.basicConfig(
@@ -26,6 +41,31 @@ logger = logging.getLogger('mcp_logger')
 
 # Constants
 LOG_DIR = "logs/system"
+LOGGING_RULES_FILE = os.environ.get("MCP_LOGGING_RULES_FILE", "config/rules/logging.rules.yaml")
+
+# Rotation defaults, used when the logging rules cannot be read
+DEFAULT_ROTATION_POLICY = {
+    "policy": "daily",
+    "max_file_size": 10 * 1024 * 1024,
+    "retention_days": 30,
+    "compress_after_days": 7
+}
+
+# Rotated segments are named {unit}.{YYYYmmddTHHMMSS}[-n].log[.gz]
+SEGMENT_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+_SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+# Background writer settings
+LOG_QUEUE_SIZE = int(os.environ.get("MCP_LOG_QUEUE_SIZE", "10000"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("MCP_LOG_FLUSH_INTERVAL", "0.2"))
+LOG_FLUSH_BATCH = int(os.environ.get("MCP_LOG_FLUSH_BATCH", "256"))
+LOG_OVERFLOW_POLICY = os.environ.get("MCP_LOG_OVERFLOW", "drop")
+
+LOG_EVENTS_DROPPED = counter(
+    "mcp_log_events_dropped_total",
+    "Log events dropped because the log writer queue was full",
+    ["unit"]
+)
 
 def ensure_log_directory():
     """Ensure the log directory exists."""
@@ -43,10 +83,443 @@ def get_log_file_path(unit: str) -> str:
     """
     return os.path.join(LOG_DIR, f"{unit}.log")
 
+def parse_size(value: Any) -> int:
+    """
+    Parse a size such as "10MB" or 1024 into bytes.
+    
+    Args:
+        value: Size as number of bytes or string with a B/KB/MB/GB suffix
+        
+    Returns:
+        The size in bytes
+        
+    Raises:
+        ValueError: If the value cannot be parsed
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", str(value).upper())
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+def load_rotation_policy(rules_file: str = LOGGING_RULES_FILE) -> Dict[str, Any]:
+    """
+    Load the log rotation settings from the logging rules.
+    
+    Args:
+        rules_file: Path to logging.rules.yaml
+        
+    Returns:
+        Dictionary with policy, max_file_size (bytes), retention_days and
+        compress_after_days; missing values fall back to the defaults
+    """
+    policy = dict(DEFAULT_ROTATION_POLICY)
+    try:
+        with open(rules_file, "r", encoding="utf-8") as f:
+            rules = yaml.safe_load(f) or {}
+        rotation = (rules.get("logging") or {}).get("rotation") or {}
+        for key in ("policy", "retention_days", "compress_after_days"):
+            if rotation.get(key) is not None:
+                policy[key] = rotation[key]
+        if rotation.get("max_file_size") is not None:
+            policy["max_file_size"] = parse_size(rotation["max_file_size"])
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Error loading log rotation policy from {rules_file}: {e}")
+    return policy
+
+def _segment_pattern(unit: str) -> "re.Pattern":
+    return re.compile(rf"^{re.escape(unit)}\.(\d{{8}}T\d{{6}})(?:-(\d+))?\.log(\.gz)?$")
+
+def get_log_segments(unit: str, log_dir: Optional[str] = None) -> List[str]:
+    """
+    Get all log files of a unit, oldest first.
+    
+    Rotated (and possibly compressed) segments come first, ordered by their
+    rotation time, followed by the active log file if it exists.
+    
+    Args:
+        unit: The name of the unit (component)
+        log_dir: Directory to search; defaults to LOG_DIR
+        
+    Returns:
+        List of file paths
+    """
+    log_dir = log_dir or LOG_DIR
+    pattern = _segment_pattern(unit)
+    segments = []
+    try:
+        names = os.listdir(log_dir)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            segments.append(((match.group(1), int(match.group(2) or 0)), os.path.join(log_dir, name)))
+    paths = [path for _, path in sorted(segments)]
+    active = os.path.join(log_dir, f"{unit}.log")
+    if os.path.exists(active):
+        paths.append(active)
+    return paths
+
+def open_log_segment(path: str, binary: bool = False):
+    """Open a log segment for reading, decompressing .gz segments."""
+    if path.endswith(".gz"):
+        if binary:
+            return gzip.open(path, "rb")
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if binary:
+        return open(path, "rb")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+def cleanup_log_segments(policy: Dict[str, Any], log_dir: Optional[str] = None,
+                         now: Optional[float] = None) -> Dict[str, int]:
+    """
+    Compress and delete rotated segments according to the rotation policy.
+    
+    Segments older than compress_after_days are gzipped, segments older than
+    retention_days are deleted. Ages are taken from the file modification
+    time, which compression preserves. Active log files are never touched.
+    
+    Args:
+        policy: Rotation policy as returned by load_rotation_policy
+        log_dir: Directory to clean up; defaults to LOG_DIR
+        now: Reference time (epoch seconds); defaults to the current time
+        
+    Returns:
+        Dictionary with the number of compressed and deleted segments
+    """
+    log_dir = log_dir or LOG_DIR
+    now = time.time() if now is None else now
+    pattern = re.compile(r"^.+\.\d{8}T\d{6}(?:-\d+)?\.log(\.gz)?$")
+    stats = {"compressed": 0, "deleted": 0}
+    try:
+        names = os.listdir(log_dir)
+    except FileNotFoundError:
+        return stats
+    retention = policy.get("retention_days")
+    compress_after = policy.get("compress_after_days")
+    for name in names:
+        if not pattern.match(name):
+            continue
+        path = os.path.join(log_dir, name)
+        try:
+            mtime = os.path.getmtime(path)
+            age_days = (now - mtime) / 86400
+            if retention is not None and age_days > retention:
+                os.remove(path)
+                stats["deleted"] += 1
+            elif compress_after is not None and age_days > compress_after and not name.endswith(".gz"):
+                tmp_path = path + ".gz.tmp"
+                with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.utime(tmp_path, (mtime, mtime))
+                os.replace(tmp_path, path + ".gz")
+                os.remove(path)
+                stats["compressed"] += 1
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logger.error(f"Error cleaning up log segment {path}: {e}")
+    return stats
+
+class LogWriter:
+    """
+    Background writer for JSON-line log files.
+    
+    Log lines are put on a bounded queue and written by a daemon thread in
+    batches, using one persistent file handle per unit. A batch is written
+    when flush_batch lines are pending or flush_interval seconds passed.
+    When the queue is full, lines are either dropped (and counted) or the
+    caller blocks until there is room, depending on the overflow policy.
+    
+    Before a batch is written, the unit's file is rotated if the batch would
+    exceed max_file_size or, with the daily policy, if the file was started
+    on an earlier day. Compression and retention of rotated segments run in
+    a separate maintenance thread so that they never delay writing.
+    """
+    
+    def __init__(self, max_queue: int = LOG_QUEUE_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL,
+                 flush_batch: int = LOG_FLUSH_BATCH, overflow: str = LOG_OVERFLOW_POLICY,
+                 rotation: Optional[Dict[str, Any]] = None):
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Invalid log overflow policy: {overflow}")
+        self.rotation = rotation if rotation is not None else load_rotation_policy()
+        self.rotations = 0
+        self.flush_interval = flush_interval
+        self.flush_batch = max(1, flush_batch)
+        self.overflow = overflow
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._handles: Dict[str, IO[str]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._periods: Dict[str, str] = {}
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = False
+    
+    def _ensure_started(self) -> None:
+        """Start the writer thread on first use."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mcp-log-writer", daemon=True)
+                self._thread.start()
+                self._schedule_maintenance()
+    
+    def submit(self, unit: str, line: str) -> bool:
+        """
+        Queue a log line for the given unit.
+        
+        Args:
+            unit: The name of the unit (component)
+            line: The serialized log entry without trailing newline
+            
+        Returns:
+            True if the line was queued, False if it was dropped
+        """
+        if self._closed:
+            # After shutdown, write synchronously so late events are not lost;
+            # the file is closed right after, so no descriptor outlives the write
+            self._write_batch([(unit, line)])
+            self._close_handles()
+            return True
+        self._ensure_started()
+        try:
+            if self.overflow == "block":
+                self._queue.put((unit, line))
+            else:
+                self._queue.put_nowait((unit, line))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            LOG_EVENTS_DROPPED.inc(unit=unit)
+            return False
+    
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Wait until all lines queued so far are written to disk.
+        
+        Args:
+            timeout: Maximum time to wait in seconds
+            
+        Returns:
+            True if the queue was flushed in time
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush pending lines, stop the writer thread and close all files."""
+        if self._closed:
+            return
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+        self._close_handles()
+    
+    def _run(self) -> None:
+        """Writer thread: collect lines into batches and write them."""
+        batch: List[Tuple[str, str]] = []
+        stop = False
+        while not stop:
+            waiters = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+            if batch:
+                self._write_batch(batch)
+                batch = []
+            for waiter in waiters:
+                waiter.set()
+        # Drain whatever was queued concurrently with the stop request
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not None:
+                batch.append(item)
+        if batch:
+            self._write_batch(batch)
+    
+    def _handle(self, unit: str) -> IO[str]:
+        """Get the open log file of a unit, opening it on first use."""
+        handle = self._handles.get(unit)
+        if handle is None:
+            ensure_log_directory()
+            handle = self._handles[unit] = open(get_log_file_path(unit), "a")
+            stat = os.fstat(handle.fileno())
+            self._sizes[unit] = stat.st_size
+            # An existing file belongs to the period it was last written in
+            self._periods[unit] = self._period(stat.st_mtime if stat.st_size else time.time())
+        return handle
+    
+    def _period(self, timestamp: float) -> Optional[str]:
+        """Get the rotation period a timestamp falls into (None without time-based rotation)."""
+        if self.rotation.get("policy") == "daily":
+            return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+        if self.rotation.get("policy") == "hourly":
+            return time.strftime("%Y-%m-%dT%H", time.gmtime(timestamp))
+        return None
+    
+    def _needs_rotation(self, unit: str, pending: int) -> bool:
+        """Check whether the unit's file must be rotated before writing pending bytes."""
+        size = self._sizes.get(unit, 0)
+        if size == 0:
+            return False
+        max_size = self.rotation.get("max_file_size")
+        if max_size and size + pending > max_size:
+            return True
+        return self._periods.get(unit) != self._period(time.time())
+    
+    def _rotate(self, unit: str) -> None:
+        """Close the unit's file and rename it to a timestamped segment."""
+        handle = self._handles.pop(unit, None)
+        if handle is not None:
+            handle.close()
+        self._sizes.pop(unit, None)
+        self._periods.pop(unit, None)
+        stamp = time.strftime(SEGMENT_TIMESTAMP_FORMAT, time.gmtime())
+        segment = os.path.join(LOG_DIR, f"{unit}.{stamp}.log")
+        counter_suffix = 1
+        while os.path.exists(segment) or os.path.exists(segment + ".gz"):
+            segment = os.path.join(LOG_DIR, f"{unit}.{stamp}-{counter_suffix}.log")
+            counter_suffix += 1
+        try:
+            os.replace(get_log_file_path(unit), segment)
+        except FileNotFoundError:
+            # The active file was removed externally; just start a new one
+            return
+        self.rotations += 1
+        self._schedule_maintenance()
+    
+    def _schedule_maintenance(self) -> None:
+        """Compress and expire old segments in the background unless already running."""
+        if self._maintenance_thread is not None and self._maintenance_thread.is_alive():
+            return
+        self._maintenance_thread = threading.Thread(
+            target=cleanup_log_segments,
+            args=(self.rotation, LOG_DIR),
+            name="mcp-log-maintenance",
+            daemon=True
+        )
+        self._maintenance_thread.start()
+    
+    def _write_batch(self, batch: List[Tuple[str, str]]) -> None:
+        """Write a batch of lines grouped by unit and flush the touched files."""
+        grouped: Dict[str, List[str]] = {}
+        for unit, line in batch:
+            grouped.setdefault(unit, []).append(line)
+        with self._write_lock:
+            for unit, lines in grouped.items():
+                try:
+                    data = "\n".join(lines) + "\n"
+                    self._handle(unit)
+                    if self._needs_rotation(unit, len(data)):
+                        self._rotate(unit)
+                    handle = self._handle(unit)
+                    handle.write(data)
+                    handle.flush()
+                    self._sizes[unit] += len(data)
+                except Exception as e:
+                    logger.error(f"Error writing to log file of unit {unit}: {e}")
+                    handle = self._handles.pop(unit, None)
+                    if handle is not None:
+                        # Closing flushes what is still buffered and releases the descriptor
+                        try:
+                            handle.close()
+                        except Exception as close_error:
+                            logger.error(f"Error closing log file of unit {unit}: {close_error}")
+    
+    def _close_handles(self) -> None:
+        with self._write_lock:
+            for handle in self._handles.values():
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+            self._handles.clear()
+            self._sizes.clear()
+            self._periods.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the state of the writer.
+        
+        Returns:
+            Dictionary with queue size, dropped lines and open files
+        """
+        return {
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+            "open_files": len(self._handles),
+            "overflow": self.overflow,
+            "rotations": self.rotations
+        }
+
+# Process-wide log writer
+_writer = LogWriter()
+
+def flush_logs(timeout: Optional[float] = 5.0) -> bool:
+    """
+    Write all queued log events to their files.
+    
+    Args:
+        timeout: Maximum time to wait in seconds
+        
+    Returns:
+        True if all events were written in time
+    """
+    return _writer.flush(timeout)
+
+def shutdown_logging(timeout: Optional[float] = 5.0) -> None:
+    """Flush and close the background log writer; later events are written synchronously, opening and closing the file each time."""
+    _writer.close(timeout)
+
+def get_log_writer_stats() -> Dict[str, Any]:
+    """
+    Get the state of the background log writer.
+    
+    Returns:
+        Dictionary with queue size, dropped events and open files
+    """
+    return _writer.get_stats()
+
+atexit.register(shutdown_logging)
+
 def log_event(unit: str, level: str, event: str, message: str, **kwargs) -> None:
     """
     Log an event to the appropriate log file in JSON line format.
     
+    The line is handed to the background log writer; call flush_logs() to
+    make sure it has reached the file.
+    
     Args:
         unit: The name of the unit (component) generating the log
         level: The log level (INFO, WARNING, ERROR, DEBUG)
@@ -55,12 +528,9 @@ def log_event(unit: str, level: str, event: str, message: str, **kwargs) -> None
         **kwargs: Additional key-value pairs to include in the log entry
     """
     try:
-        # Ensure log directory exists
-        ensure_log_directory()
-        
         # Create log entry
         log_entry = {
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.%fZ", time.gmtime()),
+            "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
             "unit": unit,
             "level": level.upper(),
             "event": event,
@@ -71,17 +541,15 @@ def log_event(unit: str, level: str, event: str, message: str, **kwargs) -> None
         # Add additional fields
         log_entry.update(kwargs)
         
-        # Convert to JSON
-        log_json = json.dumps(log_entry)
-        
-        # Write to file
-        log_file_path = get_log_file_path(unit)
-        with open(log_file_path, "a") as f:
-            f.write(log_json + "\n")
+        # Convert to JSON and queue for writing
+        _writer.submit(unit, json.dumps(log_entry))
         
-        # Also log to standard logger
-        log_method = getattr(logger, level.lower(), logger.info)
-        log_method(f"[{unit}] {event}: {message}")
+        # Also log to standard logger, formatting only if the level is enabled
+        log_level = logging.getLevelName(level.upper())
+        if not isinstance(log_level, int):
+            log_level = logging.INFO
+        if logger.isEnabledFor(log_level):
+            logger.log(log_level, f"[{unit}] {event}: {message}")
         
     except Exception as e:
         # Fallback to standard logging if JSON logging fails
@@ -8,22 +8,45 @@
 # HINWEIS (MCP): Dieser Dienst implementiert FastAPI-Endpunkte für die Verwaltung und Überprüfung von Regeln.
 # HINWEIS (MCP): Er stellt einen /mcp/rules-Endpunkt bereit, der alle geladenen Regeln auflistet,
 # HINWEIS (MCP): und einen /mcp/rules/check-Endpunkt, der eine Policy gegen die Regeln prüft.
+# HINWEIS (MCP): /mcp/rules/check/batch prüft viele Policies in einem Aufruf gegen denselben Regelsatz.
+# HINWEIS (MCP): /mcp/rules/capabilities/{capability} nennt die Komponenten, die eine Fähigkeit nutzen dürfen.
+# HINWEIS (MCP): /mcp/rules/stats zeigt Treffer und Fehlschläge des Urteils-Caches.
+# HINWEIS (MCP): Die Regelliste wird pro Regelsatz-Version serialisiert zwischengespeichert und
+# HINWEIS (MCP): unterstützt ETag/If-None-Match (304) sowie die Filterung mit ?type=.
+# HINWEIS (MCP): Alle Antworten enthalten die Version des verwendeten (kompilierten) Regelsatzes.
 
 import os
+import json
 import yaml
 import time
-from typing import Dict, List, Any, Optional
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+import hashlib
+from typing import Dict, List, Any, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 
 # Use absolute imports when running the script directly
-from runtime_rules import check_policy_against_rules, get_rule_files, load_rule_file
+from runtime_rules import (
+    RULE_ENGINE,
+    evaluate_policies,
+    evaluate_policy,
+    get_capability_components,
+    get_verdict_cache_stats
+)
 from logger import log_event
 
 # Create a router for the rules API
 router = APIRouter()
 
+# Maximum number of policies per batch check
+MAX_BATCH_POLICIES = int(os.environ.get("MCP_RULES_MAX_BATCH", "1000"))
+
+# Serialized /mcp/rules responses of the current ruleset version, keyed by type filter
+_rules_list_cache: Dict[Optional[str], Tuple[bytes, str]] = {}
+_rules_list_version: Optional[str] = None
+_rules_list_infos: Optional[List[Dict[str, Any]]] = None
+
 # Define request and response models
 class PolicyCheckRequest(BaseModel):
     """Request model for policy check endpoint."""
@@ -36,6 +59,34 @@ class PolicyCheckResponse(BaseModel):
     violations: List[str] = Field(default=[], description="List of rule violations if any")
     timestamp: str = Field(..., description="Timestamp of the request")
     duration_ms: int = Field(..., description="Processing time in milliseconds")
+    ruleset_version: Optional[str] = Field(default=None, description="Version of the rule set the policy was checked against")
+
+class BatchPolicy(BaseModel):
+    """A single policy of a batch check."""
+    id: Optional[str] = Field(default=None, description="Identifier echoed in the result (e.g. a file name)")
+    policy: Dict[str, Any] = Field(..., description="The policy to check against rules")
+
+class BatchPolicyCheckRequest(BaseModel):
+    """Request model for the batch policy check endpoint."""
+    policies: List[BatchPolicy] = Field(..., description="The policies to check")
+    rule_files: Optional[List[str]] = Field(default=None, description="Optional list of specific rule files to check against")
+
+class BatchPolicyResult(BaseModel):
+    """Verdict for one policy of a batch check."""
+    index: int = Field(..., description="Position of the policy in the request")
+    id: Optional[str] = Field(default=None, description="Identifier of the policy from the request")
+    valid: bool = Field(..., description="Whether the policy is valid according to the rules")
+    violations: List[str] = Field(default=[], description="List of rule violations if any")
+
+class BatchPolicyCheckResponse(BaseModel):
+    """Response model for the batch policy check endpoint."""
+    results: List[BatchPolicyResult] = Field(..., description="Verdicts in request order")
+    count: int = Field(..., description="Number of checked policies")
+    valid_count: int = Field(..., description="Number of valid policies")
+    invalid_count: int = Field(..., description="Number of invalid policies")
+    timestamp: str = Field(..., description="Timestamp of the request")
+    duration_ms: int = Field(..., description="Processing time in milliseconds")
+    ruleset_version: str = Field(..., description="Version of the rule set all policies were checked against")
 
 class RuleInfo(BaseModel):
     """Model for rule information."""
@@ -48,72 +99,141 @@ class RulesListResponse(BaseModel):
     rules: List[RuleInfo] = Field(..., description="List of available rules")
     count: int = Field(..., description="Number of rules")
     timestamp: str = Field(..., description="Timestamp of the request")
+    ruleset_version: str = Field(..., description="Version of the loaded rule set")
 
-@router.get("/mcp/rules", response_model=RulesListResponse)
-async def list_rules():
+class CapabilityComponentsResponse(BaseModel):
+    """Response model for the capability lookup endpoint."""
+    capability: str = Field(..., description="The capability looked up")
+    components: List[str] = Field(default=[], description="Components allowed to use the capability")
+    defined: bool = Field(..., description="Whether any component is allowed to use the capability")
+    timestamp: str = Field(..., description="Timestamp of the request")
+    ruleset_version: str = Field(..., description="Version of the rule set the lookup used")
+
+class RulesStatsResponse(BaseModel):
+    """Response model for the rules statistics endpoint."""
+    verdict_cache: Dict[str, Any] = Field(..., description="Counters of the policy verdict cache")
+    engine: Dict[str, int] = Field(..., description="Rule file loads and rule set reloads")
+    ruleset_version: str = Field(..., description="Version of the loaded rule set")
+    timestamp: str = Field(..., description="Timestamp of the request")
+
+def _build_rule_infos(ruleset) -> List[Dict[str, Any]]:
     """
-    List all loaded rules from the config/rules directory.
+    Build the JSON-ready rule infos of a rule set.
+    
+    Rule files that failed to load or do not contain a mapping are logged
+    and left out.
+    """
+    rules = []
+    for rule_file in ruleset.files:
+        file_path = rule_file.path
+        try:
+            if rule_file.error is not None:
+                raise rule_file.error
+            
+            # Create rule info
+            rule_info = RuleInfo(
+                file_path=file_path,
+                rule_type=rule_file.rule_type,
+                content=rule_file.content
+            )
+            
+            rules.append(jsonable_encoder(rule_info))
+            
+        except Exception as e:
+            # Log error but continue with other rules
+            log_event(
+                unit="rules_api",
+                level="ERROR",
+                event="RULE_LOAD_ERROR",
+                message=f"Error loading rule file {file_path}: {str(e)}"
+            )
+    return rules
+
+def _get_rules_listing(ruleset, rule_type: Optional[str]) -> Tuple[bytes, str]:
+    """
+    Get the serialized /mcp/rules response and its ETag.
+    
+    The response is built once per ruleset version and type filter; a new
+    version drops all cached responses of the old one. Only the unfiltered
+    listing and the types that exist are cached, so arbitrary ?type= values
+    cannot grow the cache.
     
     Returns:
-        A JSON response with the list of available rules
+        Tuple of (JSON body, strong ETag)
     """
-    # Log the API request
+    global _rules_list_version, _rules_list_infos
+    if _rules_list_version != ruleset.version:
+        _rules_list_cache.clear()
+        _rules_list_infos = None
+        _rules_list_version = ruleset.version
+    
+    cached = _rules_list_cache.get(rule_type)
+    if cached is not None:
+        return cached
+    
+    if _rules_list_infos is None:
+        _rules_list_infos = _build_rule_infos(ruleset)
+    rules = [rule for rule in _rules_list_infos if rule_type is None or rule["rule_type"] == rule_type]
+    cacheable = rule_type is None or bool(rules)
+    body = json.dumps({
+        "rules": rules,
+        "count": len(rules),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "ruleset_version": ruleset.version
+    }, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    if not cacheable:
+        # Unknown type: answer with the empty listing without storing it
+        return body, etag
+    _rules_list_cache[rule_type] = (body, etag)
+    
     log_event(
         unit="rules_api",
         level="INFO",
-        event="rules_list_requested",
-        message="Received request to list rules"
+        event="rules_list_built",
+        message="Built rules listing",
+        rule_count=len(rules),
+        rule_type=rule_type,
+        ruleset_version=ruleset.version
     )
+    return body, etag
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison as per RFC 9110)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or (candidate[2:] if candidate.startswith("W/") else candidate) == etag:
+            return True
+    return False
+
+@router.get("/mcp/rules", response_model=RulesListResponse)
+async def list_rules(request: Request, type: Optional[str] = Query(default=None, description="Only list rules of this type (e.g., naming)")):
+    """
+    List all loaded rules from the config/rules directory.
     
-    try:
-        # Get all rule files
-        rule_files = get_rule_files()
-        
-        # Load each rule file and create rule info objects
-        rules = []
-        for file_path in rule_files:
-            try:
-                # Extract the rule type from the filename (e.g., "structure" from "structure.rules.yaml")
-                rule_type = os.path.basename(file_path).split('.')[0]
-                
-                # Load the rule file
-                content = load_rule_file(file_path)
-                
-                # Create rule info
-                rule_info = RuleInfo(
-                    file_path=file_path,
-                    rule_type=rule_type,
-                    content=content
-                )
-                
-                rules.append(rule_info)
-                
-            except Exception as e:
-                # Log error but continue with other rules
-                log_event(
-                    unit="rules_api",
-                    level="ERROR",
-                    event="RULE_LOAD_ERROR",
-                    message=f"Error loading rule file {file_path}: {str(e)}"
-                )
+    The serialized response is cached per ruleset version and type filter,
+    so listing unchanged rules only costs a stat() per rule file. Clients
+    sending the ETag of their copy in If-None-Match get a 304 without body.
+    The timestamp is the time the cached listing was built.
+    
+    Args:
+        request: The incoming request (for the If-None-Match header)
+        type: Optional rule type filter
         
-        # Create response
-        response = RulesListResponse(
-            rules=rules,
-            count=len(rules),
-            timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-        )
+    Returns:
+        A JSON response with the list of available rules
+    """
+    try:
+        # Get the compiled rule set; files are only parsed again if they changed
+        ruleset = RULE_ENGINE.get_ruleset()
+        body, etag = _get_rules_listing(ruleset, type)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
         
-        # Log successful response
-        log_event(
-            unit="rules_api",
-            level="INFO",
-            event="rules_list_completed",
-            message="Successfully listed rules",
-            rule_count=len(rules)
-        )
-        
-        return response
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
         
     except Exception as e:
         # Log the error
@@ -132,6 +252,53 @@ async def list_rules():
             detail=f"Internal server error: {error_message}"
         )
 
+@router.get("/mcp/rules/stats", response_model=RulesStatsResponse)
+async def rules_stats():
+    """
+    Get the counters of the rule engine and the verdict cache.
+    
+    Returns:
+        A JSON response with cache hits, misses and evictions and the
+        number of rule file loads and reloads
+    """
+    return RulesStatsResponse(
+        verdict_cache=get_verdict_cache_stats(),
+        engine=dict(RULE_ENGINE.stats),
+        ruleset_version=RULE_ENGINE.get_ruleset().version,
+        timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    )
+
+@router.get("/mcp/rules/capabilities/{capability}", response_model=CapabilityComponentsResponse)
+async def capability_components(capability: str):
+    """
+    List the components that may use a capability.
+    
+    Args:
+        capability: The capability to look up
+        
+    Returns:
+        A JSON response with the components allowed to use the capability
+    """
+    components, ruleset_version = get_capability_components(capability)
+    
+    log_event(
+        unit="rules_api",
+        level="INFO",
+        event="capability_lookup_completed",
+        message=f"Looked up components for capability {capability}",
+        capability=capability,
+        component_count=len(components),
+        ruleset_version=ruleset_version
+    )
+    
+    return CapabilityComponentsResponse(
+        capability=capability,
+        components=components,
+        defined=bool(components),
+        timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        ruleset_version=ruleset_version
+    )
+
 @router.post("/mcp/rules/check", response_model=PolicyCheckResponse)
 async def check_policy(request: PolicyCheckRequest):
     """
@@ -157,7 +324,7 @@ async def check_policy(request: PolicyCheckRequest):
     
     try:
         # Check the policy against rules
-        violations = check_policy_against_rules(request.policy, request.rule_files)
+        violations, ruleset_version = evaluate_policy(request.policy, request.rule_files)
         
         # Calculate processing time
         duration_ms = int((time.time() - start_time) * 1000)
@@ -167,7 +334,8 @@ async def check_policy(request: PolicyCheckRequest):
             valid=len(violations) == 0,
             violations=violations,
             timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            duration_ms=duration_ms
+            duration_ms=duration_ms,
+            ruleset_version=ruleset_version
         )
         
         # Log successful response
@@ -178,7 +346,8 @@ async def check_policy(request: PolicyCheckRequest):
             message="Successfully checked policy against rules",
             valid=response.valid,
             violation_count=len(violations),
-            duration_ms=duration_ms
+            duration_ms=duration_ms,
+            ruleset_version=ruleset_version
         )
         
         return response
@@ -209,6 +378,65 @@ async def check_policy(request: PolicyCheckRequest):
             }
         )
 
+@router.post("/mcp/rules/check/batch", response_model=BatchPolicyCheckResponse)
+def check_policy_batch(request: BatchPolicyCheckRequest):
+    """
+    Check many policies against the defined rules in one call.
+    
+    The checks are CPU-bound, so this endpoint is a plain function that
+    FastAPI runs in its thread pool instead of blocking the event loop.
+    
+    Args:
+        request: The batch request containing the policies and optional rule files
+        
+    Returns:
+        A JSON response with one verdict per policy
+    """
+    log_event(
+        unit="rules_api",
+        level="INFO",
+        event="policy_batch_check_requested",
+        message="Received batch policy check request",
+        policy_count=len(request.policies),
+        has_specific_rules=bool(request.rule_files)
+    )
+    
+    if len(request.policies) > MAX_BATCH_POLICIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch contains {len(request.policies)} policies, maximum is {MAX_BATCH_POLICIES}"
+        )
+    
+    start_time = time.time()
+    verdicts, ruleset_version = evaluate_policies([item.policy for item in request.policies], request.rule_files)
+    results = [
+        BatchPolicyResult(index=index, id=item.id, valid=len(violations) == 0, violations=violations)
+        for index, (item, violations) in enumerate(zip(request.policies, verdicts))
+    ]
+    valid_count = sum(1 for result in results if result.valid)
+    duration_ms = int((time.time() - start_time) * 1000)
+    
+    log_event(
+        unit="rules_api",
+        level="INFO",
+        event="policy_batch_check_completed",
+        message="Successfully checked policy batch against rules",
+        policy_count=len(results),
+        invalid_count=len(results) - valid_count,
+        duration_ms=duration_ms,
+        ruleset_version=ruleset_version
+    )
+    
+    return BatchPolicyCheckResponse(
+        results=results,
+        count=len(results),
+        valid_count=valid_count,
+        invalid_count=len(results) - valid_count,
+        timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        duration_ms=duration_ms,
+        ruleset_version=ruleset_version
+    )
+
 # Exception handlers are defined in the include_rules_router function
 # to be added to the FastAPI app, not the router
 
@@ -3,17 +3,27 @@
 # 🗂 Pfad: mcp_units/mcp_agent_interaction_engine/runtime_rules.py
 # 👤 Autor: MINT-RESEARCH
 # 📅 Erstellt: 2025-04-13
-# 🧱 Benötigte Pakete: os, yaml, glob, logging
+# 🧱 Benötigte Pakete: os, json, yaml, glob, logging, hashlib, threading
 # 🧪 Testbar: ✅
 # HINWEIS (MCP): Dieses Modul implementiert die Runtime-Validierung von Policies gegen definierte Regeln.
 # HINWEIS (MCP): Es lädt alle .rules.yaml-Dateien aus dem config/rules/-Verzeichnis und vergleicht
 # HINWEIS (MCP): die übergebene Policy gegen diese Regeln, um Verstöße zu identifizieren.
+# HINWEIS (MCP): Die Regeldateien werden einmal geladen und mit vorkompilierten regulären Ausdrücken
+# HINWEIS (MCP): und Nachschlagetabellen im Speicher gehalten; ändern sich mtime oder Inhalt einer
+# HINWEIS (MCP): Datei, wird atomar auf eine neue Regelsatz-Version umgeschaltet. Ein Index
+# HINWEIS (MCP): Fähigkeit -> Komponenten beantwortet Capability-Prüfungen ohne Listen-Scans.
+# HINWEIS (MCP): Ergebnisse werden in einem LRU-Cache nach Policy-Hash und Regelsatz-Version gehalten.
 
 import os
+import re
+import json
 import yaml
 import glob
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
 
 # Configure logging
 logger = logging.getLogger('mcp_logger')
@@ -21,6 +31,12 @@ logger = logging.getLogger('mcp_logger')
 # Constants
 RULES_DIR = "config/rules"
 
+# Maximum number of cached policy verdicts
+VERDICT_CACHE_SIZE = int(os.environ.get("MCP_RULES_VERDICT_CACHE_SIZE", "1024"))
+
+# Valid component names: lowercase letters, numbers and underscores, not starting with a number
+VALID_COMPONENT_PATTERN = re.compile(r'^[a-z][a-z0-9_]*$')
+
 def load_rule_file(file_path: str) -> Dict[str, Any]:
     """
     Load and parse a YAML rule file.
@@ -62,6 +78,263 @@ def get_rule_files(rule_files: Optional[List[str]] = None) -> List[str]:
     pattern = os.path.join(RULES_DIR, "*.rules.yaml")
     return glob.glob(pattern)
 
+class CompiledRuleFile:
+    """
+    A parsed rule file with the parts that checks need precomputed.
+    
+    A file whose content changed gets a new instance; a file that was only
+    touched keeps its instance with an updated stat signature.
+    """
+    
+    def __init__(self, path: str, signature: Optional[Tuple[int, int, int]], digest: str,
+                 content: Any, error: Optional[Exception] = None):
+        self.path = path
+        self.signature = signature
+        self.digest = digest
+        self.content = content
+        self.error = error
+        # Extract the rule type from the filename (e.g., "structure" from "structure.rules.yaml")
+        self.rule_type = os.path.basename(path).split('.')[0]
+        self.component_pattern = None
+        self.component_pattern_error = None
+        # Capability -> components allowed to use it
+        self.capability_index = None
+        self.structure_required_fields = None
+        if error is None and content:
+            self._compile()
+    
+    def _compile(self) -> None:
+        """Precompile regexes and lookup tables; checks fall back to the raw content otherwise."""
+        rules = self.content
+        try:
+            if self.rule_type == "naming":
+                naming_rules = rules.get("naming", {})
+                if "component_pattern" in naming_rules:
+                    try:
+                        self.component_pattern = re.compile(naming_rules["component_pattern"].get("regex", ""))
+                    except Exception as e:
+                        # Raised when the check reaches the pattern, like the uncompiled rules did
+                        self.component_pattern_error = e
+            elif self.rule_type == "capabilities":
+                capabilities_rules = rules.get("capabilities", {})
+                if isinstance(capabilities_rules, dict) and all(
+                        isinstance(allowed, (list, tuple)) for allowed in capabilities_rules.values()):
+                    index: Dict[Any, List[str]] = {}
+                    for component, allowed_capabilities in capabilities_rules.items():
+                        for capability in allowed_capabilities:
+                            components = index.setdefault(capability, [])
+                            if component not in components:
+                                components.append(component)
+                    self.capability_index = {capability: tuple(components) for capability, components in index.items()}
+            elif self.rule_type == "structure":
+                structure_rules = rules.get("structure", {})
+                if isinstance(structure_rules, dict) and isinstance(structure_rules.get("required_fields"), list):
+                    self.structure_required_fields = tuple(structure_rules["required_fields"])
+        except Exception:
+            # Unusual content (e.g. unhashable entries) is checked on the raw rules
+            self.capability_index = None
+
+class CompiledRuleSet:
+    """An immutable, versioned set of compiled rule files."""
+    
+    def __init__(self, files: Tuple[CompiledRuleFile, ...]):
+        self.files = files
+        fingerprint = "\n".join(f"{rule_file.path}:{rule_file.digest}" for rule_file in sorted(files, key=lambda f: f.path))
+        self.version = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:12]
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Get (mtime_ns, size, inode) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+class RuleEngine:
+    """
+    Loads rule files once and keeps them compiled in memory.
+    
+    On every lookup the rule directory is listed and each file is stat()ed;
+    only files whose mtime, size or inode changed are read again, and only
+    files whose content hash changed are parsed and compiled again. A new
+    rule set is then built and swapped in atomically, so concurrent checks
+    always see one consistent version.
+    """
+    
+    def __init__(self):
+        self._files: Dict[str, CompiledRuleFile] = {}
+        self._rulesets: Dict[Tuple[str, ...], CompiledRuleSet] = {}
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "reloads": 0}
+    
+    def _compiled_file(self, path: str) -> CompiledRuleFile:
+        """Get the compiled version of a rule file, recompiling it if it changed."""
+        signature = _file_signature(path)
+        cached = self._files.get(path)
+        if cached is not None and cached.signature == signature:
+            return cached
+        
+        if signature is None:
+            logger.error(f"Rule file not found: {path}")
+            compiled = CompiledRuleFile(path, None, "missing", [])
+        else:
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+            except OSError as e:
+                logger.error(f"Error reading rule file {path}: {e}")
+                compiled = CompiledRuleFile(path, None, "unreadable", [])
+                self._files[path] = compiled
+                return compiled
+            digest = hashlib.sha256(raw).hexdigest()
+            if cached is not None and cached.digest == digest:
+                # Touched but unchanged: keep the compiled rules
+                cached.signature = signature
+                compiled = cached
+            else:
+                content, error = None, None
+                try:
+                    content = yaml.safe_load(raw.decode("utf-8", errors="ignore"))
+                except yaml.YAMLError as e:
+                    logger.error(f"Error parsing rule file {path}: {e}")
+                    error = e
+                compiled = CompiledRuleFile(path, signature, digest, content, error)
+                self.stats["loads"] += 1
+        self._files[path] = compiled
+        return compiled
+    
+    def get_ruleset(self, rule_files: Optional[List[str]] = None) -> CompiledRuleSet:
+        """
+        Get the current compiled rule set.
+        
+        Args:
+            rule_files: Optional list of specific rule files; all files in
+                RULES_DIR otherwise
+            
+        Returns:
+            The compiled rule set, rebuilt only if a rule file changed
+        """
+        files = tuple(get_rule_files(rule_files))
+        with self._lock:
+            compiled = tuple(self._compiled_file(path) for path in files)
+            current = self._rulesets.get(files)
+            if current is None or any(a is not b for a, b in zip(current.files, compiled)):
+                if current is not None:
+                    self.stats["reloads"] += 1
+                current = CompiledRuleSet(compiled)
+                self._rulesets[files] = current
+            return current
+    
+    def invalidate(self) -> None:
+        """Drop all compiled rules; the next lookup loads them again."""
+        with self._lock:
+            self._files.clear()
+            self._rulesets.clear()
+
+# Process-wide rule engine
+RULE_ENGINE = RuleEngine()
+
+def policy_hash(policy: Any) -> Optional[str]:
+    """
+    Compute a canonical hash of a policy.
+    
+    Key order does not matter; the hash is taken over the JSON form with
+    sorted keys.
+    
+    Args:
+        policy: The policy dictionary
+        
+    Returns:
+        The hex digest, or None if the policy cannot be serialized
+    """
+    try:
+        canonical = json.dumps(policy, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class VerdictCache:
+    """
+    Bounded LRU cache of policy verdicts.
+    
+    Entries are keyed by (policy hash, ruleset version). A changed rule file
+    changes the version, so verdicts of the old rules are never returned and
+    simply age out of the cache.
+    """
+    
+    def __init__(self, maxsize: int = VERDICT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Tuple[str, str]) -> Optional[List[str]]:
+        """Get a cached verdict, or None on a miss."""
+        with self._lock:
+            violations = self._entries.get(key)
+            if violations is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return list(violations)
+    
+    def put(self, key: Tuple[str, str], violations: List[str]) -> None:
+        """Store a verdict, evicting the least recently used one if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = tuple(violations)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        """Drop all cached verdicts and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the cache counters.
+        
+        Returns:
+            Dictionary with size, maxsize, hits, misses, evictions and hit_ratio
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Process-wide verdict cache
+VERDICT_CACHE = VerdictCache()
+
+def get_verdict_cache_stats() -> Dict[str, Any]:
+    """Get the counters of the process-wide verdict cache."""
+    return VERDICT_CACHE.get_stats()
+
+def get_ruleset_version(rule_files: Optional[List[str]] = None) -> str:
+    """
+    Get the version of the active rule set.
+    
+    Args:
+        rule_files: Optional list of specific rule files
+        
+    Returns:
+        A short hash over the paths and contents of the rule files
+    """
+    return RULE_ENGINE.get_ruleset(rule_files).version
+
 def check_policy_against_rules(policy: Dict[str, Any], rule_files: Optional[List[str]] = None) -> List[str]:
     """
     Check if a policy complies with all defined rules.
@@ -76,24 +349,82 @@ def check_policy_against_rules(policy: Dict[str, Any], rule_files: Optional[List
     Returns:
         List of rule violations (empty list if no violations)
     """
+    return evaluate_policy(policy, rule_files)[0]
+
+def evaluate_policy(policy: Dict[str, Any], rule_files: Optional[List[str]] = None) -> Tuple[List[str], Optional[str]]:
+    """
+    Check a policy against the compiled rules and report the rule set version used.
+    
+    Args:
+        policy: The policy dictionary to validate
+        rule_files: Optional list of specific rule files to check against
+        
+    Returns:
+        Tuple of (violations, ruleset version); the version is None if the
+        policy is empty and no rules were consulted
+    """
     if not policy:
-        return ["Policy is empty or None"]
+        return ["Policy is empty or None"], None
     
-    violations = []
-    files = get_rule_files(rule_files)
+    ruleset = RULE_ENGINE.get_ruleset(rule_files)
+    if not ruleset.files:
+        logger.warning("No rule files found to check against")
+        return [], ruleset.version
+    
+    return _cached_check(policy, ruleset), ruleset.version
+
+def evaluate_policies(policies: List[Dict[str, Any]],
+                      rule_files: Optional[List[str]] = None) -> Tuple[List[List[str]], str]:
+    """
+    Check several policies against one snapshot of the compiled rules.
+    
+    The rule set is looked up once, so all policies of a batch are checked
+    against the same version even if a rule file changes meanwhile.
     
-    if not files:
+    Args:
+        policies: The policy dictionaries to validate
+        rule_files: Optional list of specific rule files to check against
+        
+    Returns:
+        Tuple of (violations per policy in input order, ruleset version)
+    """
+    ruleset = RULE_ENGINE.get_ruleset(rule_files)
+    if not ruleset.files:
         logger.warning("No rule files found to check against")
-        return []
+    results = []
+    for policy in policies:
+        if not policy:
+            results.append(["Policy is empty or None"])
+        elif not ruleset.files:
+            results.append([])
+        else:
+            results.append(_cached_check(policy, ruleset))
+    return results, ruleset.version
+
+def _cached_check(policy: Dict[str, Any], ruleset: CompiledRuleSet) -> List[str]:
+    """Apply a compiled rule set to a policy, answering repeated checks from the verdict cache."""
+    digest = policy_hash(policy)
+    if digest is None:
+        return _check_ruleset(policy, ruleset)
+    key = (digest, ruleset.version)
+    violations = VERDICT_CACHE.get(key)
+    if violations is None:
+        violations = _check_ruleset(policy, ruleset)
+        VERDICT_CACHE.put(key, violations)
+    return violations
+
+def _check_ruleset(policy: Dict[str, Any], ruleset: CompiledRuleSet) -> List[str]:
+    """Apply a compiled rule set to a policy."""
+    violations = []
     
     try:
         # Process each rule file
-        for rule_file in files:
-            logger.debug(f"Checking policy against rule file: {rule_file}")
-            rules = load_rule_file(rule_file)
-            
-            # Extract the rule type from the filename (e.g., "structure" from "structure.rules.yaml")
-            rule_type = os.path.basename(rule_file).split('.')[0]
+        for rule_file in ruleset.files:
+            logger.debug(f"Checking policy against rule file: {rule_file.path}")
+            if rule_file.error is not None:
+                raise rule_file.error
+            rules = rule_file.content
+            rule_type = rule_file.rule_type
             
             # Skip if rules is None or empty
             if not rules:
@@ -107,28 +438,30 @@ def check_policy_against_rules(policy: Dict[str, Any], rule_files: Optional[List
                 # For this implementation, we'll consider valid component names to be:
                 # - Must contain only lowercase letters, numbers, and underscores
                 # - Must not start with a number
-                import re
-                valid_component_pattern = re.compile(r'^[a-z][a-z0-9_]*$')
-                if not valid_component_pattern.match(policy["component"]):
+                if not VALID_COMPONENT_PATTERN.match(policy["component"]):
                     violations.append(f"Component name '{policy['component']}' is invalid. Must contain only lowercase letters, numbers, and underscores, and must not start with a number.")
                 
                 # Also check against any specific component pattern in the rules if it exists
                 if "component_pattern" in naming_rules:
-                    pattern = re.compile(naming_rules["component_pattern"].get("regex", ""))
-                    if not pattern.match(policy["component"]):
+                    if rule_file.component_pattern_error is not None:
+                        raise rule_file.component_pattern_error
+                    if not rule_file.component_pattern.match(policy["component"]):
                         violations.append(f"Component name '{policy['component']}' does not match required pattern")
                 
             # Check if this rule applies to the policy's component
             if "component" in policy and rule_type in rules:
                 # Structure rules
                 if rule_type == "structure":
-                    structure_rules = rules.get("structure", {})
+                    if rule_file.structure_required_fields is not None:
+                        required_fields = rule_file.structure_required_fields
+                    else:
+                        structure_rules = rules.get("structure", {})
+                        required_fields = structure_rules["required_fields"] if "required_fields" in structure_rules else ()
                     
                     # Check for required fields in policy
-                    if "required_fields" in structure_rules:
-                        for field in structure_rules["required_fields"]:
-                            if field not in policy:
-                                violations.append(f"Missing required field: {field}")
+                    for field in required_fields:
+                        if field not in policy:
+                            violations.append(f"Missing required field: {field}")
                 
                 # Naming rules - already checked at the top level
                 elif rule_type == "naming":
@@ -136,18 +469,10 @@ def check_policy_against_rules(policy: Dict[str, Any], rule_files: Optional[List
                 
                 # Capabilities rules
                 elif rule_type == "capabilities":
-                    capabilities_rules = rules.get("capabilities", {})
-                    
                     # Check if policy uses capabilities that are defined in the rules
                     if "capabilities" in policy:
                         for capability in policy["capabilities"]:
-                            found = False
-                            for component, allowed_capabilities in capabilities_rules.items():
-                                if capability in allowed_capabilities:
-                                    found = True
-                                    break
-                            
-                            if not found:
+                            if not _capability_defined(rule_file, capability):
                                 violations.append(f"Undefined capability used: {capability}")
                 
                 # Agents rules
@@ -209,4 +534,51 @@ def check_policy_against_rules(policy: Dict[str, Any], rule_files: Optional[List
         logger.error(f"Error checking policy against rules: {e}")
         violations.append(f"Error during rule validation: {str(e)}")
     
-    return violations
\ No newline at end of file
+    return violations
+
+def _capability_defined(rule_file: CompiledRuleFile, capability: Any) -> bool:
+    """Check whether any component of the capabilities rules allows a capability."""
+    if rule_file.capability_index is not None:
+        try:
+            return capability in rule_file.capability_index
+        except TypeError:
+            # Unhashable capability: compare like the list lookup below
+            pass
+    for component, allowed_capabilities in rule_file.content.get("capabilities", {}).items():
+        if capability in allowed_capabilities:
+            return True
+    return False
+
+def _capability_components(rule_file: CompiledRuleFile, capability: Any) -> List[str]:
+    """Get the components of one capabilities rule file that allow a capability."""
+    if rule_file.capability_index is not None:
+        try:
+            return list(rule_file.capability_index.get(capability, ()))
+        except TypeError:
+            pass
+    capabilities_rules = rule_file.content.get("capabilities", {})
+    if not isinstance(capabilities_rules, dict):
+        return []
+    return [component for component, allowed_capabilities in capabilities_rules.items()
+            if isinstance(allowed_capabilities, (list, tuple, set, dict)) and capability in allowed_capabilities]
+
+def get_capability_components(capability: str, rule_files: Optional[List[str]] = None) -> Tuple[List[str], str]:
+    """
+    Find the components that may use a capability.
+    
+    Args:
+        capability: The capability to look up
+        rule_files: Optional list of specific rule files to search
+        
+    Returns:
+        Tuple of (components in rule file order, ruleset version)
+    """
+    ruleset = RULE_ENGINE.get_ruleset(rule_files)
+    components: List[str] = []
+    for rule_file in ruleset.files:
+        if rule_file.rule_type != "capabilities" or rule_file.error is not None or not isinstance(rule_file.content, dict):
+            continue
+        for component in _capability_components(rule_file, capability):
+            if component not in components:
+                components.append(component)
+    return components, ruleset.version
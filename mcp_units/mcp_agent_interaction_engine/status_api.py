@@ -12,13 +12,23 @@ import os
 import json
 import yaml
 import time
-from typing import Dict, List, Any, Optional
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 # Use absolute imports when running the script directly
-from logger import log_event
+from logger import log_event, flush_logs, get_log_segments
+from log_index import DEFAULT_PERCENTILES, query_logs
+from log_reader import (
+    InvalidCursorError,
+    LogFollower,
+    make_line_filter,
+    parse_log_timestamp,
+    tail_log_lines
+)
 
 # Constants
 CONFIG_DIR = "config"
@@ -26,6 +36,12 @@ LOGS_DIR = "logs/system"
 RUNTIME_STATE_DIR = "runtime_state"
 MCP_REGISTER_FILE = os.path.join(CONFIG_DIR, "mcp_register.yaml")
 MAX_LOG_LINES = 50
+MAX_LOG_LIMIT = 1000
+
+# Live log streaming settings
+LOG_STREAM_POLL_INTERVAL = float(os.environ.get("MCP_LOG_STREAM_POLL_INTERVAL", "0.25"))
+LOG_STREAM_HEARTBEAT_SECONDS = 15.0
+MAX_LOG_STREAM_UNITS = 20
 
 # Create a router for the status API
 router = APIRouter()
@@ -50,6 +66,7 @@ class LogsResponse(BaseModel):
     unit: str = Field(..., description="Unit name")
     logs: List[str] = Field(..., description="Log entries")
     count: int = Field(..., description="Number of log entries")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next (older) page, if any")
     timestamp: str = Field(..., description="Timestamp of the request")
 
 @router.get("/mcp/status", response_model=StatusResponse)
@@ -135,12 +152,32 @@ async def get_status():
         )
 
 @router.get("/mcp/logs")
-async def get_logs(unit: str):
+def get_logs(
+    unit: str,
+    limit: int = Query(MAX_LOG_LINES, ge=1, le=MAX_LOG_LIMIT, description="Maximum number of entries"),
+    level: Optional[str] = Query(None, description="Only entries with this level (comma-separated list allowed)"),
+    event: Optional[str] = Query(None, description="Only entries with this event type"),
+    since: Optional[str] = Query(None, description="Only entries at or after this ISO 8601 timestamp"),
+    cursor: Optional[str] = Query(None, description="next_cursor of a previous response")
+):
     """
     Get the logs for a specific MCP unit.
     
+    The newest entries are returned, oldest first. The log files are read
+    backwards from the end, so the cost depends on the number of entries
+    returned, not on the size of the log. Pass next_cursor as cursor to get
+    the page of older entries.
+    
+    Flushing and reading the files block, so this endpoint is a plain
+    function that FastAPI runs in its thread pool.
+    
     Args:
         unit: The name of the unit to get logs for
+        limit: Maximum number of entries
+        level: Only entries with this level
+        event: Only entries with this event type
+        since: Only entries at or after this timestamp
+        cursor: Cursor of a previous response
         
     Returns:
         A JSON response with the log entries
@@ -154,11 +191,20 @@ async def get_logs(unit: str):
     )
     
     try:
-        # Construct the log file path
-        log_file_path = os.path.join(LOGS_DIR, f"{unit}.log")
+        since_timestamp = None
+        if since is not None:
+            since_timestamp = parse_log_timestamp(since)
+            if since_timestamp is None:
+                return JSONResponse(
+                    status_code=400,
+                    content={"error": f"Invalid since timestamp: {since}"}
+                )
         
-        # Check if the log file exists
-        if not os.path.exists(log_file_path):
+        # Make sure queued events of the unit are on disk before reading
+        flush_logs(timeout=1.0)
+        
+        # Check if any log file exists
+        if not get_log_segments(unit, LOGS_DIR):
             log_event(
                 unit="status_api",
                 level="ERROR",
@@ -170,21 +216,23 @@ async def get_logs(unit: str):
                 content={"error": f"Log file not found for unit: {unit}"}
             )
         
-        # Read the log file (last MAX_LOG_LINES lines)
-        logs = []
-        with open(log_file_path, "r") as f:
-            # Read all lines and keep only the last MAX_LOG_LINES
-            all_lines = f.readlines()
-            logs = all_lines[-MAX_LOG_LINES:] if len(all_lines) > MAX_LOG_LINES else all_lines
-            
-            # Strip newlines
-            logs = [line.strip() for line in logs]
+        # Read the newest entries backwards across the active file and rotated segments
+        try:
+            page = tail_log_lines(unit, limit, level=level, event=event, since=since_timestamp,
+                                  cursor=cursor, log_dir=LOGS_DIR)
+        except InvalidCursorError as e:
+            return JSONResponse(
+                status_code=400,
+                content={"error": str(e)}
+            )
+        logs = page["logs"]
         
         # Create response
         response = {
             "unit": unit,
             "logs": logs,
             "count": len(logs),
+            "next_cursor": page["next_cursor"],
             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
         }
         
@@ -215,6 +263,232 @@ async def get_logs(unit: str):
             content={"error": f"Internal server error: {error_message}"}
         )
 
+def _sse_event(event: str, data: str) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+def _poll_followers(followers: List[LogFollower]) -> List[str]:
+    """Collect the lines appended to the followed files since the last poll."""
+    lines = []
+    for follower in followers:
+        lines.extend(follower.poll())
+    return lines
+
+def _open_followers(units: List[str], backlog: int, level: Optional[str],
+                    event: Optional[str]) -> Tuple[List[LogFollower], List[str]]:
+    """
+    Open one follower per unit and read the backlog up to its position.
+    
+    Returns:
+        Tuple of (followers, backlog lines)
+    """
+    # Open the files at their current end; the backlog is read up to exactly
+    # that position, so it neither overlaps nor misses followed entries
+    flush_logs(timeout=1.0)
+    followers = [LogFollower(name, LOGS_DIR) for name in units]
+    backlog_lines = []
+    if backlog:
+        for follower in followers:
+            page = tail_log_lines(follower.unit, backlog, level=level, event=event,
+                                  cursor=follower.cursor(), log_dir=LOGS_DIR)
+            backlog_lines.extend(page["logs"])
+    return followers, backlog_lines
+
+async def _follow_logs(request: Request, followers: List[LogFollower], backlog: List[str],
+                       line_filter: Optional[Callable[[str], bool]]) -> AsyncIterator[str]:
+    """
+    Yield server-sent events for the backlog and for lines appended to the followed files.
+    
+    Args:
+        request: The streaming request, used to detect client disconnects
+        followers: One follower per unit
+        backlog: Lines sent before following starts
+        line_filter: Optional predicate for new lines
+        
+    Yields:
+        SSE-formatted "log" events and keep-alive comments
+    """
+    try:
+        for line in backlog:
+            yield _sse_event("log", line)
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            sent = False
+            # stat() and read() calls run in the thread pool, not on the event loop
+            for line in await run_in_threadpool(_poll_followers, followers):
+                if line_filter is None or line_filter(line):
+                    yield _sse_event("log", line)
+                    sent = True
+            now = time.monotonic()
+            if sent:
+                last_sent = now
+            elif now - last_sent >= LOG_STREAM_HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = now
+            await asyncio.sleep(LOG_STREAM_POLL_INTERVAL)
+    finally:
+        for follower in followers:
+            follower.close()
+
+@router.get("/mcp/logs/stream")
+async def stream_logs(
+    request: Request,
+    unit: List[str] = Query(..., description="Unit(s) to follow; repeat the parameter for several units"),
+    level: Optional[str] = Query(None, description="Only entries with this level (comma-separated list allowed)"),
+    event: Optional[str] = Query(None, description="Only entries with this event type"),
+    backlog: int = Query(0, ge=0, le=MAX_LOG_LIMIT, description="Number of recent entries per unit sent first")
+):
+    """
+    Stream new log entries of one or more MCP units as server-sent events.
+    
+    Each entry is sent as an event of type "log" whose data is the JSON line
+    as written by the logger. The active log files are followed like
+    `tail -f`: appends are detected with stat() polling, and rotation is
+    followed without losing the rest of the rotated file. Level and event
+    filters are applied on the server.
+    
+    Args:
+        request: The incoming request
+        unit: The units to follow
+        level: Only entries with this level
+        event: Only entries with this event type
+        backlog: Number of recent matching entries per unit to send first
+        
+    Returns:
+        A text/event-stream response
+    """
+    units = list(dict.fromkeys(unit))
+    if len(units) > MAX_LOG_STREAM_UNITS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"At most {MAX_LOG_STREAM_UNITS} units can be followed at once"}
+        )
+    
+    log_event(
+        unit="status_api",
+        level="INFO",
+        event="API_REQUEST",
+        message=f"Received request to stream logs for units: {', '.join(units)}"
+    )
+    
+    followers, backlog_lines = await run_in_threadpool(_open_followers, units, backlog, level, event)
+    
+    return StreamingResponse(
+        _follow_logs(request, followers, backlog_lines, make_line_filter(level, event)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _parse_time_param(name: str, value: Optional[str]) -> Optional[float]:
+    """Parse an ISO 8601 query parameter; raises ValueError with a client-facing message."""
+    if value is None:
+        return None
+    timestamp = parse_log_timestamp(value)
+    if timestamp is None:
+        raise ValueError(f"Invalid {name} timestamp: {value}")
+    return timestamp
+
+@router.get("/mcp/logs/query")
+def query_log_entries(
+    unit: Optional[List[str]] = Query(None, description="Unit(s) to query; all units if omitted"),
+    start: Optional[str] = Query(None, description="Start of the time range (ISO 8601)"),
+    end: Optional[str] = Query(None, description="End of the time range (ISO 8601)"),
+    last: Optional[float] = Query(None, gt=0, description="Time range of the last N seconds (instead of start)"),
+    event: Optional[str] = Query(None, description="Only entries with this event type"),
+    level: Optional[str] = Query(None, description="Only entries with this level (comma-separated list allowed)"),
+    field: Optional[List[str]] = Query(None, description="Field filter as name=value; repeatable"),
+    metric: Optional[str] = Query(None, description="Numeric field to compute statistics for, e.g. duration_ms"),
+    percentiles: Optional[str] = Query(None, description="Comma-separated percentiles, default 50,95,99"),
+    group_by: Optional[str] = Query(None, description="Comma-separated fields to group by, e.g. event or unit,event"),
+    limit: int = Query(0, ge=0, le=MAX_LOG_LIMIT, description="Number of matching entries to return")
+):
+    """
+    Query the logs of a time range with filters and aggregations.
+    
+    Segments are located through a sparse timestamp index, so only the part
+    of the logs inside the time range is read. For example, the p99 duration
+    of completed inferences in the last hour is
+    /mcp/logs/query?last=3600&event=infer_request_completed&metric=duration_ms&percentiles=99
+    
+    Scanning (and decompressing) segments blocks, so this endpoint is a
+    plain function that FastAPI runs in its thread pool.
+    
+    Returns:
+        A JSON response with the number of scanned and matched entries, one
+        result per group (count and metric statistics) and optional records
+    """
+    log_event(
+        unit="status_api",
+        level="INFO",
+        event="API_REQUEST",
+        message="Received request to query logs"
+    )
+    
+    try:
+        start_timestamp = _parse_time_param("start", start)
+        end_timestamp = _parse_time_param("end", end)
+        if last is not None:
+            if start_timestamp is not None:
+                raise ValueError("start and last cannot be combined")
+            start_timestamp = (end_timestamp or time.time()) - last
+        fields = {}
+        for item in field or []:
+            name, separator, value = item.partition("=")
+            if not separator or not name:
+                raise ValueError(f"Invalid field filter (expected name=value): {item}")
+            fields[name] = value
+        percentile_values = DEFAULT_PERCENTILES
+        if percentiles:
+            percentile_values = tuple(float(item) for item in percentiles.split(",") if item.strip())
+            if any(not 0 <= q <= 100 for q in percentile_values):
+                raise ValueError("Percentiles must be between 0 and 100")
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    
+    try:
+        flush_logs(timeout=1.0)
+        result = query_logs(
+            units=list(dict.fromkeys(unit)) if unit else None,
+            start=start_timestamp,
+            end=end_timestamp,
+            event=event,
+            level=level,
+            fields=fields,
+            metric=metric,
+            percentiles=percentile_values,
+            group_by=[name.strip() for name in group_by.split(",") if name.strip()] if group_by else None,
+            limit=limit,
+            log_dir=LOGS_DIR
+        )
+        result["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        
+        log_event(
+            unit="status_api",
+            level="INFO",
+            event="API_RESPONSE",
+            message="Successfully queried logs",
+            scanned=result["scanned"],
+            matched=result["matched"]
+        )
+        
+        return result
+        
+    except Exception as e:
+        error_message = str(e)
+        log_event(
+            unit="status_api",
+            level="ERROR",
+            event="API_ERROR",
+            message=f"Error querying logs: {error_message}"
+        )
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Internal server error: {error_message}"}
+        )
+
 @router.get("/mcp/state/{bereich}")
 async def get_state(bereich: str):
     """
@@ -15,7 +15,7 @@ import time
 import sys
 import os
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 
 # Configure logging
 import logging
@@ -39,6 +39,12 @@ def generate_text(prompt: str) -> str:
     
     return f"[MOCK-LLM]: Du hast gefragt: '{prompt}'"
 
+def generate_text_stream(prompt: str):
+    """Generate text for the prompt and yield it in word-sized chunks."""
+    words = generate_text(prompt).split(" ")
+    for i, word in enumerate(words):
+        yield word if i == len(words) - 1 else word + " "
+
 # Create Flask app
 app = Flask(__name__)
 
@@ -54,6 +60,17 @@ def generate_endpoint():
         logger.error(f"Error in generate endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate/stream', methods=['POST'])
+def generate_stream_endpoint():
+    """API endpoint for text generation that streams the output in chunks."""
+    try:
+        data = request.json
+        prompt = data.get('prompt', '')
+        return Response(stream_with_context(generate_text_stream(prompt)), mimetype='text/plain')
+    except Exception as e:
+        logger.error(f"Error in generate stream endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -0,0 +1,192 @@
+# 📄 Script: memory_api.py
+# 🔧 Zweck: HTTP-Schnittstelle des Memory-Stores
+# 🗂 Pfad: mcp_units/mcp_host_memory_store/memory_api.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: fastapi, uvicorn, pydantic
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieser Dienst stellt den Memory-Store über HTTP bereit (Port 5000), so wie ihn
+# HINWEIS (MCP): graph.py im Docker-Betrieb aufruft: Lesen, Schreiben, Löschen, Anhängen und Multi-Get.
+# HINWEIS (MCP): Die Handler sind asynchron; alle Store-Aufrufe (auch Lesezugriffe, die Schlüssel ablaufen
+# HINWEIS (MCP): lassen oder von der Platte laden können) laufen in einem eigenen Thread-Pool. Dort sperren
+# HINWEIS (MCP): sie nur den Lock-Streifen ihres Schlüssels (siehe memory_handler).
+
+import os
+import asyncio
+from functools import partial
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel, Field
+import uvicorn
+
+try:
+    from . import memory_handler
+except ImportError:
+    # Running the script directly
+    import memory_handler
+
+logger = memory_handler.logger
+
+# Worker threads for store calls; writers wait for their group commit there
+MEMORY_API_WORKERS = int(os.environ.get("MCP_MEMORY_API_WORKERS", "32"))
+MAX_MGET_KEYS = 1000
+
+_executor = None
+
+def _get_executor():
+    """Get the thread pool running the store calls."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MEMORY_API_WORKERS, thread_name_prefix="memory-api")
+    return _executor
+
+async def _run(function, *args, **kwargs):
+    """Run a blocking store call without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(function, *args, **kwargs))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the memory at startup; write a snapshot on shutdown."""
+    global _executor
+    await _run(memory_handler.load_memory)
+    memory_handler.start_expiry_sweeper()
+    yield
+    memory_handler.stop_expiry_sweeper()
+    await _run(memory_handler.persist_memory)
+    _get_executor().shutdown(wait=True)
+    _executor = None
+
+# Create FastAPI application
+app = FastAPI(
+    title="MCP Memory Store",
+    description="Key-value memory of the MCP system",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Define request models
+class WriteRequest(BaseModel):
+    """Request model for writing a value."""
+    data: Any = Field(None, description="The JSON value to store")
+    ttl: Optional[float] = Field(None, description="Seconds until the entry expires (default from the memory policy, <= 0 never)")
+
+class AppendRequest(BaseModel):
+    """Request model for appending to a list."""
+    entry: Any = Field(None, description="The entry to append")
+    max_entries: Optional[int] = Field(None, description="Keep only the newest max_entries entries")
+    ttl: Optional[float] = Field(None, description="Seconds until the list expires, counted from this append")
+
+class MultiGetRequest(BaseModel):
+    """Request model for reading several keys."""
+    keys: List[str] = Field(..., description="The keys to read")
+    last: Optional[Dict[str, int]] = Field(None, description="Per key, only return the newest entries of a list")
+
+def _check_key(key: str) -> None:
+    """
+    Reject keys that cannot be stored.
+
+    Raises:
+        HTTPException: If the key is empty or reserved for the snapshot metadata
+    """
+    if not key or key == memory_handler.STORE_META_KEY:
+        raise HTTPException(status_code=400, detail=f"Invalid memory key '{key}'")
+
+@app.get("/memory/{key}")
+async def get_memory(
+    key: str,
+    last: Optional[int] = Query(None, ge=0, description="For lists, only return the newest entries"),
+    after: Optional[int] = Query(None, ge=0, description="For lists, only return entries appended after this cursor")
+):
+    """Read the value of a key; with last or after, read part of a list and return a cursor."""
+    _check_key(key)
+    if last is None and after is None:
+        return {"key": key, "data": await _run(memory_handler.read_memory, key)}
+    try:
+        result = await _run(memory_handler.read_memory_range, key, last=last, after=after)
+    except TypeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"key": key, "data": result["entries"], "cursor": result["cursor"]}
+
+@app.post("/memory/{key}")
+@app.put("/memory/{key}")
+async def put_memory(key: str, request: WriteRequest):
+    """Store a value under a key."""
+    _check_key(key)
+    try:
+        await _run(memory_handler.write_memory, key, request.data, ttl=request.ttl)
+    except memory_handler.MemoryLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"key": key, "status": "ok"}
+
+@app.delete("/memory/{key}")
+async def delete_memory(key: str):
+    """Delete a key."""
+    _check_key(key)
+    deleted = await _run(memory_handler.delete_memory, key)
+    return {"key": key, "deleted": deleted}
+
+@app.post("/memory/{key}/append")
+async def append_memory(key: str, request: AppendRequest):
+    """Atomically append an entry to the list stored under a key."""
+    _check_key(key)
+    try:
+        length = await _run(
+            memory_handler.append_memory, key, request.entry,
+            max_entries=request.max_entries, ttl=request.ttl
+        )
+    except memory_handler.MemoryLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except TypeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"key": key, "length": length}
+
+@app.post("/mget")
+async def multi_get(request: MultiGetRequest):
+    """Read several keys in one round trip."""
+    if len(request.keys) > MAX_MGET_KEYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many keys: {len(request.keys)} (maximum {MAX_MGET_KEYS})"
+        )
+    data = await _run(memory_handler.read_memory_many, request.keys, last=request.last)
+    return {"data": data}
+
+@app.get("/stats")
+async def stats():
+    """Get the commit, expiry and memory usage counters."""
+    return {
+        "keys": len(memory_handler.MEMORY),
+        "lock_stripes": memory_handler.KEY_LOCK_STRIPES,
+        "commit": memory_handler.get_commit_stats(),
+        "expiry": memory_handler.get_expiry_stats(),
+        "usage": await _run(memory_handler.get_memory_usage)
+    }
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint."""
+    return {"status": "healthy"}
+
+def start_server():
+    """Start the memory store HTTP server with Uvicorn."""
+    logger.info("Starting memory handler server...")
+    logger.info(f"Process ID: {os.getpid()}")
+    logger.info(f"Working directory: {os.getcwd()}")
+
+    try:
+        # Get port from environment variable or use default
+        port = int(os.environ.get('PORT', 5000))
+        logger.info(f"Starting memory store HTTP server on port {port}...")
+        uvicorn.run(app, host="0.0.0.0", port=port)
+    except KeyboardInterrupt:
+        logger.info("Memory handler server shutting down...")
+    except Exception as e:
+        logger.error(f"Error in memory handler server: {e}")
+
+    logger.info("Memory handler server stopped.")
+
+if __name__ == "__main__":
+    start_server()
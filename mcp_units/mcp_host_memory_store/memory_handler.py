@@ -3,19 +3,43 @@
 # 🗂 Pfad: mcp_units/mcp_host_memory_store/memory_handler.py
 # 👤 Autor: MINT-RESEARCH
 # 📅 Erstellt: 2025-04-13
-# 🧱 Benötigte Pakete: json, os
+# 🧱 Benötigte Pakete: json, os, threading, heapq, hashlib, yaml (optional)
 # 🧪 Testbar: ❌
 # HINWEIS (MCP): Dieser Dienst implementiert den Memory-Store des MCP-Systems.
 # HINWEIS (MCP): Er bietet Funktionen zum Speichern und Abrufen von Zustandsdaten
 # HINWEIS (MCP): und persistiert diese in einer JSON-Datei im runtime_state-Verzeichnis.
 # HINWEIS (MCP): Der Dienst wird von anderen MCP-Komponenten genutzt, um Zustandsinformationen
 # HINWEIS (MCP): zwischen Anfragen zu speichern und abzurufen.
+# HINWEIS (MCP): Jede Änderung wird als Zeile an ein Write-Ahead-Log (state_memory.wal) angehängt;
+# HINWEIS (MCP): load_memory() spielt das Log nach dem Laden des Snapshots erneut ein. Überschreitet
+# HINWEIS (MCP): das Log eine Größe, wird es im Hintergrund atomar (Temp-Datei + Rename) in den
+# HINWEIS (MCP): Snapshot state_memory.json verdichtet.
+# HINWEIS (MCP): Die Dauerhaftigkeit ist einstellbar (MCP_MEMORY_DURABILITY): "none" ohne fsync,
+# HINWEIS (MCP): "batched" bündelt gleichzeitige Schreibvorgänge nach kurzer Wartezeit zu einem
+# HINWEIS (MCP): fsync (Group Commit), "always" synchronisiert vor jeder Bestätigung.
+# HINWEIS (MCP): Einträge laufen nach ihrer TTL ab (Standard aus config/policies/memory.policy.yaml,
+# HINWEIS (MCP): pro Schreibvorgang überschreibbar). Abgelaufene Schlüssel werden beim Lesen und von
+# HINWEIS (MCP): einem Hintergrund-Thread entfernt, der einen Min-Heap der Ablaufzeiten abarbeitet.
+# HINWEIS (MCP): Die Größe jedes Werts wird in Bytes erfasst. Überschreiten ein Namensraum (Präfix vor
+# HINWEIS (MCP): dem ersten ":") oder der gesamte Speicher ihr Budget aus memory.policy.yaml, werden
+# HINWEIS (MCP): Schlüssel nach LRU oder LFU verdrängt: je nach Klasse auf die Platte ausgelagert oder verworfen.
+# HINWEIS (MCP): Jede Operation läuft nur unter dem gestreiften Lock ihres Schlüssels; Operationen auf
+# HINWEIS (MCP): verschiedene Schlüssel teilen sich nur kurze Locks für Sequenznummer und Log-Zeile,
+# HINWEIS (MCP): Größenerfassung und Ablaufzeiten. Die HTTP-Schnittstelle liegt in memory_api.py.
 
-import json
 import json
 import os
 import time
 import sys
+import heapq
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - yaml is optional
+    yaml = None
 
 # Configure logging
 import logging
@@ -30,57 +54,1175 @@ MEMORY = {}
 
 MEMORY_FILE = "runtime_state/state_memory.json"
 
-def write_memory(key, value):
-    MEMORY[key] = value
-    persist_memory()
+# Append-only log of mutations since the snapshot in MEMORY_FILE
+MEMORY_WAL_FILE = "runtime_state/state_memory.wal"
 
-def read_memory(key):
-    return MEMORY.get(key)
+# Compact the log into a new snapshot once it grows beyond this size
+WAL_COMPACT_BYTES = int(os.environ.get("MCP_MEMORY_WAL_COMPACT_BYTES", str(4 * 1024 * 1024)))
 
-def load_memory():
-    global MEMORY
-    try:
-        if os.path.isfile(MEMORY_FILE):
-            with open(MEMORY_FILE, "r") as f:
-                MEMORY = json.load(f)
-            logger.info(f"Memory loaded from {MEMORY_FILE}")
+# Durability of writes: "none" (flush to the OS only), "batched" (group commit
+# after at most COMMIT_DELAY_MS) or "always" (fsync before every acknowledgement)
+DURABILITY_MODES = ("none", "batched", "always")
+DURABILITY = os.environ.get("MCP_MEMORY_DURABILITY", "batched")
+COMMIT_DELAY_MS = float(os.environ.get("MCP_MEMORY_COMMIT_DELAY_MS", "2"))
+
+# Memory policy with the expiration and limits settings
+MEMORY_POLICY_FILE = os.environ.get("MCP_MEMORY_POLICY_FILE", "config/policies/memory.policy.yaml")
+EXPIRATION_DEFAULTS = {"default_ttl": None, "cleanup_on_startup": True, "notify_on_expiry": False}
+LIMITS_DEFAULTS = {"max_bytes": None, "eviction_policy": "lru", "namespace_quotas": {}, "spill_namespaces": []}
+DEFAULT_MEMORY_POLICY = dict(EXPIRATION_DEFAULTS, **LIMITS_DEFAULTS)
+MEMORY_POLICY = dict(DEFAULT_MEMORY_POLICY)
+EVICTION_POLICIES = ("lru", "lfu")
+
+# Directory for values evicted from memory in spilling namespaces
+MEMORY_SPILL_DIR = "runtime_state/memory_spill"
+
+# Number of keys listed in the usage statistics
+LARGEST_KEYS_LIMIT = 10
+
+# Upper bound for the sweeper's sleep, so newly added earlier expiries are not missed for long
+SWEEP_MAX_INTERVAL = float(os.environ.get("MCP_MEMORY_SWEEP_INTERVAL", "1.0"))
+
+# Snapshot key holding store metadata (log position, list offsets)
+STORE_META_KEY = "__store__"
+
+# Striped per-key locks: a read or mutation of a key runs under its stripe
+# only, so operations on different keys proceed concurrently
+KEY_LOCK_STRIPES = int(os.environ.get("MCP_MEMORY_LOCK_STRIPES", "64"))
+_KEY_LOCKS = [threading.RLock() for _ in range(max(1, KEY_LOCK_STRIPES))]
+
+# Short locks taken inside a key's stripe, never the other way round: the log
+# lock covers sequence assignment and the log append, the accounting lock the
+# size, access and spill bookkeeping, the expiry lock EXPIRES and its heap
+_LOG_LOCK = threading.RLock()
+_ACCOUNTING_LOCK = threading.RLock()
+_EXPIRY_LOCK = threading.RLock()
+
+class _StoreLock:
+    """Exclusive lock over the whole store: takes every key stripe, in order."""
+    
+    def __enter__(self):
+        for lock in _KEY_LOCKS:
+            lock.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        for lock in reversed(_KEY_LOCKS):
+            lock.release()
+
+# Quiesces the store for loading, snapshots and spill file cleanup; must not
+# be taken while holding a single key's stripe
+MEMORY_LOCK = _StoreLock()
+
+# Number of entries trimmed from the front of each capped list; keeps range
+# cursors stable when append_memory drops old entries
+LIST_OFFSETS = {}
+
+# Absolute expiry time (epoch seconds) per key with a TTL, and a min-heap of
+# (expiry, key); heap entries whose time no longer matches EXPIRES are stale
+EXPIRES = {}
+_EXPIRY_HEAP = []
+_EXPIRY_STATS = {"expired_total": 0}
+_sweeper_thread = None
+_sweeper_stop = threading.Event()
+
+# Byte accounting of resident values: size per key, per namespace and in total
+SIZES = {}
+_NAMESPACE_BYTES = {}
+_total_bytes = 0
+
+# Access order per namespace (key -> access tick, oldest first) and access counts
+_ACCESS = {}
+_HITS = {}
+_access_tick = 0
+# With LFU eviction: min-heap of (hits, tick, key) per namespace; an entry is
+# stale once the key's access tick has moved on
+_LFU_HEAPS = {}
+
+# Keys evicted to disk: key -> (spill file, size)
+SPILLED = {}
+# Spill files referenced by the snapshot on disk; kept until a newer snapshot replaces it
+_SNAPSHOT_SPILL_FILES = set()
+_EVICTION_STATS = {"dropped": 0, "spilled": 0, "spill_loads": 0}
+
+# Serializes compactions
+COMPACTION_LOCK = threading.Lock()
+
+# Sequence number of the last logged mutation
+_wal_seq = 0
+_wal_file = None
+_compaction_thread = None
+
+# Group commit state: the first waiting writer becomes the leader and syncs
+# the log for everyone whose record was written before its flush
+_COMMIT_CONDITION = threading.Condition()
+_durable_seq = 0
+_commit_in_progress = False
+_COMMIT_STATS = {
+    "commits": 0,
+    "committed_writes": 0,
+    "max_batch_size": 0,
+    "fsync_seconds_total": 0.0,
+    "fsync_seconds_max": 0.0
+}
+
+def _compacting_wal_file():
+    """Path the log is moved to while it is compacted."""
+    return MEMORY_WAL_FILE + ".compacting"
+
+def key_lock(key):
+    """Get the striped lock serializing operations on a key."""
+    return _KEY_LOCKS[hash(key) % len(_KEY_LOCKS)]
+
+def _log_mutation(record):
+    """
+    Append a mutation to the write-ahead log.
+    
+    Must be called with the key's lock held, before the mutation is applied,
+    so that a value that cannot be serialized leaves memory unchanged. The
+    record is encoded before _LOG_LOCK is taken; the log lock only covers the
+    sequence number and the append.
+    
+    Args:
+        record: The mutation; its "seq" is set here
+    
+    Raises:
+        TypeError: If the record cannot be serialized as JSON
+    """
+    global _wal_seq, _wal_file
+    payload = json.dumps(record, separators=(",", ":"))
+    with _LOG_LOCK:
+        record["seq"] = _wal_seq + 1
+        line = '{"seq":' + str(record["seq"]) + "," + payload[1:] + "\n"
+        if _wal_file is None:
+            os.makedirs(os.path.dirname(MEMORY_WAL_FILE) or ".", exist_ok=True)
+            _wal_file = open(MEMORY_WAL_FILE, "a", encoding="utf-8")
+        _wal_file.write(line)
+        if DURABILITY == "none":
+            _wal_file.flush()
+        _wal_seq = record["seq"]
+        if _wal_file.tell() >= WAL_COMPACT_BYTES:
+            _start_compaction()
+
+def check_durability():
+    """
+    Validate the configured durability mode.
+    
+    load_memory calls this first, so an invalid mode stops the store at
+    startup instead of failing every write.
+    
+    Raises:
+        ValueError: If DURABILITY is not a valid mode
+    """
+    if DURABILITY not in DURABILITY_MODES:
+        raise ValueError(f"Invalid MCP_MEMORY_DURABILITY '{DURABILITY}', expected one of {DURABILITY_MODES}")
+
+def _last_seq():
+    """Sequence number of the last logged mutation."""
+    return _wal_seq
+
+def _commit(seq):
+    """
+    Wait until the log record with the given sequence number is durable.
+    
+    Must be called without any key lock held. One waiting writer becomes the
+    leader: in "batched" mode it first waits COMMIT_DELAY_MS for more
+    writers, then flushes the log under _LOG_LOCK and fsyncs it outside of
+    it, so new writes are not blocked by the fsync. All writers whose
+    records were covered are released together.
+    
+    Raises:
+        OSError: If the log could not be synced
+    """
+    global _commit_in_progress
+    mode = DURABILITY
+    if mode == "none":
+        return
+    with _COMMIT_CONDITION:
+        while _durable_seq < seq:
+            if not _commit_in_progress:
+                _commit_in_progress = True
+                break
+            _COMMIT_CONDITION.wait()
         else:
-            MEMORY = {}
-            logger.warning(f"Memory file {MEMORY_FILE} not found, initializing empty memory")
-    except Exception as e:
-        logger.error(f"Error loading memory: {e}")
-        MEMORY = {}
+            return
+    try:
+        if mode == "batched" and COMMIT_DELAY_MS > 0:
+            time.sleep(COMMIT_DELAY_MS / 1000.0)
+        _sync_wal()
+    finally:
+        with _COMMIT_CONDITION:
+            _commit_in_progress = False
+            _COMMIT_CONDITION.notify_all()
 
-def persist_memory():
+def _sync_wal():
+    """Flush and fsync the log, then mark everything written so far as durable."""
+    with _LOG_LOCK:
+        target = _wal_seq
+        fd = None
+        if _wal_file is not None:
+            _wal_file.flush()
+            # A duplicate descriptor stays valid if a compaction closes the log meanwhile
+            fd = os.dup(_wal_file.fileno())
+    start = time.perf_counter()
+    if fd is not None:
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    _mark_durable(target, time.perf_counter() - start)
+
+def _mark_durable(target, fsync_seconds):
+    """Record a finished commit and release the writers it covers."""
+    global _durable_seq
+    with _COMMIT_CONDITION:
+        batch_size = max(0, target - _durable_seq)
+        _durable_seq = max(_durable_seq, target)
+        if batch_size:
+            _COMMIT_STATS["commits"] += 1
+            _COMMIT_STATS["committed_writes"] += batch_size
+            _COMMIT_STATS["max_batch_size"] = max(_COMMIT_STATS["max_batch_size"], batch_size)
+            _COMMIT_STATS["fsync_seconds_total"] += fsync_seconds
+            _COMMIT_STATS["fsync_seconds_max"] = max(_COMMIT_STATS["fsync_seconds_max"], fsync_seconds)
+        _COMMIT_CONDITION.notify_all()
+
+def _reset_durable_seq(seq):
+    """Set the durable position after the log was loaded from disk."""
+    global _durable_seq
+    with _COMMIT_CONDITION:
+        _durable_seq = seq
+
+def get_commit_stats():
+    """
+    Get the group commit counters.
+    
+    Returns:
+        Dictionary with the durability mode, number of commits and committed
+        writes, mean and max batch size and fsync latency (seconds)
+    """
+    with _COMMIT_CONDITION:
+        stats = dict(_COMMIT_STATS)
+    commits = stats["commits"]
+    stats["durability"] = DURABILITY
+    stats["mean_batch_size"] = round(stats["committed_writes"] / commits, 2) if commits else 0.0
+    stats["fsync_seconds_mean"] = stats["fsync_seconds_total"] / commits if commits else 0.0
+    return stats
+
+def _apply_append(key, entry, max_entries, entry_size=None):
+    """Append to a list in MEMORY; shared by append_memory and log replay."""
+    _ensure_resident(key)
+    entries = MEMORY.get(key)
+    if entries is None:
+        entries = MEMORY[key] = []
+    elif not isinstance(entries, list):
+        raise TypeError(f"Cannot append to memory key '{key}': value is not a list")
+    # Account incrementally: "[]" plus each entry and the commas between them
+    size = SIZES.get(key, len(key) + 2)
+    size += (_json_size(entry) if entry_size is None else entry_size) + (1 if entries else 0)
+    entries.append(entry)
+    if max_entries is not None and max_entries >= 0 and len(entries) > max_entries:
+        trimmed = len(entries) - max_entries
+        size -= sum(_json_size(old) for old in entries[:trimmed]) + trimmed - (0 if max_entries else 1)
+        del entries[:trimmed]
+        LIST_OFFSETS[key] = LIST_OFFSETS.get(key, 0) + trimmed
+    _account(key, size)
+    return len(entries)
+
+def _apply_set(key, value, size=None):
+    """Store a value in MEMORY; shared by write_memory and log replay."""
+    _drop_spilled(key)
+    MEMORY[key] = value
+    LIST_OFFSETS.pop(key, None)
+    _account(key, _value_size(key, value) if size is None else size)
+
+def _apply_record(record):
+    """Apply a logged mutation to MEMORY."""
+    op = record.get("op")
+    key = record.get("key")
+    if op == "set":
+        _apply_set(key, record.get("value"))
+        _set_expiry(key, record.get("expires_at"))
+    elif op == "append":
+        _apply_append(key, record.get("entry"), record.get("max_entries"))
+        _set_expiry(key, record.get("expires_at"))
+    elif op == "delete":
+        _remove_key(key)
+    else:
+        logger.warning(f"Skipping unknown write-ahead log operation: {op}")
+
+def load_memory_policy(policy_file=None):
+    """
+    Load the expiration and limits settings from the memory policy.
+    
+    Args:
+        policy_file: Path to memory.policy.yaml (default: MEMORY_POLICY_FILE)
+        
+    Returns:
+        Dictionary with default_ttl (seconds or None), cleanup_on_startup,
+        notify_on_expiry, max_bytes (bytes or None), eviction_policy,
+        namespace_quotas (namespace -> bytes) and spill_namespaces; missing
+        values fall back to DEFAULT_MEMORY_POLICY
+    """
+    policy = dict(DEFAULT_MEMORY_POLICY, namespace_quotas={}, spill_namespaces=[])
+    policy_file = policy_file or MEMORY_POLICY_FILE
+    if yaml is None:
+        logger.warning(f"PyYAML is not installed, ignoring memory policy {policy_file}")
+        return policy
     try:
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(MEMORY_FILE), exist_ok=True)
-        with open(MEMORY_FILE, "w") as f:
-            json.dump(MEMORY, f, indent=2)
-        logger.info(f"Memory persisted to {MEMORY_FILE}")
+        with open(policy_file, "r", encoding="utf-8") as f:
+            document = yaml.safe_load(f) or {}
+        expiration = document.get("expiration") or {}
+        for key in EXPIRATION_DEFAULTS:
+            if key in expiration:
+                policy[key] = expiration[key]
+        if policy["default_ttl"] is not None:
+            policy["default_ttl"] = float(policy["default_ttl"])
+        
+        limits = document.get("limits") or {}
+        for key in LIMITS_DEFAULTS:
+            if limits.get(key) is not None:
+                policy[key] = limits[key]
+        if policy["max_bytes"] is not None:
+            policy["max_bytes"] = parse_size(policy["max_bytes"])
+        policy["namespace_quotas"] = {
+            str(namespace): parse_size(quota) for namespace, quota in dict(policy["namespace_quotas"]).items()
+        }
+        policy["spill_namespaces"] = [str(namespace) for namespace in policy["spill_namespaces"]]
+        if policy["eviction_policy"] not in EVICTION_POLICIES:
+            logger.error(f"Invalid eviction_policy '{policy['eviction_policy']}' in {policy_file}, using lru")
+            policy["eviction_policy"] = "lru"
+    except FileNotFoundError:
+        logger.warning(f"Memory policy {policy_file} not found, entries do not expire by default")
     except Exception as e:
-        logger.error(f"Error persisting memory: {e}")
+        logger.error(f"Error loading memory policy from {policy_file}: {e}")
+    return policy
 
-def start_server():
-    """Start the memory handler server and keep it running."""
-    logger.info("Starting memory handler server...")
-    logger.info(f"Process ID: {os.getpid()}")
-    logger.info(f"Working directory: {os.getcwd()}")
+def parse_size(value):
+    """
+    Parse a size like "64MB" or 1024 into bytes.
     
-    # Initialize memory
-    load_memory()
+    Raises:
+        ValueError: If the size cannot be parsed
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().upper()
+    for suffix, factor in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)].strip()) * factor)
+    return int(text)
+
+class MemoryLimitError(ValueError):
+    """Raised when a value alone exceeds the memory budget or its namespace quota."""
+
+def namespace_of(key):
+    """Get the namespace of a key: the part before the first ":" (the whole key if there is none)."""
+    return key.split(":", 1)[0]
+
+def _json_size(value):
+    """Size of a value in compact JSON, in bytes."""
+    return len(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+def _value_size(key, value):
+    """Accounted size of a key and its value."""
+    return len(key) + _json_size(value)
+
+def _account(key, size):
+    """Record the size of a resident key and mark it as accessed (the key's lock must be held)."""
+    global _total_bytes
+    namespace = namespace_of(key)
+    with _ACCOUNTING_LOCK:
+        delta = size - SIZES.get(key, 0)
+        SIZES[key] = size
+        _NAMESPACE_BYTES[namespace] = _NAMESPACE_BYTES.get(namespace, 0) + delta
+        _total_bytes += delta
+        _touch(key)
+
+def _touch(key):
+    """Mark a resident key as accessed (the key's lock must be held)."""
+    global _access_tick
+    namespace = namespace_of(key)
+    with _ACCOUNTING_LOCK:
+        if key not in SIZES:
+            return
+        _access_tick += 1
+        order = _ACCESS.setdefault(namespace, OrderedDict())
+        order[key] = _access_tick
+        order.move_to_end(key)
+        _HITS[key] = _HITS.get(key, 0) + 1
+        if MEMORY_POLICY.get("eviction_policy") == "lfu":
+            heap = _LFU_HEAPS.setdefault(namespace, [])
+            heapq.heappush(heap, (_HITS[key], _access_tick, key))
+            if len(heap) > 2 * len(order) + 64:
+                # Drop the stale entries once they outnumber the live ones
+                heap[:] = [(_HITS[k], tick, k) for k, tick in order.items()]
+                heapq.heapify(heap)
+
+def _forget(key):
+    """Remove a key from the accounting (the key's lock must be held)."""
+    global _total_bytes
+    namespace = namespace_of(key)
+    with _ACCOUNTING_LOCK:
+        size = SIZES.pop(key, None)
+        if size is None:
+            return
+        _NAMESPACE_BYTES[namespace] -= size
+        _total_bytes -= size
+        order = _ACCESS.get(namespace)
+        if order is not None:
+            order.pop(key, None)
+            if not order:
+                del _ACCESS[namespace]
+                _NAMESPACE_BYTES.pop(namespace, None)
+                _LFU_HEAPS.pop(namespace, None)
+        _HITS.pop(key, None)
+
+def _lfu_candidate(namespace, protect=None):
+    """
+    Get the least frequently used entry (hits, tick, key) of a namespace.
+    
+    Stale heap entries are popped on the way, so the cost is amortized
+    O(log n) per eviction. _ACCOUNTING_LOCK must be held.
+    """
+    heap = _LFU_HEAPS.get(namespace)
+    order = _ACCESS.get(namespace, {})
+    held = None
+    candidate = None
+    while heap:
+        entry = heap[0]
+        if order.get(entry[2]) != entry[1]:
+            heapq.heappop(heap)
+        elif entry[2] == protect:
+            held = heapq.heappop(heap)
+        else:
+            candidate = entry
+            break
+    if held is not None:
+        heapq.heappush(heap, held)
+    return candidate
+
+def _check_fits(key, size):
+    """
+    Reject a value that could not fit even after evicting everything else.
+    
+    Raises:
+        MemoryLimitError: If size exceeds the global budget or the namespace quota
+    """
+    max_bytes = MEMORY_POLICY.get("max_bytes")
+    if max_bytes is not None and size > max_bytes:
+        raise MemoryLimitError(f"Memory key '{key}' needs {size} bytes, the memory budget is {max_bytes} bytes")
+    quota = MEMORY_POLICY.get("namespace_quotas", {}).get(namespace_of(key))
+    if quota is not None and size > quota:
+        raise MemoryLimitError(
+            f"Memory key '{key}' needs {size} bytes, the quota of namespace '{namespace_of(key)}' is {quota} bytes"
+        )
+
+def _pick_victim(namespace=None, protect=None):
+    """
+    Choose the key to evict, by the policy's LRU or LFU order (_ACCOUNTING_LOCK
+    must be held).
+    
+    Args:
+        namespace: Only consider keys of this namespace
+        protect: Key that must not be evicted (the one just written)
+        
+    Returns:
+        The key, or None if there is no candidate
+    """
+    if MEMORY_POLICY.get("eviction_policy") == "lfu":
+        namespaces = list(_LFU_HEAPS) if namespace is None else [namespace]
+        candidates = [_lfu_candidate(name, protect) for name in namespaces]
+        candidates = [candidate for candidate in candidates if candidate is not None]
+        return min(candidates)[2] if candidates else None
+    if namespace is None:
+        orders = list(_ACCESS.values())
+    else:
+        orders = [_ACCESS[namespace]] if namespace in _ACCESS else []
+    best = None
+    for order in orders:
+        # The oldest entry of each namespace; skip the protected key
+        for key, tick in order.items():
+            if key != protect:
+                if best is None or tick < best[0]:
+                    best = (tick, key)
+                break
+    return best[1] if best else None
+
+def _spill_path(key):
+    """Get a new, unique spill file path for a key."""
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(MEMORY_SPILL_DIR, f"{digest}-{_wal_seq}-{_access_tick}.json")
+
+def _evict(key):
+    """
+    Evict a resident key: spill it to disk or drop it, by its namespace.
     
+    The key's lock must be held; the spill file is written under it alone. A
+    drop is logged as a delete record; the caller commits it together with
+    its own record (see _last_seq).
+    """
+    namespace = namespace_of(key)
+    if namespace in MEMORY_POLICY.get("spill_namespaces", []):
+        path = _spill_path(key)
+        os.makedirs(MEMORY_SPILL_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(MEMORY[key], f, separators=(",", ":"))
+            if DURABILITY != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        MEMORY.pop(key, None)
+        with _ACCOUNTING_LOCK:
+            SPILLED[key] = (path, SIZES.get(key, 0))
+            _forget(key)
+            _EVICTION_STATS["spilled"] += 1
+        logger.debug(f"Spilled memory key {key} to {path}")
+    else:
+        _log_mutation({"op": "delete", "key": key})
+        _remove_key(key)
+        with _ACCOUNTING_LOCK:
+            _EVICTION_STATS["dropped"] += 1
+        logger.info(f"Evicted memory key {key} (namespace {namespace} over its limit)")
+
+def _evict_while(over_limit, namespace, protect):
+    """
+    Evict keys while over_limit() holds.
+    
+    Each victim is chosen under _ACCOUNTING_LOCK and evicted under its own
+    key lock, which is taken only after the accounting lock was released.
+    """
+    while True:
+        with _ACCOUNTING_LOCK:
+            if not over_limit():
+                return
+            victim = _pick_victim(namespace, protect)
+        if victim is None:
+            return
+        with key_lock(victim):
+            # Skip a victim that was removed or spilled meanwhile
+            if victim in SIZES:
+                _evict(victim)
+
+def _enforce_limits(protect=None):
+    """
+    Evict keys until every namespace quota and the global budget hold.
+    
+    Must be called without a key lock held (or with MEMORY_LOCK held), as it
+    takes the key lock of each victim.
+    
+    Args:
+        protect: Key that must not be evicted (the one just written)
+    """
+    quotas = MEMORY_POLICY.get("namespace_quotas", {})
+    with _ACCOUNTING_LOCK:
+        namespaces = [namespace_of(protect)] if protect is not None else list(_NAMESPACE_BYTES)
+    for namespace in namespaces:
+        quota = quotas.get(namespace)
+        if quota is not None:
+            _evict_while(lambda: _NAMESPACE_BYTES.get(namespace, 0) > quota, namespace, protect)
+    max_bytes = MEMORY_POLICY.get("max_bytes")
+    if max_bytes is not None:
+        _evict_while(lambda: _total_bytes > max_bytes, None, protect)
+
+def _ensure_resident(key):
+    """Load a spilled key back into memory (the key's lock must be held)."""
+    with _ACCOUNTING_LOCK:
+        spilled = SPILLED.pop(key, None)
+    if spilled is None:
+        return
+    path, size = spilled
+    # The file stays until a snapshot no longer references it
     try:
-        # Keep the process running
-        while True:
-            logger.info("Memory handler server is running...")
-            time.sleep(60)  # Sleep for 60 seconds
-    except KeyboardInterrupt:
-        logger.info("Memory handler server shutting down...")
-    except Exception as e:
-        logger.error(f"Error in memory handler server: {e}")
+        with open(path, "r", encoding="utf-8") as f:
+            MEMORY[key] = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading spilled memory key {key} from {path}: {e}")
+        LIST_OFFSETS.pop(key, None)
+        _set_expiry(key, None)
+        return
+    _account(key, size)
+    with _ACCOUNTING_LOCK:
+        _EVICTION_STATS["spill_loads"] += 1
+
+def _load_resident(key):
+    """
+    Make a key resident for a read (the key's lock must be held).
+    
+    Returns:
+        True if the key was loaded back from disk; the caller then enforces
+        the limits once it has released the key's lock
+    """
+    if key in SPILLED:
+        _ensure_resident(key)
+        return True
+    _touch(key)
+    return False
+
+def _drop_spilled(key):
+    """Forget the spilled copy of a key that is overwritten or removed."""
+    with _ACCOUNTING_LOCK:
+        SPILLED.pop(key, None)
+
+def _reset_accounting():
+    """Clear the size, access and spill bookkeeping (MEMORY_LOCK must be held)."""
+    global _total_bytes
+    with _ACCOUNTING_LOCK:
+        SIZES.clear()
+        _NAMESPACE_BYTES.clear()
+        _ACCESS.clear()
+        _HITS.clear()
+        _LFU_HEAPS.clear()
+        SPILLED.clear()
+        _total_bytes = 0
+
+def _cleanup_spill_files():
+    """
+    Delete spill files referenced neither by the current state nor by the snapshot on disk.
+    
+    MEMORY_LOCK must be held, so no eviction has written a file it has not
+    registered in SPILLED yet.
+    """
+    if not os.path.isdir(MEMORY_SPILL_DIR):
+        return
+    keep = {os.path.abspath(path) for path, _ in SPILLED.values()}
+    keep.update(os.path.abspath(path) for path in _SNAPSHOT_SPILL_FILES)
+    for name in os.listdir(MEMORY_SPILL_DIR):
+        path = os.path.join(MEMORY_SPILL_DIR, name)
+        if os.path.abspath(path) not in keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove spill file {path}: {e}")
+
+def get_memory_usage():
+    """
+    Get the memory accounting.
+    
+    Returns:
+        Dictionary with total and budget bytes, per-namespace bytes, keys and
+        quotas, the largest keys, spilled keys and bytes, and eviction counts
+    """
+    with _ACCOUNTING_LOCK:
+        quotas = MEMORY_POLICY.get("namespace_quotas", {})
+        namespaces = {
+            namespace: {"bytes": size, "keys": len(_ACCESS.get(namespace, ())), "quota": quotas.get(namespace)}
+            for namespace, size in _NAMESPACE_BYTES.items()
+        }
+        largest = heapq.nlargest(LARGEST_KEYS_LIMIT, SIZES.items(), key=lambda item: item[1])
+        return {
+            "total_bytes": _total_bytes,
+            "max_bytes": MEMORY_POLICY.get("max_bytes"),
+            "eviction_policy": MEMORY_POLICY.get("eviction_policy"),
+            "keys": len(SIZES),
+            "namespaces": namespaces,
+            "largest_keys": [{"key": key, "bytes": size} for key, size in largest],
+            "spilled_keys": len(SPILLED),
+            "spilled_bytes": sum(size for _, size in SPILLED.values()),
+            "evictions": dict(_EVICTION_STATS)
+        }
+
+def _expiry_for(ttl, now=None):
+    """
+    Get the absolute expiry time for a TTL.
+    
+    Args:
+        ttl: Seconds to live; None uses the policy's default_ttl, zero or a
+            negative value means the entry never expires
+        
+    Returns:
+        Epoch seconds, or None if the entry does not expire
+    """
+    if ttl is None:
+        ttl = MEMORY_POLICY.get("default_ttl")
+    if ttl is None or ttl <= 0:
+        return None
+    return (now if now is not None else time.time()) + ttl
+
+def _set_expiry(key, expires_at):
+    """Set or clear the expiry of a key (the key's lock must be held)."""
+    with _EXPIRY_LOCK:
+        if expires_at is None:
+            EXPIRES.pop(key, None)
+            return
+        EXPIRES[key] = expires_at
+        heapq.heappush(_EXPIRY_HEAP, (expires_at, key))
+        # Rewritten keys leave stale heap entries behind; rebuild once they dominate
+        if len(_EXPIRY_HEAP) > 2 * len(EXPIRES) + 1024:
+            _rebuild_expiry_heap()
+
+def _rebuild_expiry_heap():
+    """Rebuild the expiry heap from EXPIRES."""
+    with _EXPIRY_LOCK:
+        _EXPIRY_HEAP[:] = [(expires_at, key) for key, expires_at in EXPIRES.items()]
+        heapq.heapify(_EXPIRY_HEAP)
+
+def _remove_key(key):
+    """Remove a key with its metadata (the key's lock must be held)."""
+    existed = key in MEMORY or key in SPILLED
+    MEMORY.pop(key, None)
+    _drop_spilled(key)
+    _forget(key)
+    LIST_OFFSETS.pop(key, None)
+    _set_expiry(key, None)
+    return existed
+
+def _expire_key(key):
+    """
+    Log and apply the expiry of a key (the key's lock must be held).
+    
+    Writers and the sweeper commit the delete record. Expiries found by
+    reads are not waited for: they become durable with the next commit, and
+    if they are lost in a crash the key is past its TTL after the replay and
+    expires again.
+    """
+    _log_mutation({"op": "delete", "key": key})
+    _remove_key(key)
+    with _EXPIRY_LOCK:
+        _EXPIRY_STATS["expired_total"] += 1
+    if MEMORY_POLICY.get("notify_on_expiry"):
+        logger.info(f"Memory key expired: {key}")
+
+def _expire_if_due(key, now=None):
+    """Expire a single key if its TTL has passed (the key's lock must be held)."""
+    expires_at = EXPIRES.get(key)
+    if expires_at is not None and expires_at <= (now if now is not None else time.time()):
+        _expire_key(key)
+
+def expire_due_keys(now=None):
+    """
+    Remove all keys whose TTL has passed.
+    
+    Pops the expiry heap only as far as entries are due, so the cost is
+    proportional to the number of expiring keys, not to the memory size.
+    
+    Returns:
+        Number of expired keys
+    """
+    now = now if now is not None else time.time()
+    expired = 0
+    while True:
+        with _EXPIRY_LOCK:
+            if not _EXPIRY_HEAP or _EXPIRY_HEAP[0][0] > now:
+                break
+            expires_at, key = heapq.heappop(_EXPIRY_HEAP)
+        with key_lock(key):
+            # The key may have been rewritten since the entry was popped
+            if EXPIRES.get(key) == expires_at:
+                _expire_key(key)
+                expired += 1
+    if expired:
+        logger.debug(f"Expired {expired} memory key(s)")
+    return expired
+
+def _sweep_loop():
+    """Expire keys in the background, sleeping until the next expiry is due."""
+    while not _sweeper_stop.is_set():
+        try:
+            if expire_due_keys():
+                _commit(_last_seq())
+        except Exception as e:
+            logger.error(f"Error expiring memory keys: {e}")
+        with _EXPIRY_LOCK:
+            next_due = _EXPIRY_HEAP[0][0] if _EXPIRY_HEAP else None
+        timeout = SWEEP_MAX_INTERVAL
+        if next_due is not None:
+            timeout = min(timeout, max(0.0, next_due - time.time()))
+        _sweeper_stop.wait(timeout)
+
+def start_expiry_sweeper():
+    """Start the background expiry thread unless it is already running."""
+    global _sweeper_thread
+    if _sweeper_thread is not None and _sweeper_thread.is_alive():
+        return
+    _sweeper_stop.clear()
+    _sweeper_thread = threading.Thread(target=_sweep_loop, name="memory-expiry", daemon=True)
+    _sweeper_thread.start()
+
+def stop_expiry_sweeper(timeout=None):
+    """Stop the background expiry thread."""
+    _sweeper_stop.set()
+    if _sweeper_thread is not None:
+        _sweeper_thread.join(timeout)
+
+def get_expiry_stats():
+    """
+    Get the expiry counters.
+    
+    Returns:
+        Dictionary with the default TTL, number of keys with a TTL, size of the
+        expiry heap and the number of keys expired so far
+    """
+    with _EXPIRY_LOCK:
+        return {
+            "default_ttl": MEMORY_POLICY.get("default_ttl"),
+            "keys_with_ttl": len(EXPIRES),
+            "heap_size": len(_EXPIRY_HEAP),
+            "expired_total": _EXPIRY_STATS["expired_total"]
+        }
+
+def write_memory(key, value, ttl=None):
+    """
+    Store a value under a key.
+    
+    The write costs one appended log line, independent of the memory size.
+    It returns once the line is durable according to DURABILITY; readers
+    see the new value already before that.
+    
+    Args:
+        key: The key to write
+        value: The JSON-serializable value
+        ttl: Seconds until the entry expires; None uses the policy's
+            default_ttl, zero or a negative value keeps the entry forever
     
-    logger.info("Memory handler server stopped.")
+    Raises:
+        TypeError: If the value cannot be serialized as JSON
+    """
+    size = _value_size(key, value)
+    _check_fits(key, size)
+    expires_at = _expiry_for(ttl)
+    record = {"op": "set", "key": key, "value": value, "expires_at": expires_at}
+    with key_lock(key):
+        _log_mutation(record)
+        _apply_set(key, value, size)
+        _set_expiry(key, expires_at)
+    _enforce_limits(protect=key)
+    # Covers the delete records of keys evicted for this write
+    _commit(_last_seq())
+
+def read_memory(key):
+    """Read the value of a key; expired keys read as None, spilled keys are loaded back."""
+    with key_lock(key):
+        _expire_if_due(key)
+        loaded = _load_resident(key)
+        value = MEMORY.get(key)
+    if loaded:
+        _enforce_limits(protect=key)
+    return value
+
+def delete_memory(key):
+    """
+    Delete a key.
+    
+    Returns:
+        True if the key existed
+    """
+    with key_lock(key):
+        _expire_if_due(key)
+        if key not in MEMORY and key not in SPILLED:
+            return False
+        _log_mutation({"op": "delete", "key": key})
+        _remove_key(key)
+    _commit(_last_seq())
+    return True
+
+def append_memory(key, entry, max_entries=None, ttl=None):
+    """
+    Atomically append an entry to the list stored under a key.
+    
+    A missing key starts a new list. Concurrent appends never lose entries
+    because the read-modify-write happens under the key's lock.
+    
+    Args:
+        key: The key holding the list
+        entry: The entry to append
+        max_entries: Optional cap; only the newest max_entries entries are kept
+        ttl: Seconds until the list expires, counted from this append (see
+            write_memory)
+        
+    Returns:
+        The number of entries stored under the key after the append
+        
+    Raises:
+        TypeError: If the key holds a value that is not a list
+        MemoryLimitError: If the entry alone exceeds the memory budget
+    """
+    entry_size = _json_size(entry)
+    _check_fits(key, len(key) + 2 + entry_size)
+    expires_at = _expiry_for(ttl)
+    record = {"op": "append", "key": key, "entry": entry, "max_entries": max_entries, "expires_at": expires_at}
+    with key_lock(key):
+        _expire_if_due(key)
+        _load_resident(key)
+        entries = MEMORY.get(key)
+        if entries is not None and not isinstance(entries, list):
+            raise TypeError(f"Cannot append to memory key '{key}': value is not a list")
+        _log_mutation(record)
+        length = _apply_append(key, entry, max_entries, entry_size)
+        _set_expiry(key, expires_at)
+    _enforce_limits(protect=key)
+    _commit(_last_seq())
+    return length
+
+def read_memory_range(key, last=None, after=None):
+    """
+    Read part of the list stored under a key.
+    
+    Entries are addressed by their position since the list was written, so a
+    cursor stays valid when append_memory trims old entries.
+    
+    Args:
+        key: The key holding the list
+        last: Return at most the newest `last` entries
+        after: Cursor from a previous call; return only entries appended since
+        
+    Returns:
+        Dictionary with the selected "entries" and the "cursor" to pass as
+        `after` in the next call
+        
+    Raises:
+        TypeError: If the key holds a value that is not a list
+    """
+    with key_lock(key):
+        _expire_if_due(key)
+        loaded = _load_resident(key)
+        entries = MEMORY.get(key)
+        if entries is not None and not isinstance(entries, list):
+            raise TypeError(f"Cannot read a range of memory key '{key}': value is not a list")
+        result = _list_range(key, entries or [], last, after)
+    if loaded:
+        _enforce_limits(protect=key)
+    return result
+
+def _list_range(key, entries, last=None, after=None):
+    """Select the entries of a list for read_memory_range (the key's lock must be held)."""
+    offset = LIST_OFFSETS.get(key, 0)
+    cursor = offset + len(entries)
+    start = 0
+    if after is not None:
+        start = max(0, min(after, cursor) - offset)
+    if last is not None:
+        start = max(start, len(entries) - max(last, 0))
+    return {"entries": entries[start:], "cursor": cursor}
+
+def read_memory_many(keys, last=None):
+    """
+    Read several keys in one operation.
+    
+    Args:
+        keys: The keys to read
+        last: Optional mapping of key to the number of newest list entries to
+            return instead of the full list
+        
+    Returns:
+        Dictionary mapping each requested key to its value (None if missing)
+    """
+    last = last or {}
+    now = time.time()
+    values = {}
+    for key in keys:
+        # One key lock at a time, so the read never waits for two stripes at once
+        with key_lock(key):
+            _expire_if_due(key, now)
+            loaded = _load_resident(key)
+            value = MEMORY.get(key)
+            if key in last and isinstance(value, list):
+                value = _list_range(key, value, last=last[key])["entries"]
+        if loaded:
+            _enforce_limits(protect=key)
+        values[key] = value
+    return values
+
+def _replay_wal(path, after_seq):
+    """
+    Apply the mutations of a log file that are newer than after_seq.
+    
+    A torn last line (crash during a write) is cut off, so that records
+    appended later are not hidden behind it.
+    
+    Returns:
+        Sequence number of the last applied mutation (after_seq if none)
+    """
+    seq = after_seq
+    if not os.path.isfile(path):
+        return seq
+    valid_end = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            valid_end += len(line)
+            if record.get("seq", 0) <= seq:
+                continue
+            try:
+                _apply_record(record)
+            except TypeError as e:
+                logger.error(f"Error replaying write-ahead log record {record.get('seq')}: {e}")
+            seq = record["seq"]
+    if valid_end < os.path.getsize(path):
+        logger.warning(f"Truncating incomplete write-ahead log record in {path} at byte {valid_end}")
+        with open(path, "r+b") as f:
+            f.truncate(valid_end)
+    return seq
+
+def load_memory():
+    """
+    Load the snapshot and replay the write-ahead log on top of it.
+    
+    The memory policy is (re)loaded as well; with cleanup_on_startup, keys
+    that expired while the store was down are removed right away. Keys over
+    the memory budget are evicted once the state is complete.
+    
+    Raises:
+        ValueError: If DURABILITY is not a valid mode
+    """
+    global MEMORY, _wal_seq
+    check_durability()
+    with MEMORY_LOCK:
+        _close_wal()
+        MEMORY_POLICY.clear()
+        MEMORY_POLICY.update(load_memory_policy())
+        LIST_OFFSETS.clear()
+        with _EXPIRY_LOCK:
+            EXPIRES.clear()
+        _reset_accounting()
+        _SNAPSHOT_SPILL_FILES.clear()
+        snapshot_seq = 0
+        try:
+            if os.path.isfile(MEMORY_FILE):
+                with open(MEMORY_FILE, "r") as f:
+                    MEMORY = json.load(f)
+                meta = MEMORY.pop(STORE_META_KEY, None) or {}
+                snapshot_seq = int(meta.get("wal_seq", 0))
+                LIST_OFFSETS.update(meta.get("list_offsets", {}))
+                with _EXPIRY_LOCK:
+                    EXPIRES.update(meta.get("expires", {}))
+                with _ACCOUNTING_LOCK:
+                    for key, (path, size) in meta.get("spilled", {}).items():
+                        SPILLED[key] = (path, size)
+                        _SNAPSHOT_SPILL_FILES.add(path)
+                logger.info(f"Memory loaded from {MEMORY_FILE}")
+            else:
+                MEMORY = {}
+                logger.warning(f"Memory file {MEMORY_FILE} not found, initializing empty memory")
+        except Exception as e:
+            logger.error(f"Error loading memory: {e}")
+            MEMORY = {}
+        
+        for key, value in MEMORY.items():
+            _account(key, _value_size(key, value))
+        
+        # A log left over from an interrupted compaction is older than the current one
+        seq = _replay_wal(_compacting_wal_file(), snapshot_seq)
+        _wal_seq = _replay_wal(MEMORY_WAL_FILE, seq)
+        _reset_durable_seq(_wal_seq)
+        if _wal_seq > snapshot_seq:
+            logger.info(f"Replayed write-ahead log up to mutation {_wal_seq}")
+        _rebuild_expiry_heap()
+        
+        if MEMORY_POLICY.get("cleanup_on_startup"):
+            expired = expire_due_keys()
+            if expired:
+                logger.info(f"Removed {expired} expired memory key(s) on startup")
+        _enforce_limits()
+        _cleanup_spill_files()
+    # Startup expiries and evictions are durable before the store serves requests
+    _commit(_last_seq())
+
+def _close_wal():
+    """Close the log file handle, syncing it first (MEMORY_LOCK must be held)."""
+    global _wal_file
+    with _LOG_LOCK:
+        if _wal_file is not None:
+            _wal_file.flush()
+            if DURABILITY != "none":
+                start = time.perf_counter()
+                os.fsync(_wal_file.fileno())
+                _mark_durable(_wal_seq, time.perf_counter() - start)
+            _wal_file.close()
+            _wal_file = None
+
+def _snapshot_document():
+    """Serialize MEMORY with its metadata (MEMORY_LOCK must be held)."""
+    document = dict(MEMORY)
+    document[STORE_META_KEY] = {
+        "wal_seq": _wal_seq,
+        "list_offsets": dict(LIST_OFFSETS),
+        "expires": dict(EXPIRES),
+        "spilled": {key: list(spilled) for key, spilled in SPILLED.items()}
+    }
+    return json.dumps(document)
+
+def _write_snapshot(data):
+    """Atomically replace the snapshot file: write a temp file, fsync, rename."""
+    os.makedirs(os.path.dirname(MEMORY_FILE) or ".", exist_ok=True)
+    tmp_file = f"{MEMORY_FILE}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, MEMORY_FILE)
+
+def compact_memory():
+    """
+    Compact the write-ahead log into a new snapshot.
+    
+    The memory is serialized and the log is moved aside under MEMORY_LOCK, so
+    writes continue into a fresh log while the snapshot is written. The moved
+    log is deleted only after the snapshot was atomically renamed into place;
+    until then load_memory replays it, so a crash at any point loses nothing.
+    Spill files are deleted once no snapshot references them anymore.
+    
+    Returns:
+        True if the snapshot was written
+    """
+    with COMPACTION_LOCK:
+        with MEMORY_LOCK:
+            data = _snapshot_document()
+            spill_files = {path for path, _ in SPILLED.values()}
+            _close_wal()
+            compacting = _compacting_wal_file()
+            if os.path.isfile(MEMORY_WAL_FILE):
+                if os.path.isfile(compacting):
+                    # An earlier compaction failed; keep its records until a snapshot covers them
+                    with open(MEMORY_WAL_FILE, "rb") as src, open(compacting, "ab") as dst:
+                        dst.write(src.read())
+                    os.remove(MEMORY_WAL_FILE)
+                else:
+                    os.replace(MEMORY_WAL_FILE, compacting)
+        try:
+            _write_snapshot(data)
+        except Exception as e:
+            logger.error(f"Error compacting memory: {e}")
+            return False
+        if os.path.isfile(compacting):
+            os.remove(compacting)
+        with MEMORY_LOCK:
+            _SNAPSHOT_SPILL_FILES.clear()
+            _SNAPSHOT_SPILL_FILES.update(spill_files)
+            _cleanup_spill_files()
+        logger.info(f"Memory compacted to {MEMORY_FILE}")
+        return True
+
+def _start_compaction():
+    """Compact in a background thread unless a compaction is already running."""
+    global _compaction_thread
+    if _compaction_thread is not None and _compaction_thread.is_alive():
+        return
+    _compaction_thread = threading.Thread(target=compact_memory, name="memory-compaction", daemon=True)
+    _compaction_thread.start()
+
+def wait_for_compaction(timeout=None):
+    """Wait until a running background compaction has finished."""
+    thread = _compaction_thread
+    if thread is not None:
+        thread.join(timeout)
+
+def persist_memory():
+    """Write a full snapshot now and start a new write-ahead log."""
+    wait_for_compaction()
+    compact_memory()
+
+def start_server():
+    """Start the memory store HTTP service (see memory_api.py)."""
+    try:
+        from . import memory_api
+    except ImportError:
+        # Running the script directly
+        import memory_api
+    memory_api.start_server()
 
 if __name__ == "__main__":
-    start_server()
\ No newline at end of file
+    start_server()
@@ -4,11 +4,13 @@
 # 🗂 Pfad: scripts/mcp_cli.py
 # 👤 Autor: MINT-RESEARCH
 # 📅 Erstellt: 2025-04-13
-# 🧱 Benötigte Pakete: argparse, yaml, sys, os
+# 🧱 Benötigte Pakete: argparse, yaml, sys, os, concurrent.futures
 # 🧪 Testbar: ✅
 # HINWEIS (MCP): Dieses Skript implementiert ein CLI für MCP-Funktionen,
 # HINWEIS (MCP): insbesondere für die Überprüfung von Policies gegen definierte Regeln.
-# HINWEIS (MCP): Es verwendet die check_policy_against_rules()-Funktion aus runtime_rules.py.
+# HINWEIS (MCP): Es verwendet die evaluate_policy()-Funktion aus runtime_rules.py.
+# HINWEIS (MCP): Mit --dir werden alle Policies eines Verzeichnisses parallel in mehreren
+# HINWEIS (MCP): Prozessen geprüft; --json liefert maschinenlesbare Ergebnisse für CI-Pipelines.
 
 import os
 import sys
@@ -17,12 +19,14 @@ import yaml
 import json
 import logging
 import requests
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Any, Optional
 
 # Add the parent directory to the Python path to import the module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from mcp_units.mcp_agent_interaction_engine.runtime_rules import (
-    check_policy_against_rules,
+    evaluate_policy,
+    get_ruleset_version,
     load_rule_file,
     get_rule_files
 )
@@ -53,8 +57,14 @@ Examples:
   # Check a policy against specific rule files
   mcp rules check --policy config/policies/tool.policy.yaml --rule-file config/rules/structure.rules.yaml
   
+  # Check all policies of a directory in parallel with JSON output
+  mcp rules check --dir config/policies --json
+  
   # List available rule files
   mcp rules list
+  
+  # Follow the logs of two units, errors only
+  mcp logs --unit api_gateway --unit status_api --follow --level ERROR
 """
     )
     
@@ -73,7 +83,28 @@ Examples:
     logs_parser.add_argument(
         '--unit',
         required=True,
-        help='The unit to get logs for'
+        action='append',
+        dest='units',
+        help='The unit to get logs for (can be specified multiple times)'
+    )
+    logs_parser.add_argument(
+        '--follow', '-f',
+        action='store_true',
+        help='Stream new log entries as they are written'
+    )
+    logs_parser.add_argument(
+        '--level',
+        help='Only show entries with this level (comma-separated list allowed)'
+    )
+    logs_parser.add_argument(
+        '--event',
+        help='Only show entries with this event type'
+    )
+    logs_parser.add_argument(
+        '--lines', '-n',
+        type=int,
+        default=None,
+        help='Number of recent entries to show (default: 50, or 10 per unit with --follow)'
     )
     
     # Create the 'state' command
@@ -85,17 +116,34 @@ Examples:
     
     # Create the 'check' command under 'rules'
     check_parser = rules_subparsers.add_parser('check', help='Check a policy against rules')
-    check_parser.add_argument(
+    check_source = check_parser.add_mutually_exclusive_group(required=True)
+    check_source.add_argument(
         '--policy', 
-        required=True,
         help='Path to the policy file to check'
     )
+    check_source.add_argument(
+        '--dir',
+        dest='policy_dir',
+        help='Check every *.yaml/*.yml policy file in this directory'
+    )
     check_parser.add_argument(
         '--rule-file', 
         action='append', 
         dest='rule_files',
         help='Path to a specific rule file to check against (can be specified multiple times)'
     )
+    check_parser.add_argument(
+        '--json',
+        action='store_true',
+        dest='json_output',
+        help='Print machine-readable JSON results'
+    )
+    check_parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of worker processes for --dir (default: number of CPUs)'
+    )
     check_parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -136,6 +184,81 @@ def load_policy_file(file_path: str) -> Dict[str, Any]:
         logger.error(f"Error parsing policy file {file_path}: {e}")
         raise
 
+def check_policy_file(file_path: str, rule_files: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Load a policy file and check it against the rules.
+    
+    Runs in worker processes for 'rules check --dir'; each process compiles
+    the rule files once and reuses them for all of its policies.
+    
+    Args:
+        file_path: Path to the policy file
+        rule_files: Optional list of specific rule files to check against
+        
+    Returns:
+        Dictionary with file, valid, violations, ruleset_version and error
+        (set if the file could not be loaded)
+    """
+    try:
+        policy = load_policy_file(file_path)
+    except FileNotFoundError as e:
+        return {"file": file_path, "valid": False, "violations": [], "ruleset_version": None, "error": str(e)}
+    except yaml.YAMLError as e:
+        return {"file": file_path, "valid": False, "violations": [], "ruleset_version": None,
+                "error": f"Error parsing YAML: {str(e)}"}
+    
+    violations, ruleset_version = evaluate_policy(policy, rule_files)
+    return {"file": file_path, "valid": not violations, "violations": violations,
+            "ruleset_version": ruleset_version, "error": None}
+
+def find_policy_files(directory: str) -> List[str]:
+    """
+    Find the policy files of a directory.
+    
+    Args:
+        directory: The directory to search (not recursive)
+        
+    Returns:
+        Sorted list of paths of *.yaml and *.yml files
+    """
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith((".yaml", ".yml")) and os.path.isfile(os.path.join(directory, name))
+    )
+
+def check_policy_files(files: List[str], rule_files: Optional[List[str]] = None,
+                       workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Check many policy files, in parallel across processes if worthwhile.
+    
+    Args:
+        files: Paths of the policy files
+        rule_files: Optional list of specific rule files to check against
+        workers: Number of worker processes (default: number of CPUs)
+        
+    Returns:
+        One result per file (see check_policy_file), in the order of files
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files) or 1))
+    if workers == 1:
+        return [check_policy_file(file_path, rule_files) for file_path in files]
+    
+    # Hand out files in chunks so the per-task overhead stays small
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(check_policy_file, files, [rule_files] * len(files), chunksize=chunksize))
+
+def print_check_result(result: Dict[str, Any]) -> None:
+    """Print the result of a policy check for humans."""
+    if result["error"]:
+        print(f"Error: {result['error']}")
+    elif result["violations"]:
+        print(f"❌ Policy validation failed with {len(result['violations'])} violation(s):")
+        for i, violation in enumerate(result["violations"], 1):
+            print(f"  {i}. {violation}")
+    else:
+        print("✅ Policy validation successful! No violations found.")
+
 def handle_check_command(args: argparse.Namespace) -> int:
     """
     Handle the 'rules check' command.
@@ -149,34 +272,69 @@ def handle_check_command(args: argparse.Namespace) -> int:
     if args.verbose:
         logger.setLevel(logging.DEBUG)
     
+    if args.policy_dir:
+        return handle_check_dir(args)
+    
     try:
-        # Load the policy file
-        logger.debug(f"Loading policy file: {args.policy}")
-        policy = load_policy_file(args.policy)
-        
-        # Check the policy against rules
-        logger.debug(f"Checking policy against rules (rule files: {args.rule_files})")
-        violations = check_policy_against_rules(policy, args.rule_files)
+        # Load the policy file and check it against rules
+        logger.debug(f"Checking policy {args.policy} against rules (rule files: {args.rule_files})")
+        result = check_policy_file(args.policy, args.rule_files)
         
         # Print the results
-        if violations:
-            print(f"❌ Policy validation failed with {len(violations)} violation(s):")
-            for i, violation in enumerate(violations, 1):
-                print(f"  {i}. {violation}")
-            return 1
+        if args.json_output:
+            print(json.dumps(result, indent=2))
         else:
-            print("✅ Policy validation successful! No violations found.")
-            return 0
+            print_check_result(result)
+        return 0 if result["valid"] else 1
             
-    except FileNotFoundError as e:
-        print(f"Error: {str(e)}")
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
         return 1
-    except yaml.YAMLError as e:
-        print(f"Error parsing YAML: {str(e)}")
+
+def handle_check_dir(args: argparse.Namespace) -> int:
+    """
+    Handle the 'rules check --dir' command.
+    
+    Args:
+        args: Command-line arguments
+        
+    Returns:
+        Exit code (0 if all policies are valid, non-zero otherwise)
+    """
+    try:
+        files = find_policy_files(args.policy_dir)
+    except OSError as e:
+        print(f"Error: {str(e)}")
         return 1
+    
+    try:
+        logger.debug(f"Checking {len(files)} policies in {args.policy_dir} (workers: {args.workers})")
+        results = check_policy_files(files, args.rule_files, args.workers)
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
         return 1
+    
+    invalid = [result for result in results if not result["valid"]]
+    if args.json_output:
+        print(json.dumps({
+            "directory": args.policy_dir,
+            "ruleset_version": get_ruleset_version(args.rule_files),
+            "total": len(results),
+            "valid": len(results) - len(invalid),
+            "invalid": len(invalid),
+            "results": results
+        }, indent=2))
+    else:
+        for result in results:
+            print(f"{'✅' if result['valid'] else '❌'} {result['file']}")
+            if not result["valid"]:
+                if result["error"]:
+                    print(f"  Error: {result['error']}")
+                for i, violation in enumerate(result["violations"], 1):
+                    print(f"  {i}. {violation}")
+        print(f"{len(results) - len(invalid)} of {len(results)} policies valid.")
+    
+    return 1 if invalid else 0
 
 def handle_list_command(args: argparse.Namespace) -> int:
     """
@@ -264,27 +422,80 @@ def handle_logs_command(args: argparse.Namespace) -> int:
     Returns:
         Exit code (0 for success, non-zero for failure)
     """
+    if args.follow:
+        return handle_logs_follow(args)
+    
     try:
-        # Call the logs API
-        response = requests.get(f"http://localhost:9000/mcp/logs?unit={args.unit}")
+        for unit in args.units:
+            # Call the logs API
+            params = {"unit": unit}
+            if args.lines is not None:
+                params["limit"] = args.lines
+            if args.level:
+                params["level"] = args.level
+            if args.event:
+                params["event"] = args.event
+            response = requests.get("http://localhost:9000/mcp/logs", params=params)
+            
+            # Check if the request was successful
+            if response.status_code == 200:
+                # Parse the response
+                data = response.json()
+                
+                # Print the results
+                print(f"Logs for unit '{data.get('unit')}' - {data.get('count', 0)} entries:")
+                for i, log in enumerate(data.get('logs', []), 1):
+                    print(f"  {i}. {log}")
+            else:
+                # Print error message
+                error_data = response.json()
+                print(f"Error: {error_data.get('error', 'Unknown error')}")
+                return 1
         
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Parse the response
-            data = response.json()
+        return 0
             
-            # Print the results
-            print(f"Logs for unit '{data.get('unit')}' - {data.get('count', 0)} entries:")
-            for i, log in enumerate(data.get('logs', []), 1):
-                print(f"  {i}. {log}")
+    except requests.RequestException as e:
+        print(f"Error connecting to MCP API: {str(e)}")
+        return 1
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        return 1
+
+def handle_logs_follow(args: argparse.Namespace) -> int:
+    """
+    Handle the 'logs --follow' command by consuming the log stream endpoint.
+    
+    Args:
+        args: Command-line arguments
+        
+    Returns:
+        Exit code (0 when stopped with Ctrl+C, non-zero for failure)
+    """
+    params = {"unit": args.units, "backlog": 10 if args.lines is None else args.lines}
+    if args.level:
+        params["level"] = args.level
+    if args.event:
+        params["event"] = args.event
+    
+    try:
+        with requests.get("http://localhost:9000/mcp/logs/stream", params=params,
+                          stream=True, timeout=(5, None)) as response:
+            if response.status_code != 200:
+                error_data = response.json()
+                print(f"Error: {error_data.get('error', 'Unknown error')}")
+                return 1
             
-            return 0
-        else:
-            # Print error message
-            error_data = response.json()
-            print(f"Error: {error_data.get('error', 'Unknown error')}")
-            return 1
+            print(f"Following logs for unit(s) {', '.join(args.units)} (Ctrl+C to stop)...")
+            for line in response.iter_lines(decode_unicode=True):
+                # Only data lines carry log entries; event names and keep-alives are skipped
+                if line and line.startswith("data: "):
+                    print(line[len("data: "):], flush=True)
+        
+        print("Log stream closed by the server.")
+        return 0
             
+    except KeyboardInterrupt:
+        return 0
     except requests.RequestException as e:
         print(f"Error connecting to MCP API: {str(e)}")
         return 1
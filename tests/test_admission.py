@@ -0,0 +1,96 @@
+# 📄 Script: test_admission.py
+# 🔧 Zweck: Tests für die Zulassungskontrolle des API-Gateways
+# 🗂 Pfad: tests/test_admission.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: pytest, fastapi, httpx
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Skript testet die Begrenzung gleichzeitiger Anfragen, die Warteschlange
+# HINWEIS (MCP): mit Frist sowie die 429/503-Ablehnungen mit Retry-After-Header.
+
+import os
+import sys
+import asyncio
+import pytest
+import httpx
+from fastapi import FastAPI
+
+# Add the parent directory to the Python path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_units.mcp_agent_interaction_engine.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected
+)
+
+def test_controller_queues_hands_over_and_rejects():
+    """Test slot limits, FIFO hand-over, full-queue and deadline rejections."""
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=1, queue_timeout=0.2)
+        await controller.acquire()
+        
+        # The second request waits, the third finds the queue full
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire()
+        assert full.value.status_code == 429
+        assert full.value.retry_after >= 1
+        
+        # Releasing hands the slot to the waiter
+        controller.release()
+        await waiting
+        assert controller.in_flight == 1
+        assert controller.queued == 0
+        
+        # A waiter that is not served before the deadline is rejected with 503
+        with pytest.raises(AdmissionRejected) as expired:
+            await controller.acquire()
+        assert expired.value.status_code == 503
+        
+        controller.release()
+        assert controller.in_flight == 0
+    
+    asyncio.run(scenario())
+
+def test_middleware_rejects_overload_but_not_health():
+    """Test that a saturated lane answers 429 with Retry-After while /health passes."""
+    app = FastAPI()
+    release = asyncio.Event()
+    
+    @app.post("/mcp/infer")
+    async def infer():
+        await release.wait()
+        return {"output": "ok"}
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+    
+    controller = AdmissionController("inference", max_in_flight=1, max_queue=0, queue_timeout=1.0)
+    app.add_middleware(AdmissionMiddleware, lanes=[("/mcp/infer", controller)])
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.post("/mcp/infer"))
+            while controller.in_flight == 0:
+                await asyncio.sleep(0.01)
+            
+            rejected = await client.post("/mcp/infer")
+            health = await client.get("/health")
+            
+            release.set()
+            return await first, rejected, health
+    
+    first, rejected, health = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "1"
+    assert health.status_code == 200
+    assert controller.in_flight == 0
+
+if __name__ == "__main__":
+    # Run the tests
+    pytest.main(["-xvs", __file__])
@@ -15,6 +15,11 @@ import json
 import os
 import sys
 from unittest.mock import patch, MagicMock
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the Python path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_units.mcp_agent_interaction_engine.api_gateway import app
 
 # Test configuration
 API_URL = "http://localhost:9000/mcp/infer"
@@ -97,6 +102,91 @@ def test_infer_endpoint_with_mock(mock_post):
     # Verify the mock was called with the correct arguments
     mock_post.assert_called_once_with(API_URL, json=payload)
 
+async def _no_memory(*args, **kwargs):
+    return None
+
+async def _no_memory_many(keys, last=None):
+    return {key: None for key in keys}
+
+async def _stream_chunks(prompt):
+    for chunk in ["Ein ", "Container ", "ist ..."]:
+        yield chunk
+
+@patch('graph.append_memory_async', _no_memory)
+@patch('graph.read_memory_many_async', _no_memory_many)
+@patch('graph.generate_text_stream_async', _stream_chunks)
+def test_infer_stream_endpoint_emits_frames():
+    """Test that /mcp/infer/stream emits node, token and result frames as NDJSON."""
+    client = TestClient(app)
+    
+    with client.stream("POST", "/mcp/infer/stream", json={"input": "Was ist ein Container?"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        frames = [json.loads(line) for line in response.iter_lines() if line]
+    
+    # One frame per visited node, in execution order
+    nodes = [frame["node"] for frame in frames if frame["type"] == "node"]
+    assert nodes == ["MEMORY_LOOKUP", "TOOL_DECIDER", "LLM_INFER", "RESPONSE_FORMATTER"]
+    assert all(frame["duration_ms"] >= 0 for frame in frames if frame["type"] == "node")
+    
+    # LLM chunks are forwarded before the LLM_INFER node completes
+    tokens = [frame["text"] for frame in frames if frame["type"] == "token"]
+    assert "".join(tokens) == "Ein Container ist ..."
+    assert frames.index(next(f for f in frames if f["type"] == "token")) < \
+        frames.index(next(f for f in frames if f.get("node") == "LLM_INFER"))
+    
+    # The last frame carries the InferResponse fields
+    result = frames[-1]
+    assert result["type"] == "result"
+    assert result["output"] == "Ein Container ist ..."
+    assert "timestamp" in result
+    assert "duration_ms" in result
+
+def test_infer_batch_endpoint_bounds_concurrency_and_shares_context():
+    """Test /mcp/infer/batch with per-item errors, a concurrency limit and one shared context read."""
+    import asyncio
+    memory_reads = []
+    running = {"now": 0, "max": 0}
+    
+    async def read_memory(key):
+        memory_reads.append(key)
+        return None
+    
+    async def read_memory_many(keys, last=None):
+        memory_reads.extend(keys)
+        return {key: None for key in keys}
+    
+    async def generate(prompt):
+        if "kaputt" in prompt:
+            raise RuntimeError("LLM nicht erreichbar")
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return "Antwort"
+    
+    items = [{"input": f"Frage {i}"} for i in range(10)] + [{"input": "kaputt"}]
+    
+    with patch('graph.read_memory_async', read_memory), \
+         patch('graph.read_memory_many_async', read_memory_many), \
+         patch('graph.append_memory_async', _no_memory), \
+         patch('graph.generate_text_async', generate):
+        response = TestClient(app).post("/mcp/infer/batch", json={"items": items, "concurrency": 3})
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 11
+    assert data["succeeded"] == 10
+    assert data["failed"] == 1
+    assert [result["index"] for result in data["results"]] == list(range(11))
+    assert data["results"][0]["output"] == "Antwort"
+    assert "LLM nicht erreichbar" in data["results"][10]["error"]
+    assert running["max"] <= 3
+    
+    # The global context is read once per batch, not once per item
+    assert memory_reads.count("context") == 1
+    assert memory_reads.count("conversation_history") == 11
+
 # HINWEIS (MCP): Verwendet absolute Pfade, um von jedem Verzeichnis aus ausführbar zu sein
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
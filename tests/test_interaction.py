@@ -10,7 +10,23 @@
 # HINWEIS (MCP): korrekt auf Benutzereingaben reagiert und die erwarteten Antworten
 # HINWEIS (MCP): zurückgibt. Dies ist ein grundlegender Test für die Graphverarbeitung.
 
-from mcp_units.mcp_agent_interaction_engine.graph_executor import invoke_graph
+from mcp_units.mcp_agent_interaction_engine.graph_executor import (
+    invoke_graph,
+    get_compiled_graph,
+    invalidate_graph_registry,
+    get_graph_registry_stats,
+    ainvoke_graph,
+    get_coalescing_stats,
+    request_key
+)
+from mcp_units.mcp_agent_interaction_engine import graph as graph_module
+from mcp_units.mcp_agent_interaction_engine import graph_executor as graph_executor_module
+from unittest.mock import patch
+import os
+import asyncio
+import json
+import httpx
+import time
 import pytest
 
 def test_invoke_graph():
@@ -18,6 +34,174 @@ def test_invoke_graph():
     assert "output" in result
     assert isinstance(result["output"], str)
 
+def test_compiled_graph_is_reused():
+    invalidate_graph_registry()
+    first = get_compiled_graph()
+    compile_count = get_graph_registry_stats()["compile_count"]
+    
+    # Repeated lookups are served from the registry without recompiling
+    assert get_compiled_graph() is first
+    stats = get_graph_registry_stats()
+    assert stats["compile_count"] == compile_count
+    assert stats["cache_hits"] >= 1
+    assert "default" in stats["compiled_variants"]
+    
+    # An explicit invalidation forces exactly one recompilation
+    invalidate_graph_registry()
+    assert get_compiled_graph() is not first
+    assert get_graph_registry_stats()["compile_count"] == compile_count + 1
+
+def test_policy_file_is_checked_at_most_once_per_interval(tmp_path, monkeypatch):
+    # The default path does not depend on the working directory
+    assert os.path.isabs(graph_executor_module.GRAPH_POLICY_FILE)
+    assert os.path.isfile(graph_executor_module.GRAPH_POLICY_FILE)
+    
+    policy_file = tmp_path / "graph.policy.yaml"
+    policy_file.write_text("nodes: []\n")
+    monkeypatch.setattr(graph_executor_module, "GRAPH_POLICY_FILE", str(policy_file))
+    monkeypatch.setattr(graph_executor_module, "GRAPH_POLICY_CHECK_INTERVAL", 3600.0)
+    invalidate_graph_registry()
+    first = get_compiled_graph()
+    
+    # Within the interval the policy file is not stat'ed again
+    policy_file.write_text("nodes: [changed]\n")
+    with patch("mcp_units.mcp_agent_interaction_engine.graph_executor.os.stat") as stat:
+        assert get_compiled_graph() is first
+    stat.assert_not_called()
+    
+    # Once the interval has passed, the change is noticed and the graph recompiled
+    monkeypatch.setattr(graph_executor_module, "GRAPH_POLICY_CHECK_INTERVAL", 0.0)
+    assert get_compiled_graph() is not first
+
+def test_async_graph_overlaps_downstream_io():
+    delay = 0.05
+    
+    async def slow_append(key, entry, max_entries=None):
+        await asyncio.sleep(delay)
+        return True
+    
+    async def slow_generate(prompt):
+        await asyncio.sleep(delay)
+        return "Antwort"
+    
+    async def run_concurrently(graph, count):
+        return await asyncio.gather(*[graph.ainvoke({"input": f"Frage {i}", "policy": {}}) for i in range(count)])
+    
+    async def slow_read_many(keys, last=None):
+        await asyncio.sleep(delay)
+        return {key: None for key in keys}
+    
+    with patch.object(graph_module, "read_memory_many_async", slow_read_many), \
+         patch.object(graph_module, "append_memory_async", slow_append), \
+         patch.object(graph_module, "generate_text_async", slow_generate):
+        graph = graph_module.build_async_graph()
+        start = time.perf_counter()
+        results = asyncio.run(run_concurrently(graph, 20))
+        elapsed = time.perf_counter() - start
+    
+    assert all(result["output"] == "Antwort" for result in results)
+    assert results[0]["nodes_visited"] == ["MEMORY_LOOKUP", "TOOL_DECIDER", "LLM_INFER", "RESPONSE_FORMATTER"]
+    # Each invocation waits 4 * delay; serial execution would take 20 times as long
+    assert elapsed < 20 * 4 * delay / 2
+
+def test_identical_concurrent_requests_are_coalesced():
+    calls = []
+    
+    async def fake_run(user_input, policy):
+        calls.append(user_input)
+        await asyncio.sleep(0.05)
+        return {"output": f"Antwort auf {user_input}", "nodes_visited": ["LLM_INFER"]}
+    
+    async def burst():
+        return await asyncio.gather(
+            ainvoke_graph("Hallo", {"use_tool": False}),
+            ainvoke_graph("Hallo", {"use_tool": False, "tool_command": None}),
+            ainvoke_graph("Hallo", {"use_tool": False}),
+            ainvoke_graph("Tschüss", {})
+        )
+    
+    before = get_coalescing_stats()
+    with patch.object(graph_executor_module, "_ainvoke_graph_once", fake_run):
+        results = asyncio.run(burst())
+    after = get_coalescing_stats()
+    
+    # Three equivalent requests share one execution, the fourth runs on its own
+    assert calls == ["Hallo", "Tschüss"]
+    assert after["coalesced"] - before["coalesced"] == 2
+    assert after["executions"] - before["executions"] == 2
+    assert after["in_flight"] == 0
+    assert results[0] == results[1] == results[2]
+    assert results[0] is not results[1]
+    
+    # Key order and unset values do not change the request key
+    assert request_key("x", {"a": 1, "b": None}) == request_key("x", {"a": 1})
+    assert request_key("x", {"a": 1, "b": 2}) == request_key("x", {"b": 2, "a": 1})
+    assert request_key("x", {}) != request_key("y", {})
+
+def test_memory_lookup_uses_one_multi_get_round_trip():
+    requests_seen = []
+    payloads = []
+    
+    def handler(request):
+        requests_seen.append((request.method, request.url.path))
+        if request.url.path == "/mget":
+            payloads.append(json.loads(request.content))
+            return httpx.Response(200, json={"data": {"context": {"thema": "Container"}, "conversation_history": [{"user": "a"}]}})
+        return httpx.Response(404)
+    
+    async def lookup():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch.object(graph_module, "get_async_client", lambda: client):
+            return await graph_module.memory_lookup_async({"input": "Hallo"})
+    
+    state = asyncio.run(lookup())
+    assert requests_seen == [("POST", "/mget")]
+    # Only the history window used by the prompt is requested
+    assert payloads[0]["last"] == {"conversation_history": graph_module.HISTORY_WINDOW}
+    assert state["context"] == {"thema": "Container"}
+    assert state["history"] == [{"user": "a"}]
+
+def test_llm_infer_appends_only_the_new_turn():
+    appended = []
+    
+    async def fake_append(key, entry, max_entries=None):
+        appended.append((key, entry, max_entries))
+        return True
+    
+    async def fake_generate(prompt):
+        return "Antwort"
+    
+    state = {"input": "Hallo", "history": [{"user": "alt", "system": "alt"}] * 5, "nodes_visited": []}
+    with patch.object(graph_module, "append_memory_async", fake_append), \
+         patch.object(graph_module, "generate_text_async", fake_generate):
+        asyncio.run(graph_module.llm_infer_async(state))
+    
+    assert appended == [("conversation_history", {"user": "Hallo", "system": "Antwort"}, graph_module.HISTORY_MAX_ENTRIES)]
+
+def test_memory_multi_get_falls_back_to_concurrent_reads():
+    requests_seen = []
+    
+    def handler(request):
+        requests_seen.append((request.method, request.url.path))
+        if request.url.path == "/memory/conversation_history":
+            assert request.url.params.get("last") == "3"
+        if request.url.path == "/memory/context":
+            return httpx.Response(200, json={"data": {"thema": "Container"}})
+        if request.url.path == "/memory/conversation_history":
+            return httpx.Response(200, json={"data": []})
+        return httpx.Response(404)
+    
+    async def read_many():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch.object(graph_module, "get_async_client", lambda: client):
+            return await graph_module.read_memory_many_async(["context", "conversation_history"],
+                                                             last={"conversation_history": 3})
+    
+    values = asyncio.run(read_many())
+    assert values == {"context": {"thema": "Container"}, "conversation_history": []}
+    assert requests_seen[0] == ("POST", "/mget")
+    assert sorted(requests_seen[1:]) == [("GET", "/memory/context"), ("GET", "/memory/conversation_history")]
+
 # HINWEIS (MCP): Hinzugefügt für direkte Ausführbarkeit des Tests
 # HINWEIS (MCP): Verwendet absolute Pfade, um von jedem Verzeichnis aus ausführbar zu sein
 if __name__ == "__main__":
@@ -17,7 +17,7 @@ import os
 import sys
 import time
 
-from mcp_units.mcp_host_llm_infer.llm_service import generate_text, start_server
+from mcp_units.mcp_host_llm_infer.llm_service import generate_text, generate_text_stream, start_server
 
 class TestLLMService:
     """Test class for the LLM Inference Service."""
@@ -89,6 +89,13 @@ class TestLLMService:
         mock_logger.error.assert_called_once_with("Error in LLM inference server: Test exception")
         mock_logger.info.assert_any_call("LLM inference server stopped.")
 
+    def test_generate_text_stream_yields_full_text_in_chunks(self):
+        """Test that the streamed chunks add up to the generated text."""
+        prompt = "Wie ist das Wetter heute?"
+        chunks = list(generate_text_stream(prompt))
+        assert len(chunks) > 1
+        assert "".join(chunks) == generate_text(prompt)
+
     def test_generate_text_with_long_prompt(self):
         """Test text generation with a very long prompt."""
         long_prompt = "A" * 1000  # A 1000-character prompt
@@ -0,0 +1,152 @@
+# 📄 Script: test_log_index.py
+# 🔧 Zweck: Tests für den Zeitindex und die Log-Abfragen
+# 🗂 Pfad: tests/test_log_index.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: pytest
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Skript testet den dünn besetzten Zeitindex je Logsegment, Zeitbereichs-
+# HINWEIS (MCP): abfragen über mehrere Segmente sowie Perzentile und Gruppierungen.
+
+import os
+import sys
+import json
+import gzip
+import time
+import itertools
+import pytest
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# Add the parent directory to the Python path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_units.mcp_agent_interaction_engine import log_index as log_index_module
+from mcp_units.mcp_agent_interaction_engine.log_index import (
+    SegmentIndex,
+    get_segment_index,
+    list_log_units,
+    percentile,
+    query_logs,
+    summarize_values
+)
+
+BASE = datetime(2025, 4, 13, 10, 0, 0, tzinfo=timezone.utc)
+
+def _entry(second, unit="api_gateway", event="infer_request_completed", **fields):
+    timestamp = (BASE + timedelta(seconds=second)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return {"timestamp": timestamp, "unit": unit, "level": "INFO", "event": event, **fields}
+
+def _write(path, entries, compress=False):
+    content = "".join(json.dumps(entry) + "\n" for entry in entries)
+    if compress:
+        with gzip.open(path, "wt") as f:
+            f.write(content)
+    else:
+        path.write_text(content)
+
+def test_sparse_index_seeks_into_segment(tmp_path, monkeypatch):
+    """Test that the index records sparse offsets and is extended incrementally."""
+    monkeypatch.setattr(log_index_module, "INDEX_INTERVAL_BYTES", 1024)
+    path = tmp_path / "api_gateway.log"
+    _write(path, [_entry(i, duration_ms=i) for i in range(200)])
+
+    index = get_segment_index(str(path))
+    assert 1 < len(index.offsets) < 200
+    assert index.first_ts == (BASE).timestamp()
+    assert index.last_ts == (BASE + timedelta(seconds=199)).timestamp()
+    # The scan for a late start begins well inside the file
+    assert index.seek_offset((BASE + timedelta(seconds=150)).timestamp()) > 0
+
+    with open(path, "a") as f:
+        f.write(json.dumps(_entry(200)) + "\n" + '{"partial": ')
+    index = get_segment_index(str(path))
+    assert index.last_ts == (BASE + timedelta(seconds=200)).timestamp()
+    assert index.indexed_size == path.stat().st_size - len('{"partial": ')
+
+def test_query_time_range_percentiles_and_groups(tmp_path, monkeypatch):
+    """Test time range scans across segments with filters and aggregations."""
+    monkeypatch.setattr(log_index_module, "INDEX_INTERVAL_BYTES", 512)
+    _write(tmp_path / "api_gateway.20250413T100000.log.gz",
+           [_entry(i, duration_ms=i) for i in range(0, 100)], compress=True)
+    _write(tmp_path / "api_gateway.20250413T100140.log",
+           [_entry(i, duration_ms=i) for i in range(100, 200)])
+    _write(tmp_path / "api_gateway.log",
+           [_entry(i, duration_ms=i) if i % 2 else _entry(i, event="infer_request_failed") for i in range(200, 300)])
+    _write(tmp_path / "status_api.log", [_entry(i, unit="status_api", event="API_REQUEST") for i in range(0, 300, 10)])
+
+    assert list_log_units(str(tmp_path)) == ["api_gateway", "status_api"]
+
+    result = query_logs(units=["api_gateway"], start=(BASE + timedelta(seconds=50)).timestamp(),
+                        end=(BASE + timedelta(seconds=149)).timestamp(), event="infer_request_completed",
+                        metric="duration_ms", percentiles=(50, 99), log_dir=str(tmp_path))
+    assert result["matched"] == 100
+    stats = result["groups"][0]["metric"]
+    assert stats["count"] == 100
+    assert (stats["min"], stats["max"]) == (50, 149)
+    assert stats["p50"] == pytest.approx(99.5)
+    assert stats["p99"] == pytest.approx(148.01)
+    # The index keeps the scan close to the requested window
+    assert result["scanned"] < 200
+
+    grouped = query_logs(start=(BASE + timedelta(seconds=200)).timestamp(), group_by=["unit", "event"],
+                         log_dir=str(tmp_path), limit=3)
+    counts = {(group["group"]["unit"], group["group"]["event"]): group["count"] for group in grouped["groups"]}
+    assert counts == {("api_gateway", "infer_request_completed"): 50, ("api_gateway", "infer_request_failed"): 50,
+                      ("status_api", "API_REQUEST"): 10}
+    assert len(grouped["records"]) == 3
+
+    filtered = query_logs(units=["api_gateway"], fields={"duration_ms": "7"}, log_dir=str(tmp_path))
+    assert filtered["matched"] == 1
+
+def test_concurrent_queries_build_one_consistent_index(tmp_path, monkeypatch):
+    """Test that queries racing to index the same segment neither duplicate nor skip entries."""
+    monkeypatch.setattr(log_index_module, "INDEX_INTERVAL_BYTES", 256)
+    path = tmp_path / "api_gateway.log"
+    _write(path, [_entry(i / 10, duration_ms=i) for i in range(5000)])
+    start = (BASE + timedelta(seconds=400)).timestamp()
+    barrier = threading.Barrier(8)
+    results = []
+    line_timestamp = log_index_module._line_timestamp
+    scanners = []
+
+    def slow_line_timestamp(line):
+        # Give up the GIL on every indexed line, so unserialized scans would interleave
+        scanners.append(threading.get_ident())
+        time.sleep(0.0001)
+        return line_timestamp(line)
+
+    def query():
+        barrier.wait()
+        results.append(query_logs(units=["api_gateway"], start=start, log_dir=str(tmp_path))["matched"])
+
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    with patch.object(log_index_module, "_line_timestamp", slow_line_timestamp):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert results == [1000] * 8
+    # Each scan of the segment ran from start to end without another one in between
+    runs = [ident for ident, _ in itertools.groupby(scanners)]
+    assert len(runs) == len(set(runs))
+    index = get_segment_index(str(path))
+    expected = SegmentIndex(str(path), index.inode)
+    expected.update()
+    assert (index.timestamps, index.offsets) == (expected.timestamps, expected.offsets)
+    assert index.indexed_size == path.stat().st_size
+
+def test_summaries_without_numpy():
+    """Test that the pure Python fallback matches the numpy definition of percentiles."""
+    from array import array
+    values = array("d", [5, 1, 4, 2, 3])
+    with patch.object(log_index_module, "np", None):
+        stats = summarize_values(values, (0, 50, 90, 100))
+    assert stats == {"count": 5, "min": 1, "max": 5, "mean": 3, "p0": 1, "p50": 3, "p90": pytest.approx(4.6), "p100": 5}
+    assert percentile([1.0, 2.0], 50) == 1.5
+    assert summarize_values(array("d")) == {"count": 0}
+
+if __name__ == "__main__":
+    # Run the tests
+    pytest.main(["-xvs", __file__])
@@ -0,0 +1,107 @@
+# 📄 Script: test_log_reader.py
+# 🔧 Zweck: Tests für den rückwärts lesenden Tail-Reader
+# 🗂 Pfad: tests/test_log_reader.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: pytest
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Skript testet das blockweise Rückwärtslesen, die Cursor über
+# HINWEIS (MCP): Segmentrotation hinweg, das tolerante Parsen der Zeitstempel und das
+# HINWEIS (MCP): Verfolgen der aktiven Logdatei (Anhängen, Rotation, Kürzung).
+
+import os
+import sys
+import json
+import pytest
+
+# Add the parent directory to the Python path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_units.mcp_agent_interaction_engine.log_reader import (
+    LogFollower,
+    iter_lines_reverse,
+    make_line_filter,
+    parse_log_timestamp,
+    tail_log_lines
+)
+
+def test_reverse_iteration_with_small_blocks(tmp_path):
+    """Test that lines spanning block boundaries are reassembled with correct offsets."""
+    path = tmp_path / "unit_a.log"
+    lines = [json.dumps({"n": n, "payload": "x" * n}) for n in range(40)]
+    content = "\n".join(lines) + "\n\n"
+    path.write_text(content)
+
+    result = list(iter_lines_reverse(str(path), block_size=7))
+    assert [line for _, line in result] == list(reversed(lines))
+    for offset, line in result:
+        assert content[offset:offset + len(line)] == line
+
+    # Reading stops before the given end offset
+    offset_of_tenth = result[-10][0]
+    assert [line for _, line in iter_lines_reverse(str(path), end=offset_of_tenth, block_size=5)] == \
+        list(reversed(lines[:9]))
+
+def test_cursor_survives_rotation(tmp_path):
+    """Test that a cursor into the active file still works after it was rotated."""
+    active = tmp_path / "unit_a.log"
+    active.write_text("".join(json.dumps({"n": n}) + "\n" for n in range(10)))
+
+    page = tail_log_lines("unit_a", 3, log_dir=str(tmp_path))
+    assert [json.loads(line)["n"] for line in page["logs"]] == [7, 8, 9]
+
+    os.replace(active, tmp_path / "unit_a.20250413T100000.log")
+    active.write_text(json.dumps({"n": 10}) + "\n")
+    page = tail_log_lines("unit_a", 3, cursor=page["next_cursor"], log_dir=str(tmp_path))
+    assert [json.loads(line)["n"] for line in page["logs"]] == [4, 5, 6]
+
+def test_parse_log_timestamp():
+    assert parse_log_timestamp("2025-04-13T10:00:00Z") == parse_log_timestamp("2025-04-13T10:00:00.000000Z")
+    # Entries written before the timestamp fix carry a literal "%f"
+    assert parse_log_timestamp("2025-04-13T10:00:00.%fZ") == parse_log_timestamp("2025-04-13T10:00:00")
+    assert parse_log_timestamp("kein Zeitstempel") is None
+    assert parse_log_timestamp(None) is None
+
+def test_follower_detects_appends_rotation_and_truncation(tmp_path):
+    """Test that the follower delivers each appended line exactly once."""
+    active = tmp_path / "unit_a.log"
+    active.write_text('{"n": 0}\n')
+    follower = LogFollower("unit_a", str(tmp_path))
+    assert follower.poll() == []
+
+    with open(active, "a") as f:
+        f.write('{"n": 1}\n{"n": ')
+    assert follower.poll() == ['{"n": 1}']
+    with open(active, "a") as f:
+        f.write('2}\n')
+    assert follower.poll() == ['{"n": 2}']
+
+    # Rotation: the rest of the old file is delivered before the new file
+    with open(active, "a") as f:
+        f.write('{"n": 3}\n')
+    os.replace(active, tmp_path / "unit_a.20250413T100000.log")
+    active.write_text('{"n": 4}\n')
+    assert follower.poll() == ['{"n": 3}', '{"n": 4}']
+
+    # Truncation (detected by the file shrinking): the file is read again from the start
+    active.write_text('{"n":5}\n')
+    assert follower.poll() == ['{"n":5}']
+    follower.close()
+
+def test_follower_waits_for_missing_file(tmp_path):
+    follower = LogFollower("unit_a", str(tmp_path))
+    assert follower.poll() == []
+    assert follower.cursor() is None
+    (tmp_path / "unit_a.log").write_text('{"n": 0}\n')
+    assert follower.poll() == ['{"n": 0}']
+    follower.close()
+
+def test_line_filter():
+    assert make_line_filter() is None
+    line_filter = make_line_filter(level="error,warning", event="API_ERROR")
+    assert line_filter(json.dumps({"level": "ERROR", "event": "API_ERROR"}))
+    assert not line_filter(json.dumps({"level": "INFO", "event": "API_ERROR"}))
+    assert not line_filter("kein JSON")
+
+if __name__ == "__main__":
+    # Run the tests
+    pytest.main(["-xvs", __file__])
@@ -0,0 +1,208 @@
+# 📄 Script: test_logger.py
+# 🔧 Zweck: Tests für den JSON-Linien-Logger
+# 🗂 Pfad: tests/test_logger.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: pytest
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Skript testet den Hintergrund-Schreiber des Loggers: gebündeltes Schreiben,
+# HINWEIS (MCP): Verwerfen bei voller Warteschlange und das Schreiben ausstehender Einträge beim Beenden,
+# HINWEIS (MCP): sowie Rotation, Komprimierung und Aufbewahrung der Logsegmente.
+
+import os
+import sys
+import json
+import time
+import gzip
+import threading
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to the Python path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_units.mcp_agent_interaction_engine import logger as logger_module
+from mcp_units.mcp_agent_interaction_engine.logger import (
+    LogWriter,
+    cleanup_log_segments,
+    get_log_segments,
+    load_rotation_policy,
+    parse_size
+)
+
+SIZE_ONLY = {"policy": "size", "max_file_size": 200, "retention_days": 30, "compress_after_days": 7}
+
+def _read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_log_event_writes_json_line(tmp_path, monkeypatch):
+    """Test that queued events reach the unit's file after a flush."""
+    monkeypatch.setattr(logger_module, "LOG_DIR", str(tmp_path))
+    writer = LogWriter(flush_interval=0.05, rotation=SIZE_ONLY)
+    monkeypatch.setattr(logger_module, "_writer", writer)
+
+    for i in range(3):
+        logger_module.log_event("unit_a", "info", "TEST_EVENT", f"Nachricht {i}", request_id=i)
+    logger_module.log_event("unit_b", "debug", "OTHER_EVENT", "Andere Einheit")
+    assert logger_module.flush_logs()
+
+    entries = _read_lines(tmp_path / "unit_a.log")
+    assert [entry["request_id"] for entry in entries] == [0, 1, 2]
+    assert entries[0]["level"] == "INFO"
+    # The timestamp carries real microseconds, not a literal "%f"
+    assert "%f" not in entries[0]["timestamp"]
+    assert len(_read_lines(tmp_path / "unit_b.log")) == 1
+    # The file handles stay open between batches
+    assert writer.get_stats()["open_files"] == 2
+    writer.close()
+
+def test_full_queue_drops_and_counts(tmp_path, monkeypatch):
+    """Test the drop overflow policy while the writer thread is busy."""
+    monkeypatch.setattr(logger_module, "LOG_DIR", str(tmp_path))
+    writer = LogWriter(max_queue=2, flush_interval=0.01, flush_batch=1, overflow="drop", rotation=SIZE_ONLY)
+    release = threading.Event()
+    original_write = writer._write_batch
+
+    def blocked_write(batch):
+        release.wait(5)
+        original_write(batch)
+
+    with patch.object(writer, "_write_batch", blocked_write):
+        # The first line is taken by the blocked writer thread, two fit the queue
+        results = [writer.submit("unit_a", json.dumps({"n": i})) for i in range(6)]
+        release.set()
+        writer.close()
+
+    assert results.count(False) == writer.dropped
+    assert writer.dropped >= 3
+    assert len(_read_lines(tmp_path / "unit_a.log")) == 6 - writer.dropped
+
+def test_close_flushes_pending_lines(tmp_path, monkeypatch):
+    """Test that closing writes every queued line and later lines still arrive."""
+    monkeypatch.setattr(logger_module, "LOG_DIR", str(tmp_path))
+    writer = LogWriter(flush_interval=10.0, flush_batch=1000, overflow="block",
+                       rotation=dict(SIZE_ONLY, max_file_size=None))
+    for i in range(100):
+        writer.submit("unit_a", json.dumps({"n": i}))
+    writer.close()
+    assert len(_read_lines(tmp_path / "unit_a.log")) == 100
+
+    writer.submit("unit_a", json.dumps({"n": 100}))
+    assert len(_read_lines(tmp_path / "unit_a.log")) == 101
+    assert writer.get_stats()["open_files"] == 0
+
+def test_writes_after_close_leave_no_open_files(tmp_path, monkeypatch):
+    """Test that late events after close() are written, rotated and their files closed again."""
+    monkeypatch.setattr(logger_module, "LOG_DIR", str(tmp_path))
+    writer = LogWriter(overflow="block", rotation=SIZE_ONLY)
+    writer.submit("unit_a", json.dumps({"n": 0}))
+    writer.close()
+    assert writer.get_stats()["open_files"] == 0
+
+    opened = []
+    real_open = open
+
+    def tracking_open(*args, **kwargs):
+        handle = real_open(*args, **kwargs)
+        opened.append(handle)
+        return handle
+
+    with patch("builtins.open", tracking_open):
+        for i in range(1, 20):
+            assert writer.submit("unit_a", json.dumps({"n": i, "payload": "x" * 20}))
+    assert opened and all(handle.closed for handle in opened)
+    assert writer.get_stats()["open_files"] == 0
+
+    # Size-based rotation still applies to the late events
+    segments = get_log_segments("unit_a", str(tmp_path))
+    assert len(segments) > 1
+    assert [entry["n"] for segment in segments for entry in _read_lines(segment)] == list(range(20))
+
+def test_write_error_closes_handle(tmp_path, monkeypatch):
+    """Test that a failed write closes the unit's file instead of leaking it."""
+    monkeypatch.setattr(logger_module, "LOG_DIR", str(tmp_path))
+    writer = LogWriter(overflow="block", rotation=dict(SIZE_ONLY, max_file_size=None))
+    writer._write_batch([("unit_a", json.dumps({"n": 0}))])
+    handle = writer._handles["unit_a"]
+
+    with patch.object(handle, "write", side_effect=OSError("disk full")):
+        writer._write_batch([("unit_a", json.dumps({"n": 1}))])
+    assert handle.closed
+    assert "unit_a" not in writer._handles
+
+    # The next write reopens the file
+    writer._write_batch([("unit_a", json.dumps({"n": 2}))])
+    writer.close()
+    assert [entry["n"] for entry in _read_lines(tmp_path / "unit_a.log")] == [0, 2]
+
+def test_invalid_overflow_policy():
+    with pytest.raises(ValueError):
+        LogWriter(overflow="ignore")
+
+def test_rotation_policy_from_rules(tmp_path):
+    """Test that the rotation settings are read from logging.rules.yaml."""
+    policy = load_rotation_policy("config/rules/logging.rules.yaml")
+    assert policy == {"policy": "daily", "max_file_size": 10 * 1024 * 1024,
+                      "retention_days": 30, "compress_after_days": 7}
+    assert load_rotation_policy(str(tmp_path / "missing.yaml"))["max_file_size"] == parse_size("10MB")
+    assert parse_size("512KB") == 512 * 1024
+    with pytest.raises(ValueError):
+        parse_size("viel")
+
+def test_size_rotation_keeps_all_lines_in_order(tmp_path, monkeypatch):
+    """Test size-based rotation and reading across segment boundaries."""
+    monkeypatch.setattr(logger_module, "LOG_DIR", str(tmp_path))
+    writer = LogWriter(flush_batch=1, flush_interval=0.01, overflow="block", rotation=SIZE_ONLY)
+    for i in range(20):
+        writer.submit("unit_a", json.dumps({"n": i, "payload": "x" * 20}))
+    writer.close()
+
+    segments = get_log_segments("unit_a", str(tmp_path))
+    assert len(segments) > 1
+    assert segments[-1] == str(tmp_path / "unit_a.log")
+    numbers = [entry["n"] for segment in segments for entry in _read_lines(segment)]
+    assert numbers == list(range(20))
+    assert all(os.path.getsize(segment) <= 200 for segment in segments)
+
+def test_daily_rotation_of_file_from_previous_day(tmp_path, monkeypatch):
+    """Test that a file last written on an earlier day is rotated on the first write."""
+    monkeypatch.setattr(logger_module, "LOG_DIR", str(tmp_path))
+    active = tmp_path / "unit_a.log"
+    active.write_text(json.dumps({"n": 0}) + "\n")
+    yesterday = time.time() - 86400
+    os.utime(active, (yesterday, yesterday))
+
+    writer = LogWriter(overflow="block", rotation=dict(SIZE_ONLY, policy="daily", max_file_size=None))
+    writer.submit("unit_a", json.dumps({"n": 1}))
+    writer.close()
+
+    segments = get_log_segments("unit_a", str(tmp_path))
+    assert len(segments) == 2
+    assert [entry["n"] for entry in _read_lines(segments[0])] == [0]
+    assert [entry["n"] for entry in _read_lines(segments[1])] == [1]
+
+def test_cleanup_compresses_and_expires_segments(tmp_path):
+    """Test compression after compress_after_days and deletion after retention_days."""
+    now = time.time()
+    ages = {"unit_a.20250101T000000.log": 40, "unit_a.20250301T000000.log": 10,
+            "unit_a.20250320T000000.log": 1, "unit_a.log": 40}
+    for name, age in ages.items():
+        path = tmp_path / name
+        path.write_text(json.dumps({"segment": name}) + "\n")
+        os.utime(path, (now - age * 86400, now - age * 86400))
+
+    stats = cleanup_log_segments(SIZE_ONLY, str(tmp_path), now=now)
+    assert stats == {"compressed": 1, "deleted": 1}
+    assert sorted(os.listdir(tmp_path)) == [
+        "unit_a.20250301T000000.log.gz", "unit_a.20250320T000000.log", "unit_a.log"
+    ]
+    with gzip.open(tmp_path / "unit_a.20250301T000000.log.gz", "rt") as f:
+        assert json.loads(f.readline())["segment"] == "unit_a.20250301T000000.log"
+    # The active file is never touched, and compressed segments keep their order
+    assert [os.path.basename(path) for path in get_log_segments("unit_a", str(tmp_path))] == [
+        "unit_a.20250301T000000.log.gz", "unit_a.20250320T000000.log", "unit_a.log"
+    ]
+
+if __name__ == "__main__":
+    # Run the tests
+    pytest.main(["-xvs", __file__])
@@ -10,16 +10,406 @@
 # HINWEIS (MCP): von Daten im Speicher und stellt sicher, dass die Persistenzfunktionen
 # HINWEIS (MCP): korrekt arbeiten. Dies ist ein kritischer Test für die Datenspeicherung
 # HINWEIS (MCP): und -verwaltung im MCP-System.
+# HINWEIS (MCP): Die Tests zum Write-Ahead-Log verwenden ein temporäres Verzeichnis.
+# HINWEIS (MCP): Die Budget-Tests prüfen Größenerfassung, LRU/LFU-Verdrängung und das Auslagern.
 
-from mcp_units.mcp_host_memory_store.memory_handler import write_memory, read_memory, load_memory
+from mcp_units.mcp_host_memory_store import memory_handler
+from mcp_units.mcp_host_memory_store.memory_handler import write_memory, read_memory, read_memory_many, read_memory_range, append_memory, load_memory
+import os
+import json
+import time
 import pytest
+import threading
+from unittest.mock import patch
 
 def test_memory_cycle():
     load_memory()
     write_memory("foo", "bar")
     assert read_memory("foo") == "bar"
 
+def test_read_memory_many():
+    load_memory()
+    write_memory("foo", "bar")
+    assert read_memory_many(["foo", "missing"]) == {"foo": "bar", "missing": None}
+
 # HINWEIS (MCP): Hinzugefügt für direkte Ausführbarkeit des Tests
 # HINWEIS (MCP): Verwendet absolute Pfade, um von jedem Verzeichnis aus ausführbar zu sein
 if __name__ == "__main__":
-    pytest.main(["-v", __file__])
\ No newline at end of file
+    pytest.main(["-v", __file__])
+
+def test_append_memory_caps_entries():
+    load_memory()
+    write_memory("turns", [])
+    for i in range(5):
+        append_memory("turns", {"turn": i}, max_entries=3)
+    assert read_memory("turns") == [{"turn": 2}, {"turn": 3}, {"turn": 4}]
+
+def test_concurrent_appends_are_not_lost():
+    load_memory()
+    write_memory("turns", [])
+    with patch("mcp_units.mcp_host_memory_store.memory_handler.persist_memory"):
+        threads = [threading.Thread(target=lambda: [append_memory("turns", i) for i in range(50)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(read_memory("turns")) == 400
+
+def test_append_memory_rejects_non_list():
+    load_memory()
+    write_memory("foo", "bar")
+    with pytest.raises(TypeError):
+        append_memory("foo", "baz")
+
+def test_read_memory_range_tail_and_cursor():
+    load_memory()
+    write_memory("turns", [])
+    for i in range(5):
+        append_memory("turns", i, max_entries=3)
+    assert read_memory_range("turns", last=2) == {"entries": [3, 4], "cursor": 5}
+    
+    # A cursor stays valid after old entries were trimmed
+    append_memory("turns", 5, max_entries=3)
+    append_memory("turns", 6, max_entries=3)
+    assert read_memory_range("turns", after=5) == {"entries": [5, 6], "cursor": 7}
+    assert read_memory_range("turns", after=7)["entries"] == []
+    assert read_memory_many(["turns", "missing"], last={"turns": 1}) == {"turns": [6], "missing": None}
+
+@pytest.fixture
+def store_files(tmp_path, monkeypatch):
+    """Point the memory store at files in a temporary directory."""
+    monkeypatch.setattr(memory_handler, "MEMORY_FILE", str(tmp_path / "state_memory.json"))
+    monkeypatch.setattr(memory_handler, "MEMORY_WAL_FILE", str(tmp_path / "state_memory.wal"))
+    monkeypatch.setattr(memory_handler, "MEMORY_POLICY_FILE", str(tmp_path / "memory.policy.yaml"))
+    monkeypatch.setattr(memory_handler, "MEMORY_SPILL_DIR", str(tmp_path / "memory_spill"))
+    load_memory()
+    yield tmp_path
+    memory_handler.wait_for_compaction()
+    with memory_handler.MEMORY_LOCK:
+        memory_handler._close_wal()
+
+def _wal_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_writes_append_to_wal_and_replay(store_files):
+    write_memory("foo", "bar")
+    for i in range(5):
+        append_memory("turns", i, max_entries=3)
+    
+    # Writes only append to the log; the snapshot is not rewritten
+    assert not (store_files / "state_memory.json").exists()
+    records = _wal_records(store_files / "state_memory.wal")
+    assert [record["seq"] for record in records] == list(range(1, 7))
+    assert records[1] == {"op": "append", "key": "turns", "entry": 0, "max_entries": 3, "expires_at": None, "seq": 2}
+    
+    memory_handler.MEMORY = {}
+    load_memory()
+    assert read_memory("foo") == "bar"
+    assert read_memory_range("turns") == {"entries": [2, 3, 4], "cursor": 5}
+
+def test_unserializable_value_is_rejected(store_files):
+    with pytest.raises(TypeError):
+        write_memory("foo", object())
+    assert read_memory("foo") is None
+
+def test_torn_wal_record_is_cut_off(store_files):
+    write_memory("foo", "bar")
+    with memory_handler.MEMORY_LOCK:
+        memory_handler._close_wal()
+    with open(store_files / "state_memory.wal", "a") as f:
+        f.write('{"op":"set","key":"half')
+    
+    load_memory()
+    write_memory("after", 1)
+    load_memory()
+    assert read_memory_many(["foo", "after"]) == {"foo": "bar", "after": 1}
+
+def test_compaction_writes_atomic_snapshot(store_files, monkeypatch):
+    monkeypatch.setattr(memory_handler, "WAL_COMPACT_BYTES", 200)
+    for i in range(20):
+        append_memory("turns", {"turn": i}, max_entries=10)
+    memory_handler.wait_for_compaction()
+    
+    with open(store_files / "state_memory.json") as f:
+        snapshot = json.load(f)
+    assert snapshot["__store__"]["wal_seq"] > 0
+    wal = store_files / "state_memory.wal"
+    assert not wal.exists() or os.path.getsize(wal) < 400
+    assert not (store_files / "state_memory.json.tmp").exists()
+    
+    memory_handler.MEMORY = {}
+    load_memory()
+    assert read_memory("turns") == [{"turn": i} for i in range(10, 20)]
+    assert read_memory_range("turns", last=1)["cursor"] == 20
+    assert "__store__" not in memory_handler.MEMORY
+
+def test_interrupted_compaction_is_recovered(store_files):
+    write_memory("a", 1)
+    memory_handler.persist_memory()
+    write_memory("b", 2)
+    write_memory("a", 3)
+    
+    # Crash after the log was moved aside but before the snapshot was renamed
+    with memory_handler.MEMORY_LOCK:
+        memory_handler._close_wal()
+    os.replace(store_files / "state_memory.wal", store_files / "state_memory.wal.compacting")
+    write_memory("c", 4)
+    
+    memory_handler.MEMORY = {}
+    load_memory()
+    assert read_memory_many(["a", "b", "c"]) == {"a": 3, "b": 2, "c": 4}
+    assert memory_handler.compact_memory()
+    assert not (store_files / "state_memory.wal.compacting").exists()
+
+def test_group_commit_batches_concurrent_writes(store_files, monkeypatch):
+    monkeypatch.setattr(memory_handler, "DURABILITY", "batched")
+    monkeypatch.setattr(memory_handler, "COMMIT_DELAY_MS", 20)
+    before = memory_handler.get_commit_stats()
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(memory_handler.os, "fsync", lambda fd: fsyncs.append(fd) or real_fsync(fd))
+    
+    def writer(n):
+        for i in range(10):
+            write_memory(f"key_{n}_{i}", i)
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    stats = memory_handler.get_commit_stats()
+    assert stats["committed_writes"] - before["committed_writes"] == 80
+    assert len(fsyncs) < 80
+    assert stats["max_batch_size"] > 1
+    assert stats["fsync_seconds_max"] >= 0.0
+    assert stats["durability"] == "batched"
+
+def test_always_mode_is_durable_on_return(store_files, monkeypatch):
+    monkeypatch.setattr(memory_handler, "DURABILITY", "always")
+    synced = []
+    monkeypatch.setattr(memory_handler.os, "fsync", lambda fd: synced.append(memory_handler._wal_seq))
+    write_memory("foo", "bar")
+    append_memory("turns", 1)
+    assert synced == [1, 2]
+    assert memory_handler._durable_seq == 2
+
+def test_none_mode_skips_fsync(store_files, monkeypatch):
+    monkeypatch.setattr(memory_handler, "DURABILITY", "none")
+    monkeypatch.setattr(memory_handler.os, "fsync", lambda fd: pytest.fail("fsync in durability mode none"))
+    write_memory("foo", "bar")
+    # The record still reaches the operating system before the write returns
+    assert _wal_records(store_files / "state_memory.wal")[-1]["value"] == "bar"
+
+def test_invalid_durability_mode(store_files, monkeypatch):
+    # The store refuses to start instead of failing every write
+    monkeypatch.setattr(memory_handler, "DURABILITY", "sometimes")
+    with pytest.raises(ValueError):
+        load_memory()
+
+def _write_policy(path, **expiration):
+    with open(path, "w") as f:
+        json.dump({"expiration": expiration}, f)
+
+def test_policy_default_ttl():
+    policy = memory_handler.load_memory_policy("config/policies/memory.policy.yaml")
+    assert policy["default_ttl"] == 3600
+    assert policy["cleanup_on_startup"] is True
+
+def test_ttl_expires_lazily_and_per_write_override(store_files):
+    _write_policy(store_files / "memory.policy.yaml", default_ttl=60)
+    load_memory()
+    write_memory("session", "a")
+    write_memory("short", "b", ttl=0.05)
+    write_memory("forever", "c", ttl=0)
+    append_memory("turns", 1, ttl=0.05)
+    assert memory_handler.EXPIRES["session"] == pytest.approx(time.time() + 60, abs=5)
+    assert "forever" not in memory_handler.EXPIRES
+    
+    time.sleep(0.1)
+    # Reads expire due keys without waiting for the sweeper
+    assert read_memory("short") is None
+    assert read_memory_many(["turns", "session", "forever"]) == {"turns": None, "session": "a", "forever": "c"}
+    assert append_memory("turns", 2) == 1
+    assert memory_handler.get_expiry_stats()["expired_total"] >= 2
+
+def test_sweeper_pops_only_due_keys(store_files):
+    for i in range(100):
+        write_memory(f"later_{i}", i, ttl=3600)
+    write_memory("soon", 1, ttl=0.05)
+    time.sleep(0.1)
+    
+    # Only the due key is popped from the heap
+    assert memory_handler.expire_due_keys() == 1
+    assert memory_handler.get_expiry_stats()["heap_size"] == 100
+    
+    write_memory("background", 1, ttl=0.05)
+    memory_handler.start_expiry_sweeper()
+    try:
+        deadline = time.time() + 2
+        while "background" in memory_handler.MEMORY and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        memory_handler.stop_expiry_sweeper(timeout=2)
+    assert "background" not in memory_handler.MEMORY
+
+def test_expired_keys_are_removed_on_load(store_files):
+    write_memory("old", [1, 2], ttl=0.05)
+    write_memory("kept", "x", ttl=3600)
+    memory_handler.persist_memory()
+    time.sleep(0.1)
+    
+    memory_handler.MEMORY = {}
+    load_memory()
+    assert memory_handler.MEMORY == {"kept": "x"}
+    # The expiry is logged, so a later replay does not resurrect the key
+    append_memory("old", 3)
+    memory_handler.MEMORY = {}
+    load_memory()
+    assert read_memory("old") == [3]
+
+def test_delete_memory(store_files):
+    write_memory("foo", "bar")
+    assert memory_handler.delete_memory("foo") is True
+    assert memory_handler.delete_memory("foo") is False
+    memory_handler.MEMORY = {}
+    load_memory()
+    assert read_memory("foo") is None
+
+def _write_limits(path, **limits):
+    with open(path, "w") as f:
+        json.dump({"limits": limits}, f)
+
+def test_policy_limits():
+    policy = memory_handler.load_memory_policy("config/policies/memory.policy.yaml")
+    assert policy["max_bytes"] == 256 * 1024 * 1024
+    assert policy["eviction_policy"] == "lru"
+    assert policy["namespace_quotas"] == {"conversation_history": 64 * 1024 * 1024}
+    assert policy["spill_namespaces"] == ["conversation_history"]
+
+def test_size_accounting(store_files):
+    write_memory("ns:a", {"x": 1})
+    append_memory("ns:list", "abc", max_entries=2)
+    append_memory("ns:list", "de", max_entries=2)
+    append_memory("ns:list", "f", max_entries=2)
+    
+    # Incremental accounting matches a full recount
+    for key, value in memory_handler.MEMORY.items():
+        assert memory_handler.SIZES[key] == len(key) + len(json.dumps(value, separators=(",", ":")))
+    usage = memory_handler.get_memory_usage()
+    assert usage["total_bytes"] == sum(memory_handler.SIZES.values())
+    assert usage["namespaces"]["ns"]["keys"] == 2
+    assert usage["largest_keys"][0]["key"] == "ns:list"
+    
+    memory_handler.delete_memory("ns:a")
+    assert memory_handler.get_memory_usage()["total_bytes"] == memory_handler.SIZES["ns:list"]
+
+def test_lru_eviction_drops_least_recently_used(store_files):
+    _write_limits(store_files / "memory.policy.yaml", max_bytes=90)
+    load_memory()
+    for name in ("a", "b", "c"):
+        write_memory(f"k:{name}", "x" * 20)
+    read_memory("k:a")
+    write_memory("k:d", "x" * 20)
+    
+    # k:b was used least recently; the drop is logged
+    assert sorted(memory_handler.MEMORY) == ["k:a", "k:c", "k:d"]
+    assert memory_handler.get_memory_usage()["evictions"]["dropped"] == 1
+    memory_handler.MEMORY = {}
+    load_memory()
+    assert read_memory("k:b") is None
+
+def test_lfu_eviction_drops_least_frequently_used(store_files):
+    _write_limits(store_files / "memory.policy.yaml", max_bytes=90, eviction_policy="lfu")
+    load_memory()
+    for name in ("a", "b", "c"):
+        write_memory(f"k:{name}", "x" * 20)
+    for _ in range(3):
+        read_memory("k:a")
+        read_memory("k:b")
+    write_memory("k:d", "x" * 20)
+    assert sorted(memory_handler.MEMORY) == ["k:a", "k:b", "k:d"]
+    
+    # Stale heap entries are dropped instead of accumulating per access
+    for _ in range(500):
+        read_memory("k:a")
+    assert len(memory_handler._LFU_HEAPS["k"]) <= 2 * 3 + 64 + 1
+
+def test_namespace_quota_and_oversized_value(store_files):
+    _write_limits(store_files / "memory.policy.yaml", namespace_quotas={"chat": 50})
+    load_memory()
+    write_memory("other", "y" * 100)
+    write_memory("chat:1", "x" * 20)
+    write_memory("chat:2", "x" * 20)
+    
+    # Only the namespace over its quota loses a key
+    assert "chat:1" not in memory_handler.MEMORY
+    assert read_memory("other") == "y" * 100
+    with pytest.raises(memory_handler.MemoryLimitError):
+        write_memory("chat:3", "x" * 100)
+    assert read_memory("chat:3") is None
+
+def test_spilled_keys_are_loaded_back_and_survive_restart(store_files):
+    _write_limits(store_files / "memory.policy.yaml", max_bytes=100, spill_namespaces=["history"])
+    load_memory()
+    append_memory("history:a", "x" * 30)
+    append_memory("history:b", "y" * 30)
+    append_memory("history:c", "z" * 30)
+    
+    assert "history:a" in memory_handler.SPILLED
+    assert "history:a" not in memory_handler.MEMORY
+    usage = memory_handler.get_memory_usage()
+    assert usage["total_bytes"] <= 100
+    assert usage["spilled_keys"] == 1
+    
+    # Appending loads the list back and spills the next least recently used key
+    assert append_memory("history:a", "w") == 2
+    assert "history:b" in memory_handler.SPILLED
+    memory_handler.persist_memory()
+    assert len(os.listdir(store_files / "memory_spill")) == 1
+    
+    memory_handler.MEMORY = {}
+    load_memory()
+    assert read_memory("history:b") == ["y" * 30]
+    assert read_memory("history:a") == ["x" * 30, "w"]
+    assert memory_handler.get_memory_usage()["evictions"]["spill_loads"] >= 1
+
+def test_mutation_of_one_key_does_not_block_other_keys(store_files):
+    """A write stuck inside its key's critical section must not hold up other keys."""
+    inside = threading.Event()
+    release = threading.Event()
+    original_apply = memory_handler._apply_set
+
+    def slow_apply(key, value, size=None):
+        if key == "slow":
+            inside.set()
+            release.wait(5)
+        original_apply(key, value, size)
+
+    other = next(key for key in (f"fast:{i}" for i in range(1000))
+                 if memory_handler.key_lock(key) is not memory_handler.key_lock("slow"))
+    done = threading.Event()
+    with patch.object(memory_handler, "_apply_set", slow_apply):
+        slow = threading.Thread(target=write_memory, args=("slow", 1))
+        slow.start()
+        assert inside.wait(2)
+        fast = threading.Thread(target=lambda: (write_memory(other, 2), read_memory(other), done.set()))
+        fast.start()
+        assert done.wait(2)
+        release.set()
+        slow.join()
+        fast.join()
+    assert read_memory_many(["slow", other]) == {"slow": 1, other: 2}
+
+def test_evictions_are_committed_with_the_write(store_files, monkeypatch):
+    _write_limits(store_files / "memory.policy.yaml", max_bytes=40)
+    load_memory()
+    monkeypatch.setattr(memory_handler, "DURABILITY", "always")
+    write_memory("k:a", "x" * 20)
+    write_memory("k:b", "x" * 20)
+    
+    # The delete record of the evicted key is durable when the write returns
+    assert "k:a" not in memory_handler.MEMORY
+    assert memory_handler._durable_seq == memory_handler._wal_seq
+    assert _wal_records(store_files / "state_memory.wal")[-1] == {"seq": memory_handler._wal_seq, "op": "delete", "key": "k:a"}
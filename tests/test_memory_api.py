@@ -0,0 +1,85 @@
+# 📄 Script: test_memory_api.py
+# 🔧 Zweck: Tests für die HTTP-Schnittstelle des Memory-Stores
+# 🗂 Pfad: tests/test_memory_api.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: pytest, fastapi
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Skript testet die Endpunkte, die graph.py im Docker-Betrieb aufruft
+# HINWEIS (MCP): (Lesen, Schreiben, Löschen, Anhängen, Multi-Get), gleichzeitige Anhänge über HTTP
+# HINWEIS (MCP): und dass Schreiber verschiedener Schlüssel sich nicht gegenseitig blockieren.
+
+import threading
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_units.mcp_host_memory_store import memory_api, memory_handler
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Run the app against store files in a temporary directory."""
+    monkeypatch.setattr(memory_handler, "MEMORY_FILE", str(tmp_path / "state_memory.json"))
+    monkeypatch.setattr(memory_handler, "MEMORY_WAL_FILE", str(tmp_path / "state_memory.wal"))
+    monkeypatch.setattr(memory_handler, "MEMORY_POLICY_FILE", str(tmp_path / "memory.policy.yaml"))
+    monkeypatch.setattr(memory_handler, "MEMORY_SPILL_DIR", str(tmp_path / "memory_spill"))
+    with TestClient(memory_api.app) as test_client:
+        yield test_client
+    with memory_handler.MEMORY_LOCK:
+        memory_handler._close_wal()
+
+def test_get_put_delete(client):
+    assert client.get("/memory/context").json() == {"key": "context", "data": None}
+    assert client.post("/memory/context", json={"data": {"topic": "x"}}).status_code == 200
+    assert client.get("/memory/context").json()["data"] == {"topic": "x"}
+    assert client.put("/memory/context", json={"data": "y"}).status_code == 200
+    assert client.get("/memory/context").json()["data"] == "y"
+
+    assert client.delete("/memory/context").json() == {"key": "context", "deleted": True}
+    assert client.delete("/memory/context").json()["deleted"] is False
+    assert client.post("/memory/__store__", json={"data": 1}).status_code == 400
+
+def test_append_range_and_mget(client):
+    for i in range(5):
+        response = client.post("/memory/conversation_history/append", json={"entry": i, "max_entries": 4})
+    assert response.json()["length"] == 4
+    body = client.get("/memory/conversation_history", params={"last": 2}).json()
+    assert body["data"] == [3, 4]
+    assert body["cursor"] == 5
+    assert client.get("/memory/conversation_history", params={"after": 3}).json()["data"] == [3, 4]
+
+    client.post("/memory/context", json={"data": "c"})
+    response = client.post("/mget", json={"keys": ["context", "conversation_history", "missing"],
+                                          "last": {"conversation_history": 1}})
+    assert response.json()["data"] == {"context": "c", "conversation_history": [4], "missing": None}
+
+    # Appending to a value that is not a list is a conflict
+    assert client.post("/memory/context/append", json={"entry": 1}).status_code == 409
+
+def test_concurrent_appends_over_http(client):
+    def writer(n):
+        for i in range(20):
+            client.post(f"/memory/list:{n % 2}/append", json={"entry": [n, i]})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(client.get("/memory/list:0").json()["data"]) == 80
+    assert len(client.get("/memory/list:1").json()["data"]) == 80
+    stats = client.get("/stats").json()
+    assert stats["keys"] == 2
+    assert stats["usage"]["namespaces"]["list"]["keys"] == 2
+
+def test_key_lock_does_not_block_other_keys(client):
+    """A writer holding one key's lock must not hold up writers of other keys."""
+    blocked = memory_handler.key_lock("slow")
+    other = next(key for key in (f"fast:{i}" for i in range(1000))
+                 if memory_handler.key_lock(key) is not blocked)
+    with blocked:
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (memory_handler.write_memory(other, 1), done.set()))
+        thread.start()
+        assert done.wait(2)
+    thread.join()
+    assert client.get(f"/memory/{other}").json()["data"] == 1
@@ -0,0 +1,105 @@
+# 📄 Script: test_metrics.py
+# 🔧 Zweck: Tests für die In-Prozess-Metriken und den /metrics-Endpunkt
+# 🗂 Pfad: tests/test_metrics.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: pytest, fastapi.testclient
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Skript testet die Metrik-Registry sowie die Knotenzeiten
+# HINWEIS (MCP): der Graph-Ausführung und den /metrics-Endpunkt des API-Gateways.
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the Python path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_units.mcp_agent_interaction_engine.metrics import Counter, Gauge, Histogram
+from mcp_units.mcp_agent_interaction_engine import api_gateway as gateway_module
+from mcp_units.mcp_agent_interaction_engine.api_gateway import app
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that histogram observations are rendered as cumulative buckets."""
+    latency = Histogram("test_latency_seconds", "Test latency", ["node"], buckets=(0.1, 1.0))
+    latency.observe(0.05, node="A")
+    latency.observe(0.5, node="A")
+    latency.observe(5.0, node="A")
+    
+    lines = latency.render()
+    assert 'test_latency_seconds_bucket{node="A",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{node="A",le="1"} 2' in lines
+    assert 'test_latency_seconds_bucket{node="A",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{node="A"} 3' in lines
+    assert latency.get_count(node="A") == 3
+
+def test_counter_and_gauge():
+    """Test counter increments and gauge updates per label set."""
+    errors = Counter("test_errors_total", "Test errors", ["service"])
+    errors.inc(service="llm")
+    errors.inc(2, service="llm")
+    assert errors.get(service="llm") == 3
+    assert errors.get(service="memory") == 0
+    
+    in_flight = Gauge("test_in_flight", "Test gauge", ["path"])
+    in_flight.inc(path="/x")
+    in_flight.inc(path="/x")
+    in_flight.dec(path="/x")
+    assert in_flight.get(path="/x") == 1
+    assert Gauge("test_computed", "Computed", function=lambda: 7).render()[-1] == "test_computed 7"
+
+async def _no_memory(*args, **kwargs):
+    return None
+
+async def _no_memory_many(keys, last=None):
+    return {key: None for key in keys}
+
+async def _generate(prompt):
+    return "Antwort"
+
+@patch('graph.append_memory_async', _no_memory)
+@patch('graph.read_memory_many_async', _no_memory_many)
+@patch('graph.generate_text_async', _generate)
+def test_infer_node_timings_and_metrics_endpoint():
+    """Test per-node timings in the infer response and the /metrics exposition."""
+    client = TestClient(app)
+    
+    response = client.post("/mcp/infer", json={"input": "Hallo Zeiten", "include_timings": True})
+    assert response.status_code == 200
+    timings = response.json()["node_timings"]
+    assert set(timings) == {"MEMORY_LOOKUP", "TOOL_DECIDER", "LLM_INFER", "RESPONSE_FORMATTER"}
+    assert all(value >= 0 for value in timings.values())
+    
+    # Timings are only returned on request
+    response = client.post("/mcp/infer", json={"input": "Hallo ohne Zeiten"})
+    assert response.json()["node_timings"] is None
+    
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    body = metrics.text
+    assert 'mcp_graph_node_duration_seconds_count{node="LLM_INFER"}' in body
+    assert 'mcp_http_requests_total{path="/mcp/infer",status="200"}' in body
+    assert 'mcp_http_request_duration_seconds_bucket{path="/mcp/infer",le="+Inf"}' in body
+    assert "mcp_http_requests_in_flight" in body
+    # Monotonic graph statistics are counters; only the in-flight count is a gauge
+    assert "# TYPE mcp_graph_executions_total counter" in body
+    assert "# TYPE mcp_graph_compiles_total counter" in body
+    assert "# TYPE mcp_graph_in_flight gauge" in body
+
+def test_route_labels_are_cached_per_method_and_path():
+    """Test that the metric label of a path is looked up once and the cache stays bounded."""
+    client = TestClient(app)
+    client.get("/metrics")
+    assert gateway_module._route_paths[("GET", "/metrics")] == "/metrics"
+    
+    with patch.object(gateway_module, "ROUTE_PATH_CACHE_SIZE", 2):
+        for i in range(3):
+            assert client.get(f"/does-not-exist/{i}").status_code == 404
+        assert len(gateway_module._route_paths) == 2
+        assert gateway_module._route_paths[("GET", "/does-not-exist/2")] == "unmatched"
+    assert 'mcp_http_requests_total{path="unmatched",status="404"}' in client.get("/metrics").text
+
+if __name__ == "__main__":
+    # Run the tests
+    pytest.main(["-xvs", __file__])
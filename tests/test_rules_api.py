@@ -50,6 +50,34 @@ def test_list_rules():
         assert "rule_type" in rule
         assert "content" in rule
 
+def test_list_rules_etag_and_type_filter():
+    """Test the cached GET /mcp/rules listing with ETag and type filter."""
+    first = client.get("/mcp/rules")
+    etag = first.headers["etag"]
+    assert etag.startswith('"')
+    
+    # Unchanged rules are served from the cache with the same ETag
+    second = client.get("/mcp/rules")
+    assert second.headers["etag"] == etag
+    assert second.content == first.content
+    
+    not_modified = client.get("/mcp/rules", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert client.get("/mcp/rules", headers={"If-None-Match": '"other"'}).status_code == 200
+    
+    naming = client.get("/mcp/rules", params={"type": "naming"})
+    data = naming.json()
+    assert data["count"] == 1
+    assert data["rules"][0]["rule_type"] == "naming"
+    assert naming.headers["etag"] != etag
+    assert data["ruleset_version"] == first.json()["ruleset_version"]
+    
+    # Unknown types get an empty listing that is not cached
+    unknown = client.get("/mcp/rules", params={"type": "does-not-exist"})
+    assert unknown.json()["count"] == 0
+    assert "does-not-exist" not in sys.modules["rules_api"]._rules_list_cache
+
 def test_check_valid_policy():
     """Test the POST /mcp/rules/check endpoint with a valid policy."""
     # Load a known valid policy
@@ -140,6 +168,64 @@ def test_check_policy_with_specific_rules():
     assert isinstance(data["valid"], bool)
     assert isinstance(data["violations"], list)
 
+def test_check_policy_batch():
+    """Test the POST /mcp/rules/check/batch endpoint."""
+    policy = load_test_policy("config/policies/graph.policy.yaml")
+    response = client.post("/mcp/rules/check/batch", json={"policies": [
+        {"id": "graph", "policy": policy},
+        {"id": "invalid", "policy": {"component": "INVALID-NAME", "enabled": True}},
+        {"policy": {}}
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3
+    assert data["valid_count"] == 1
+    assert data["invalid_count"] == 2
+    assert data["ruleset_version"]
+    
+    # The verdicts match single checks and keep the request order
+    single = client.post("/mcp/rules/check", json={"policy": policy}).json()
+    assert [result["index"] for result in data["results"]] == [0, 1, 2]
+    assert data["results"][0]["id"] == "graph"
+    assert data["results"][0]["violations"] == single["violations"]
+    assert data["results"][0]["valid"] is True
+    assert data["results"][1]["valid"] is False
+    assert data["results"][2]["id"] is None
+    assert data["results"][2]["violations"] == ["Policy is empty or None"]
+
+def test_check_policy_batch_too_large(monkeypatch):
+    """Test that oversized batches are rejected."""
+    monkeypatch.setattr("rules_api.MAX_BATCH_POLICIES", 2)
+    response = client.post("/mcp/rules/check/batch", json={"policies": [{"policy": {"component": "a"}}] * 3})
+    assert response.status_code == 400
+
+def test_capability_components():
+    """Test the GET /mcp/rules/capabilities/{capability} endpoint."""
+    response = client.get("/mcp/rules/capabilities/memory_read")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["capability"] == "memory_read"
+    assert "mcp_host_memory_store" in data["components"]
+    assert data["defined"] is True
+    assert data["ruleset_version"]
+    
+    # Unknown capabilities are answered with an empty list
+    data = client.get("/mcp/rules/capabilities/time_travel").json()
+    assert data["components"] == []
+    assert data["defined"] is False
+
+def test_rules_stats():
+    """Test that repeated checks show up as cache hits in GET /mcp/rules/stats."""
+    policy = load_test_policy("config/policies/graph.policy.yaml")
+    before = client.get("/mcp/rules/stats").json()["verdict_cache"]
+    client.post("/mcp/rules/check", json={"policy": policy})
+    client.post("/mcp/rules/check", json={"policy": policy})
+    
+    data = client.get("/mcp/rules/stats").json()
+    assert data["verdict_cache"]["hits"] >= before["hits"] + 1
+    assert data["ruleset_version"]
+    assert "reloads" in data["engine"]
+
 if __name__ == "__main__":
     # Run the tests
     pytest.main(["-xvs", __file__])
\ No newline at end of file
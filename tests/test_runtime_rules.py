@@ -6,7 +6,8 @@
 # 🧱 Benötigte Pakete: pytest, yaml
 # 🧪 Testbar: ✅
 # HINWEIS (MCP): Dieses Skript testet die Funktionalität des runtime_rules-Moduls,
-# HINWEIS (MCP): das für die Validierung von Policies gegen definierte Regeln zuständig ist.
+# HINWEIS (MCP): das für die Validierung von Policies gegen definierte Regeln zuständig ist,
+# HINWEIS (MCP): einschließlich des einmaligen Kompilierens und Neuladens geänderter Regeldateien.
 
 import os
 import sys
@@ -16,7 +17,16 @@ from typing import Dict, Any
 
 # Add the parent directory to the Python path to import the module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from mcp_units.mcp_agent_interaction_engine.runtime_rules import check_policy_against_rules
+from unittest.mock import patch
+from mcp_units.mcp_agent_interaction_engine import runtime_rules
+from mcp_units.mcp_agent_interaction_engine.runtime_rules import (
+    RuleEngine,
+    VerdictCache,
+    check_policy_against_rules,
+    evaluate_policy,
+    get_capability_components,
+    policy_hash
+)
 
 def load_test_policy(policy_file: str) -> Dict[str, Any]:
     """Load a policy file for testing."""
@@ -72,6 +82,119 @@ def test_specific_rule_files():
     # Should validate against only the specified rule file
     assert isinstance(violations, list), "Expected a list of violations"
 
+def _write_rules(path, content: Dict[str, Any]) -> None:
+    with open(path, "w") as f:
+        yaml.safe_dump(content, f)
+
+def test_rules_are_parsed_once(monkeypatch):
+    """Test that unchanged rule files are not parsed again."""
+    monkeypatch.setattr(runtime_rules, "RULE_ENGINE", RuleEngine())
+    policy = load_test_policy("config/policies/graph.policy.yaml")
+    first = check_policy_against_rules(policy)
+    
+    with patch.object(runtime_rules.yaml, "safe_load", side_effect=AssertionError("parsed again")):
+        assert check_policy_against_rules(policy) == first
+    assert runtime_rules.RULE_ENGINE.stats["reloads"] == 0
+
+def test_changed_rule_file_is_reloaded(tmp_path, monkeypatch):
+    """Test that a changed rule file switches to a new rule set version."""
+    monkeypatch.setattr(runtime_rules, "RULES_DIR", str(tmp_path))
+    monkeypatch.setattr(runtime_rules, "RULE_ENGINE", RuleEngine())
+    rule_file = tmp_path / "capabilities.rules.yaml"
+    _write_rules(rule_file, {"capabilities": {"unit_a": ["memory_read"]}})
+    policy = {"component": "unit_b", "capabilities": ["memory_read", "memory_write"]}
+    
+    violations, version = evaluate_policy(policy)
+    assert violations == ["Undefined capability used: memory_write"]
+    
+    # Touching the file without changing it keeps the version
+    os.utime(rule_file, None)
+    assert evaluate_policy(policy) == (violations, version)
+    
+    _write_rules(rule_file, {"capabilities": {"unit_a": ["memory_read", "memory_write"]}})
+    stat = os.stat(rule_file)
+    os.utime(rule_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    violations, new_version = evaluate_policy(policy)
+    assert violations == []
+    assert new_version != version
+    assert runtime_rules.RULE_ENGINE.stats["reloads"] == 1
+
+def test_invalid_rule_file_reports_error(tmp_path, monkeypatch):
+    """Test that a rule file with invalid YAML is reported like before."""
+    monkeypatch.setattr(runtime_rules, "RULE_ENGINE", RuleEngine())
+    rule_file = tmp_path / "naming.rules.yaml"
+    rule_file.write_text("naming: [unclosed\n")
+    
+    violations = check_policy_against_rules({"component": "unit_a"}, [str(rule_file)])
+    assert len(violations) == 1
+    assert violations[0].startswith("Error during rule validation:")
+
+def test_component_pattern_from_rules(tmp_path, monkeypatch):
+    """Test the precompiled component pattern of the naming rules."""
+    monkeypatch.setattr(runtime_rules, "RULE_ENGINE", RuleEngine())
+    rule_file = tmp_path / "naming.rules.yaml"
+    _write_rules(rule_file, {"naming": {"component_pattern": {"regex": "^mcp_"}}})
+    
+    assert check_policy_against_rules({"component": "mcp_unit"}, [str(rule_file)]) == []
+    assert check_policy_against_rules({"component": "unit"}, [str(rule_file)]) == [
+        "Component name 'unit' does not match required pattern"
+    ]
+
+def test_capability_index(tmp_path, monkeypatch):
+    """Test the capability index used for validation and lookups."""
+    monkeypatch.setattr(runtime_rules, "RULE_ENGINE", RuleEngine())
+    rule_file = tmp_path / "capabilities.rules.yaml"
+    _write_rules(rule_file, {"capabilities": {
+        "unit_a": [f"capability_{i}" for i in range(1000)],
+        "unit_b": ["capability_7", "shell_access"]
+    }})
+    rule_files = [str(rule_file)]
+    
+    components, version = get_capability_components("capability_7", rule_files)
+    assert components == ["unit_a", "unit_b"]
+    assert get_capability_components("shell_access", rule_files)[0] == ["unit_b"]
+    assert get_capability_components("unknown", rule_files) == ([], version)
+    
+    policy = {"component": "unit_c", "capabilities": ["capability_999", "unknown", ["unhashable"]]}
+    assert check_policy_against_rules(policy, rule_files) == [
+        "Undefined capability used: unknown",
+        "Undefined capability used: ['unhashable']"
+    ]
+
+def test_verdict_cache_answers_repeated_checks(tmp_path, monkeypatch):
+    """Test that repeated checks are answered from the verdict cache until the rules change."""
+    monkeypatch.setattr(runtime_rules, "RULE_ENGINE", RuleEngine())
+    monkeypatch.setattr(runtime_rules, "VERDICT_CACHE", VerdictCache(maxsize=2))
+    rule_file = tmp_path / "structure.rules.yaml"
+    _write_rules(rule_file, {"structure": {"required_fields": ["enabled"]}})
+    rule_files = [str(rule_file)]
+    
+    policy = {"component": "unit_a", "version": 1}
+    first = check_policy_against_rules(policy, rule_files)
+    assert first == ["Missing required field: enabled"]
+    
+    # Key order does not matter, and the cached verdict cannot be modified by callers
+    first.append("changed by caller")
+    with patch.object(runtime_rules, "_check_ruleset", side_effect=AssertionError("checked again")):
+        assert check_policy_against_rules({"version": 1, "component": "unit_a"}, rule_files) == [
+            "Missing required field: enabled"
+        ]
+    stats = runtime_rules.VERDICT_CACHE.get_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    
+    # Changed rules get a new version and therefore a fresh verdict
+    _write_rules(rule_file, {"structure": {"required_fields": ["version"]}})
+    stat = os.stat(rule_file)
+    os.utime(rule_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert check_policy_against_rules(policy, rule_files) == []
+    
+    # The cache is bounded
+    check_policy_against_rules({"component": "unit_b"}, rule_files)
+    stats = runtime_rules.VERDICT_CACHE.get_stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert policy_hash({"a": object()}) is None
+
 if __name__ == "__main__":
     # Run the tests
     pytest.main(["-xvs", __file__])
\ No newline at end of file
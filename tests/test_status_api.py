@@ -0,0 +1,148 @@
+# 📄 Script: test_status_api.py
+# 🔧 Zweck: Tests für die Status-Endpunkte des API-Gateways
+# 🗂 Pfad: tests/test_status_api.py
+# 👤 Autor: MINT-RESEARCH
+# 📅 Erstellt: 2025-04-13
+# 🧱 Benötigte Pakete: pytest, fastapi
+# 🧪 Testbar: ✅
+# HINWEIS (MCP): Dieses Skript testet den /mcp/logs-Endpunkt, insbesondere das Lesen
+# HINWEIS (MCP): über rotierte und komprimierte Logsegmente hinweg, sowie Filter und Paginierung
+# HINWEIS (MCP): den Live-Stream /mcp/logs/stream und die Abfragen über /mcp/logs/query.
+
+import os
+import sys
+import gzip
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from unittest.mock import patch
+
+# Add the parent directory to the Python path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_units.mcp_agent_interaction_engine import status_api as status_api_module
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(status_api_module, "LOGS_DIR", str(tmp_path))
+    app = FastAPI()
+    status_api_module.include_status_router(app)
+    return TestClient(app)
+
+def _write_segment(path, numbers, compress=False):
+    content = "".join(json.dumps({"n": n}) + "\n" for n in numbers)
+    if compress:
+        with gzip.open(path, "wt") as f:
+            f.write(content)
+    else:
+        path.write_text(content)
+
+def test_logs_read_across_segments(client, tmp_path):
+    """Test that the last lines are collected from the active file and older segments."""
+    _write_segment(tmp_path / "unit_a.20250101T000000.log.gz", range(0, 30), compress=True)
+    _write_segment(tmp_path / "unit_a.20250102T000000.log", range(30, 60))
+    _write_segment(tmp_path / "unit_a.log", range(60, 80))
+
+    response = client.get("/mcp/logs", params={"unit": "unit_a"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == status_api_module.MAX_LOG_LINES
+    assert [json.loads(line)["n"] for line in body["logs"]] == list(range(30, 80))
+
+def test_logs_from_rotated_segments_only(client, tmp_path):
+    """Test that a unit whose active file was just rotated away still has logs."""
+    _write_segment(tmp_path / "unit_a.20250101T000000.log", range(3))
+    body = client.get("/mcp/logs", params={"unit": "unit_a"}).json()
+    assert [json.loads(line)["n"] for line in body["logs"]] == [0, 1, 2]
+
+def _write_events(path, events):
+    path.write_text("".join(json.dumps(event) + "\n" for event in events))
+
+def test_logs_filters_and_pagination(client, tmp_path):
+    """Test level/event/since filters and cursor pagination across segments."""
+    events = [
+        {"timestamp": f"2025-04-13T10:00:{n:02d}.000000Z", "level": "ERROR" if n % 3 == 0 else "INFO",
+         "event": "API_ERROR" if n % 3 == 0 else "API_REQUEST", "n": n}
+        for n in range(30)
+    ]
+    _write_events(tmp_path / "unit_a.20250413T100015.log", events[:15])
+    _write_events(tmp_path / "unit_a.log", events[15:])
+
+    first = client.get("/mcp/logs", params={"unit": "unit_a", "limit": 4, "level": "error"}).json()
+    assert [json.loads(line)["n"] for line in first["logs"]] == [18, 21, 24, 27]
+    second = client.get("/mcp/logs", params={"unit": "unit_a", "limit": 4, "level": "error",
+                                             "cursor": first["next_cursor"]}).json()
+    assert [json.loads(line)["n"] for line in second["logs"]] == [6, 9, 12, 15]
+    third = client.get("/mcp/logs", params={"unit": "unit_a", "limit": 4, "level": "error",
+                                            "cursor": second["next_cursor"]}).json()
+    assert [json.loads(line)["n"] for line in third["logs"]] == [0, 3]
+    assert third["next_cursor"] is None
+
+    recent = client.get("/mcp/logs", params={"unit": "unit_a", "event": "API_REQUEST",
+                                             "since": "2025-04-13T10:00:25Z"}).json()
+    assert [json.loads(line)["n"] for line in recent["logs"]] == [25, 26, 28, 29]
+    assert recent["next_cursor"] is None
+
+def test_logs_invalid_parameters(client, tmp_path):
+    _write_segment(tmp_path / "unit_a.log", range(3))
+    assert client.get("/mcp/logs", params={"unit": "unit_a", "since": "gestern"}).status_code == 400
+    assert client.get("/mcp/logs", params={"unit": "unit_a", "cursor": "kaputt"}).status_code == 400
+    assert client.get("/mcp/logs", params={"unit": "unit_a", "limit": 0}).status_code == 422
+
+def test_logs_stream_backlog_and_new_entries(client, tmp_path, monkeypatch):
+    """Test that the stream sends the filtered backlog and then newly appended entries."""
+    monkeypatch.setattr(status_api_module, "LOG_STREAM_POLL_INTERVAL", 0)
+    _write_events(tmp_path / "unit_a.log", [{"level": "ERROR", "n": 0}, {"level": "INFO", "n": 1},
+                                            {"level": "ERROR", "n": 2}])
+    checks = []
+
+    async def is_disconnected(self):
+        # Append entries to both units after the stream started, then disconnect
+        checks.append(True)
+        if len(checks) == 1:
+            with open(tmp_path / "unit_a.log", "a") as f:
+                f.write(json.dumps({"level": "INFO", "n": 3}) + "\n")
+                f.write(json.dumps({"level": "ERROR", "n": 4}) + "\n")
+            _write_events(tmp_path / "unit_b.log", [{"level": "ERROR", "n": 5}])
+        return len(checks) > 2
+
+    with patch.object(Request, "is_disconnected", is_disconnected):
+        response = client.get("/mcp/logs/stream", params={"unit": ["unit_a", "unit_b"], "level": "ERROR",
+                                                          "backlog": 5})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert all(block.startswith("event: log\ndata: ") for block in events)
+    numbers = [json.loads(block.split("data: ", 1)[1])["n"] for block in events]
+    assert numbers == [0, 2, 4, 5]
+
+def test_logs_query_endpoint(client, tmp_path):
+    """Test the p99 of a field over a time range and parameter validation."""
+    events = [
+        {"timestamp": f"2025-04-13T10:{n // 60:02d}:{n % 60:02d}.000000Z", "level": "INFO",
+         "event": "infer_request_completed", "duration_ms": n}
+        for n in range(120)
+    ]
+    _write_events(tmp_path / "api_gateway.log", events)
+
+    response = client.get("/mcp/logs/query", params={
+        "unit": "api_gateway", "start": "2025-04-13T10:01:00Z", "end": "2025-04-13T10:01:59Z",
+        "event": "infer_request_completed", "metric": "duration_ms", "percentiles": "99", "group_by": "event"
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["matched"] == 60
+    assert body["groups"][0]["group"] == {"event": "infer_request_completed"}
+    assert body["groups"][0]["metric"]["p99"] == pytest.approx(118.41)
+
+    assert client.get("/mcp/logs/query", params={"start": "gestern"}).status_code == 400
+    assert client.get("/mcp/logs/query", params={"field": "ohne_wert"}).status_code == 400
+    assert client.get("/mcp/logs/query", params={"percentiles": "150"}).status_code == 400
+
+def test_logs_unknown_unit(client):
+    assert client.get("/mcp/logs", params={"unit": "unbekannt"}).status_code == 404
+
+if __name__ == "__main__":
+    # Run the tests
+    pytest.main(["-xvs", __file__])